@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+# Benchmarks loading, validating, converting, serializing and querying synthetic package statements at
+# increasing numbers of statements, and reports regressions in time or peak memory against a baseline.
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+import rdflib
+import yaml
+from rdflib import Graph, Namespace
+
+from generate_package_statements import createGenerator, writePackageStatements
+from package_statements import PACKAGE_STATEMENTS_IRI, addNamespaces, addPackageStatement, \
+    createPackageStatementsFromYaml
+from registry import Registry
+from registry_queries import PREPARED_QUERIES
+from validate_package_statement import validatePackageStatement
+
+
+DEFAULT_SIZES = [10, 1000, 10000]
+# Differences below these are noise, not regressions
+MIN_SECONDS = 0.05
+MIN_MEMORY = 1024 * 1024
+
+
+class Measurements:
+    """
+    Wall-clock time per step and, while tracemalloc is tracing, the peak memory allocated during the
+    step. A step can be measured in several parts: times add up, the peak memory is the largest one.
+    """
+
+    def __init__(self):
+        self.results = {}
+
+    @contextmanager
+    def measure(self, step: str):
+        traceMemory = tracemalloc.is_tracing()
+        if traceMemory:
+            tracemalloc.reset_peak()
+            startMemory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            result = self.results.setdefault(step, {'seconds': 0.0})
+            result['seconds'] += seconds
+            if traceMemory:
+                peakMemory = tracemalloc.get_traced_memory()[1] - startMemory
+                result['peakMemory'] = max(result.get('peakMemory', 0), peakMemory)
+
+
+def benchmarkSize(count: int, workDir: str, generatorOptions: dict) -> dict:
+    """Runs all steps on count generated statements in workDir/<count> and returns their measurements."""
+    sizeDir = os.path.join(workDir, str(count))
+    shutil.rmtree(sizeDir, ignore_errors=True)
+    yamlDir = os.path.join(sizeDir, 'yaml')
+    outputDir = os.path.join(sizeDir, 'output')
+    os.makedirs(outputDir)
+    m = Measurements()
+
+    with m.measure('generate'):
+        fileNames = writePackageStatements(createGenerator(**generatorOptions), count, yamlDir)
+
+    names = [os.path.splitext(os.path.basename(fileName))[0] for fileName in fileNames]
+    for fileName, name in zip(fileNames, names):
+        with m.measure('load-yaml'):
+            with open(fileName, 'r') as f:
+                data = yaml.safe_load(f)
+        with m.measure('validate'):
+            validatePackageStatement(data)
+        with m.measure('build-graph'):
+            NSDATA = Namespace(PACKAGE_STATEMENTS_IRI + name + "#")
+            g = Graph()
+            addNamespaces(g)
+            g.bind("data", NSDATA)
+            addPackageStatement(g, data, NSDATA)
+        with m.measure('serialize-turtle'):
+            g.serialize(format='turtle')
+        with m.measure('serialize-nt'):
+            g.serialize(format='nt')
+
+    outputFileNames = [os.path.join(outputDir, name + '.ttl') for name in names]
+    for fileName, outputFileName in zip(fileNames, outputFileNames):
+        with m.measure('convert-turtle'):
+            createPackageStatementsFromYaml(fileName, outputFileName)
+    for fileName, name in zip(fileNames, names):
+        with m.measure('convert-nt'):
+            createPackageStatementsFromYaml(fileName, os.path.join(outputDir, name + '.nt'), 'nt')
+
+    registry = Registry(os.path.join(sizeDir, 'registry.sqlite'))
+    with m.measure('registry-load'):
+        registry.load(outputFileNames)
+    for question, query in PREPARED_QUERIES.items():
+        with m.measure(f"query-{question}"):
+            list(registry.query(query))
+    registry.close()
+    return m.results
+
+
+def runBenchmarks(sizes: list[int], workDir: str, generatorOptions: dict, memory: bool = False) -> dict:
+    """
+    Benchmarks each number of statements. With memory, allocations are traced to measure peak memory,
+    which makes everything several times slower: compare timings only with those of the same mode.
+    """
+    results = {
+        'environment': {'python': platform.python_version(), 'rdflib': rdflib.__version__,
+                        'machine': platform.machine()},
+        'generator': generatorOptions,
+        'memory': memory,
+        'sizes': {},
+    }
+    if memory:
+        tracemalloc.start()
+    try:
+        for count in sizes:
+            print(f"Benchmarking {count} package statements", file=sys.stderr)
+            results['sizes'][str(count)] = benchmarkSize(count, workDir, generatorOptions)
+    finally:
+        if memory:
+            tracemalloc.stop()
+    return results
+
+
+def compareResults(results: dict, baseline: dict, tolerance: float = 0.2) -> list[str]:
+    """Returns the steps that are slower or use more memory than in the baseline, beyond the tolerance."""
+    regressions = []
+    for size, steps in results['sizes'].items():
+        for step, result in steps.items():
+            base = baseline.get('sizes', {}).get(size, {}).get(step)
+            if base is None:
+                continue
+            for metric, minimum in (('seconds', MIN_SECONDS), ('peakMemory', MIN_MEMORY)):
+                if metric not in result or metric not in base:
+                    continue
+                value, baseValue = result[metric], base[metric]
+                if value > baseValue * (1 + tolerance) and value - baseValue > minimum:
+                    regressions.append(f"{size} statements, {step}: {metric} {formatValue(metric, value)}, "
+                                       f"was {formatValue(metric, baseValue)} (+{(value / baseValue - 1) * 100:.0f}%)")
+    return regressions
+
+
+def formatValue(metric: str, value) -> str:
+    if value is None:
+        return '-'
+    return f"{value:.3f}s" if metric == 'seconds' else f"{value / (1024 * 1024):.1f}MiB"
+
+
+def printResults(results: dict, baseline: dict = None):
+    print("statements\tstep\tseconds\tpeak memory\tbaseline seconds\tbaseline peak memory")
+    for size, steps in results['sizes'].items():
+        for step, result in steps.items():
+            base = (baseline or {}).get('sizes', {}).get(size, {}).get(step)
+            row = [size, step, formatValue('seconds', result['seconds']),
+                   formatValue('peakMemory', result.get('peakMemory'))]
+            if base is not None:
+                row += [formatValue('seconds', base['seconds']), formatValue('peakMemory', base.get('peakMemory'))]
+            print("\t".join(row))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark package statement conversion and querying at scale")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help=f"Numbers of package statements (default: {' '.join(map(str, DEFAULT_SIZES))})")
+    parser.add_argument("--work-dir", type=str, default="tmp/benchmark",
+                        help="Directory for the generated statements, outputs and registries")
+    parser.add_argument("--interventions", type=int, default=3, help="Interventions per statement (default: 3)")
+    parser.add_argument("--outcomes", type=int, default=5, help="Outcomes per statement (default: 5)")
+    parser.add_argument("--timepoints", type=int, default=3, help="Timepoints per statement (default: 3)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--memory", action="store_true",
+                        help="Also measure peak memory by tracing allocations (much slower)")
+    parser.add_argument("--output", type=str, default=None, help="Write the results as JSON")
+    parser.add_argument("--baseline", type=str, default=None, help="JSON results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results to the baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed increase in time or memory before it is a regression (default: 0.2)")
+    args = parser.parse_args()
+
+    generatorOptions = {'interventions': args.interventions, 'outcomes': args.outcomes,
+                        'timepoints': args.timepoints, 'seed': args.seed}
+    results = runBenchmarks(args.sizes, args.work_dir, generatorOptions, args.memory)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.baseline and os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    printResults(results, baseline)
+
+    if args.save_baseline:
+        if not args.baseline:
+            parser.error("--save-baseline needs --baseline")
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline {args.baseline}", file=sys.stderr)
+    elif baseline is not None:
+        if baseline.get('generator') != generatorOptions or baseline.get('memory') != args.memory:
+            print("WARNING: the baseline was made with different options", file=sys.stderr)
+        regressions = compareResults(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
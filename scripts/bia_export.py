@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+# Columnar export of the budget impact analysis (BIA) data of package statements: the cost estimations
+# and trend assumptions, one typed table per kind of dataset, as Parquet or Arrow IPC files.
+import argparse
+import os
+import sys
+import yaml
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    # Optional dependency, only needed for the columnar export
+    pa = None
+
+
+FORMAT_EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+
+def _requirePyArrow():
+    if pa is None:
+        raise ImportError("The columnar export needs pyarrow, install it with: pip install pyarrow")
+
+
+def costEstimationSchema():
+    _requirePyArrow()
+    return pa.schema([
+        ('statement', pa.string()),
+        ('cost_estimation', pa.string()),
+        ('scenario', pa.string()),
+        ('trend_assumption', pa.string()),
+        ('cost_type', pa.string()),
+        ('interventions', pa.list_(pa.string())),
+        ('time_unit', pa.string()),
+        ('timepoint', pa.string()),
+        ('patients', pa.int64()),
+        ('costs', pa.float64()),
+    ])
+
+
+def trendAssumptionSchema():
+    _requirePyArrow()
+    return pa.schema([
+        ('statement', pa.string()),
+        ('trend_assumption', pa.string()),
+        ('scenario', pa.string()),
+        ('time_unit', pa.string()),
+        ('timepoint', pa.string()),
+        ('patients', pa.int64()),
+        ('market_penetration', pa.float64()),
+    ])
+
+
+def costEstimationColumns(data: dict, statement: str) -> dict[str, list]:
+    """One row per observation, as the qb:Observations of the cost estimations in package_statements.py."""
+    columns = {name: [] for name in costEstimationSchema().names}
+    for costEstimation in data.get('cost-estimations') or []:
+        for observationGroup in costEstimation.get('observation-groups', []):
+            for i, timepoint in enumerate(costEstimation.get('time-points', ['default'])):
+                columns['statement'].append(statement)
+                columns['cost_estimation'].append(costEstimation['id'])
+                columns['scenario'].append(costEstimation.get('scenario-id'))
+                columns['trend_assumption'].append(costEstimation.get('trend-assumption-id'))
+                columns['cost_type'].append(observationGroup['type'])
+                columns['interventions'].append(list(observationGroup.get('intervention-ids', [])))
+                columns['time_unit'].append(costEstimation.get('time-unit'))
+                columns['timepoint'].append(str(timepoint))
+                columns['patients'].append(observationGroup['number-of-patients'][i])
+                columns['costs'].append(observationGroup['total-costs'][i])
+    return columns
+
+
+def trendAssumptionColumns(data: dict, statement: str) -> dict[str, list]:
+    """One row per observation, as the qb:Observations of the trend assumptions in package_statements.py."""
+    columns = {name: [] for name in trendAssumptionSchema().names}
+    for trend in data.get('trend-assumptions') or []:
+        marketPenetration = trend.get('intervention-market-penetration')
+        for i, timepoint in enumerate(trend.get('time-points', ['default'])):
+            columns['statement'].append(statement)
+            columns['trend_assumption'].append(trend['id'])
+            columns['scenario'].append(trend.get('scenario-id'))
+            columns['time_unit'].append(trend.get('time-unit'))
+            columns['timepoint'].append(str(timepoint))
+            columns['patients'].append(trend['number-of-patients'][i])
+            columns['market_penetration'].append(marketPenetration[i] if marketPenetration else None)
+    return columns
+
+
+def writeTable(table, fileName: str, format: str = 'parquet'):
+    tmpFileName = fileName + '.tmp'
+    if format == 'parquet':
+        pq.write_table(table, tmpFileName)
+    elif format == 'arrow':
+        # Arrow IPC files can be memory-mapped and read without copying
+        with pa.OSFile(tmpFileName, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise NotImplementedError(f"Columnar format '{format}' not implemented")
+    os.replace(tmpFileName, fileName)
+
+
+def biaTableFileNames(statement: str, outputDir: str, format: str = 'parquet') -> list[str]:
+    """The cost estimation and trend assumption table files of a statement, as written by writeBiaTables."""
+    return [os.path.join(outputDir, kind, statement + FORMAT_EXTENSIONS[format])
+            for kind in ('cost-estimations', 'trend-assumptions')]
+
+
+def writeBiaTables(data: dict, statement: str, outputDir: str, format: str = 'parquet') -> list[str]:
+    """
+    Writes outputDir/cost-estimations/<statement> and outputDir/trend-assumptions/<statement> tables.
+    Each directory can be read as one dataset with pyarrow.dataset.dataset(directory, format=...).
+    """
+    _requirePyArrow()
+    fileNames = biaTableFileNames(statement, outputDir, format)
+    for fileName, schema, columns in zip(fileNames, (costEstimationSchema(), trendAssumptionSchema()),
+                                         (costEstimationColumns, trendAssumptionColumns)):
+        os.makedirs(os.path.dirname(fileName), exist_ok=True)
+        writeTable(pa.table(columns(data, statement), schema=schema), fileName, format)
+    return fileNames
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export the BIA cost estimations and trend assumptions of "
+                                                 "package statements to Parquet or Arrow files")
+    parser.add_argument("inputs", type=str, nargs="+", help="Package statement YAML files")
+    parser.add_argument("--output-dir", type=str, required=True, help="Directory for the tables")
+    parser.add_argument("--format", type=str, choices=sorted(FORMAT_EXTENSIONS), default='parquet',
+                        help="Columnar file format (default: parquet)")
+    args = parser.parse_args()
+
+    for inputFileName in args.inputs:
+        with open(inputFileName, 'r') as f:
+            data = yaml.safe_load(f)
+        statement = os.path.splitext(os.path.basename(inputFileName))[0]
+        for fileName in writeBiaTables(data, statement, args.output_dir, args.format):
+            print(f"Wrote {fileName}", file=sys.stderr)
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+
+# Budget impact analysis (BIA) engine: recomputes the cost estimations of package statements with NumPy,
+# for what-if changes (prices, patient numbers, market penetration) and sweeps over parameter grids.
+import argparse
+import itertools
+import os
+import sys
+import numpy as np
+import yaml
+
+from bia_export import costEstimationColumns, trendAssumptionColumns
+
+
+# Observation group types that are line items; Total and Additional are derived from them
+CURRENT = 'Current'
+SUBSTITUTION = 'Substitution'
+DERIVED_TYPES = ('Total', 'Additional')
+# How the Total and Additional groups of a cost estimation relate to its line items (see BudgetImpactModel)
+REPLACEMENT = 'replacement'
+ADD_ON = 'add-on'
+CONVENTIONS = (REPLACEMENT, ADD_ON)
+
+
+def _rows(columns: dict) -> list[dict]:
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+def _timepointKey(timepoint) -> tuple:
+    """Sorts numeric timepoints by value (2 before 10) and other timepoints, such as 'default', after them."""
+    try:
+        return 0, float(timepoint), ''
+    except (TypeError, ValueError):
+        return 1, 0.0, str(timepoint)
+
+
+class BudgetImpactModel:
+    """
+    The cost estimations of any number of package statements as arrays of line items by timepoint.
+
+    The line items are the Current and Substitution observation groups. Each item has a unit cost
+    per patient, costs / patients, so patient numbers and prices can be changed independently.
+    The package statements use two conventions for the Total and Additional groups:
+    - replacement (e.g. aft_ps): the Current items are the costs of all patients before, the
+      Substitution items those after introducing the intervention. Total = Substitution and
+      Additional = Total − Current.
+    - add-on (e.g. trodelvy_ps): the Current items are the patients that stay on the current
+      treatment, the Substitution items those that switch. Total = Current + Substitution and
+      Additional = Total − the costs of all patients on the current treatment.
+    The convention of each estimation is the one its stated Total and Additional costs match (replacement
+    if it has neither), unless given in conventions ({cost estimation id: convention}). The switching
+    patients of an estimation are those of its largest Substitution item, as further Substitution items,
+    such as follow-up treatment, concern the same patients.
+
+    What-if parameters are multipliers:
+    - price: {intervention id: factor} on the unit costs of the items of that intervention
+    - patients: {intervention id: factor} on the patient numbers of the items of that intervention
+    - penetration: {trend assumption id: factor or per-timepoint factors} on the patient numbers of the
+      Substitution items of the estimations based on that trend assumption; the difference in switching
+      patients moves to or from the Current items, so the number of patients stays the same.
+      penetrationFactors() converts a different penetration curve to factors
+    Intervention, trend assumption and cost estimation ids are matched in all statements. Per-timepoint
+    factors have one value per timepoint of the estimations they apply to; results are NaN after the
+    last timepoint of an estimation.
+    """
+
+    def __init__(self, costRows: list[dict], trendRows: list[dict] = (), conventions: dict = None):
+        estimations = {}
+        items = {}
+        timepoints = {}
+        for row in costRows:
+            if row['cost_type'] in DERIVED_TYPES:
+                continue
+            estimationKey = (row['statement'], row['cost_estimation'])
+            estimations.setdefault(estimationKey, (row['scenario'], row['trend_assumption']))
+            itemKey = estimationKey + (row['cost_type'], tuple(row['interventions']))
+            item = items.setdefault(itemKey, {'patients': [], 'costs': []})
+            item['patients'].append(row['patients'])
+            item['costs'].append(row['costs'])
+            timepoints.setdefault(estimationKey, [])
+            if len(item['patients']) > len(timepoints[estimationKey]):
+                timepoints[estimationKey].append(row['timepoint'])
+
+        self.estimations = list(estimations)
+        self.scenarios = [estimations[key][0] for key in self.estimations]
+        self.timepoints = [timepoints[key] for key in self.estimations]
+        self.interventions = sorted({i for key in items for i in key[3]})
+        self.trendAssumptions = sorted({trend for _, trend in estimations.values() if trend})
+        self.items = list(items)
+        self.numTimepoints = max((len(t) for t in self.timepoints), default=0)
+        # Estimation × timepoint mask of the timepoints each estimation has
+        self.timepointMask = np.arange(self.numTimepoints) < np.array([len(t) for t in self.timepoints],
+                                                                      dtype=np.intp).reshape(-1, 1)
+
+        estimationIndex = {key: i for i, key in enumerate(self.estimations)}
+        interventionIndex = {intervention: i for i, intervention in enumerate(self.interventions)}
+        trendIndex = {trend: i for i, trend in enumerate(self.trendAssumptions)}
+        numItems, numTimepoints = len(self.items), self.numTimepoints
+
+        # Item arrays, padded with zero patients and costs after the last timepoint of an estimation
+        self.patients = np.zeros((numItems, numTimepoints))
+        self.costs = np.zeros((numItems, numTimepoints))
+        self.estimationOfItem = np.zeros(numItems, dtype=np.intp)
+        self.isSubstitution = np.zeros(numItems, dtype=bool)
+        # Interventions of each item as indexes, padded with len(interventions) (a factor of 1)
+        maxInterventions = max((len(key[3]) for key in self.items), default=0)
+        self.interventionsOfItem = np.full((numItems, maxInterventions), len(self.interventions), dtype=np.intp)
+        self.trendOfItem = np.full(numItems, -1, dtype=np.intp)
+        for i, key in enumerate(self.items):
+            values = items[key]
+            self.patients[i, :len(values['patients'])] = values['patients']
+            self.costs[i, :len(values['costs'])] = values['costs']
+            self.estimationOfItem[i] = estimationIndex[key[:2]]
+            self.isSubstitution[i] = key[2] == SUBSTITUTION
+            for k, intervention in enumerate(key[3]):
+                self.interventionsOfItem[i, k] = interventionIndex[intervention]
+            trend = estimations[key[:2]][1]
+            if trend in trendIndex:
+                self.trendOfItem[i] = trendIndex[trend]
+        self.trendOfEstimation = np.array([trendIndex.get(estimations[key][1], -1) for key in self.estimations],
+                                          dtype=np.intp)
+        # Number of timepoints of each intervention and trend assumption, for per-timepoint factors
+        occurs = np.zeros((len(self.estimations), len(self.interventions) + 1), dtype=bool)
+        occurs[self.estimationOfItem.reshape(-1, 1), self.interventionsOfItem] = True
+        self.interventionTimepoints = self._timepointsOf(occurs[:, :-1])
+        self.trendTimepoints = self._timepointsOf(self.trendOfEstimation.reshape(-1, 1) == np.arange(len(trendIndex)))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.unitCosts = np.where(self.patients != 0, self.costs / self.patients, 0.0)
+        # Items that are fixed costs (no patients) keep their costs under patient changes
+        self.fixedCosts = np.where(self.patients == 0, self.costs, 0.0)
+
+        # Baseline market penetration per trend assumption; trend rows come in timepoint order
+        self.penetration = np.ones((len(self.trendAssumptions), numTimepoints))
+        filled = {}
+        for row in trendRows:
+            trend = trendIndex.get(row['trend_assumption'])
+            if trend is None:
+                continue
+            column = filled[trend] = filled.get(trend, -1) + 1
+            if row['market_penetration'] is not None and column < numTimepoints:
+                self.penetration[trend, column] = row['market_penetration']
+
+        # The stated totals and budget impacts, to check the recomputation against
+        self.stated = {}
+        for row in costRows:
+            if row['cost_type'] in DERIVED_TYPES:
+                key = (row['statement'], row['cost_estimation'], row['cost_type'])
+                self.stated.setdefault(key, []).append(row['costs'])
+
+        # The convention each estimation's stated costs match, and the one the model uses
+        self.isAddOn = np.zeros(len(self.estimations), dtype=bool)
+        replacement = self.evaluate()
+        self.isAddOn[:] = True
+        addOn = self.evaluate()
+        self.statedConventions = [ADD_ON if self._deviation(addOn, e) < self._deviation(replacement, e) else REPLACEMENT
+                                  for e in range(len(self.estimations))]
+        conventions = conventions or {}
+        unknown = set(conventions) - {estimation for _, estimation in self.estimations}
+        if unknown:
+            raise KeyError(f"Unknown cost estimation id(s): {', '.join(sorted(unknown))}")
+        for convention in conventions.values():
+            if convention not in CONVENTIONS:
+                raise ValueError(f"Unknown convention '{convention}', expected one of: {', '.join(CONVENTIONS)}")
+        self.conventions = [conventions.get(estimation, stated)
+                            for (_, estimation), stated in zip(self.estimations, self.statedConventions)]
+        self.isAddOn = np.array([convention == ADD_ON for convention in self.conventions], dtype=bool)
+
+    @classmethod
+    def fromPackageStatements(cls, datas: dict, conventions: dict = None) -> 'BudgetImpactModel':
+        """Builds the model from parsed package statement YAML documents, keyed by statement name."""
+        costRows, trendRows = [], []
+        for statement, data in datas.items():
+            costRows.extend(_rows(costEstimationColumns(data, statement)))
+            trendRows.extend(_rows(trendAssumptionColumns(data, statement)))
+        return cls(costRows, trendRows, conventions)
+
+    @classmethod
+    def fromYamlFiles(cls, fileNames: list[str], conventions: dict = None) -> 'BudgetImpactModel':
+        datas = {}
+        for fileName in fileNames:
+            with open(fileName, 'r') as f:
+                datas[os.path.splitext(os.path.basename(fileName))[0]] = yaml.safe_load(f)
+        return cls.fromPackageStatements(datas, conventions)
+
+    @classmethod
+    def fromTables(cls, costTable, trendTable=None, conventions: dict = None) -> 'BudgetImpactModel':
+        """Builds the model from the Arrow tables written by bia_export.py."""
+        return cls(costTable.to_pylist(), trendTable.to_pylist() if trendTable is not None else [], conventions)
+
+    @classmethod
+    def fromGraph(cls, graph, statement: str, conventions: dict = None) -> 'BudgetImpactModel':
+        """Builds the model from the qb:Observations of a generated package statement graph."""
+        result = graph.query("""
+            PREFIX fpr: <https://w3id.org/zinl/fpr-o#>
+            PREFIX qb: <http://purl.org/linked-data/cube#>
+            PREFIX prov: <http://www.w3.org/ns/prov#>
+            SELECT ?obs ?dataset ?scenario ?trend ?costType ?timepoint ?patients ?costs
+                (GROUP_CONCAT(STR(?intervention); separator=" ") AS ?interventions)
+            {
+                ?obs qb:dataSet ?dataset ;
+                    fpr:hasCostType ?costType ;
+                    fpr:hasTimepoint ?timepoint ;
+                    fpr:hasNumberOfPatients ?patients ;
+                    fpr:hasTotalCosts ?costs .
+                OPTIONAL { ?obs fpr:hasIntervention ?intervention }
+                OPTIONAL { ?dataset fpr:hasScenario ?scenario }
+                OPTIONAL { ?dataset prov:wasDerivedFrom ?trend }
+            }
+            GROUP BY ?obs ?dataset ?scenario ?trend ?costType ?timepoint ?patients ?costs
+        """)
+        costRows = [{
+            'statement': statement,
+            'cost_estimation': str(row.dataset),
+            'scenario': str(row.scenario) if row.scenario else None,
+            'trend_assumption': str(row.trend) if row.trend else None,
+            'cost_type': str(row.costType).rpartition('#')[2],
+            'interventions': sorted(str(row.interventions).split()),
+            'timepoint': str(row.timepoint),
+            'patients': int(row.patients),
+            'costs': float(row.costs),
+        } for row in result]
+        # The rows of an item in timepoint order, by value and not as strings
+        costRows.sort(key=lambda row: (row['cost_estimation'], row['cost_type'], row['interventions'],
+                                       _timepointKey(row['timepoint'])))
+        return cls(costRows, conventions=conventions)
+
+    def penetrationFactors(self, trendAssumption: str, curve) -> np.ndarray:
+        """Factors that replace the market penetration of a trend assumption by curve (per timepoint)."""
+        baseline = self.penetration[self.trendAssumptions.index(trendAssumption)]
+        curve = np.broadcast_to(np.asarray(curve, dtype=float), baseline.shape)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(baseline != 0, curve / baseline, 1.0)
+
+    def _timepointsOf(self, estimations: np.ndarray) -> np.ndarray:
+        """
+        The number of timepoints of each name in an estimation × name array of whether the name occurs
+        in the estimation: the most of the estimations it occurs in.
+        """
+        counts = np.zeros(estimations.shape[1], dtype=np.intp)
+        for e, i in zip(*np.nonzero(estimations)):
+            counts[i] = max(counts[i], len(self.timepoints[e]))
+        return counts
+
+    def _factors(self, factors: dict, names: list[str], numScenarios: int, numTimepoints: np.ndarray) -> np.ndarray:
+        """
+        Scenario × name × timepoint array of multipliers from {name: [factor per scenario]}, with an
+        extra name of factor 1 at the end for padding. Per-timepoint factors must have one value for
+        each of the numTimepoints of their name; the columns after those stay 1.
+        """
+        result = np.ones((numScenarios, len(names) + 1, self.numTimepoints))
+        index = {name: i for i, name in enumerate(names)}
+        for name, values in (factors or {}).items():
+            if name not in index:
+                raise KeyError(f"Unknown id '{name}', expected one of: {', '.join(names)}")
+            # values: per scenario a factor or per-timepoint factors
+            values = np.asarray(values, dtype=float).reshape(numScenarios, -1)
+            count = numTimepoints[index[name]]
+            if values.shape[1] not in (1, count):
+                raise ValueError(f"'{name}' has {count} timepoint(s), got {values.shape[1]} factors")
+            result[:, index[name], :count] = np.broadcast_to(values, (numScenarios, count))
+        return result
+
+    def _sumItems(self, values: np.ndarray, selection: np.ndarray, ufunc=np.add) -> np.ndarray:
+        """Scenario × estimation × timepoint sums (or maximums with np.maximum) of the selected items."""
+        result = np.zeros((values.shape[0], len(self.estimations), self.numTimepoints))
+        ufunc.at(result.swapaxes(0, 1), self.estimationOfItem[selection], values[:, selection, :].swapaxes(0, 1))
+        return result
+
+    def _evaluate(self, price: dict, patients: dict, penetration: dict, numScenarios: int) -> dict:
+        priceFactors = self._factors(price, self.interventions, numScenarios, self.interventionTimepoints)
+        patientFactors = self._factors(patients, self.interventions, numScenarios, self.interventionTimepoints)
+        penetrationFactors = self._factors(penetration, self.trendAssumptions, numScenarios, self.trendTimepoints)
+
+        # Items of more than one intervention get the product of the factors of their interventions
+        itemPrice = priceFactors[:, self.interventionsOfItem, :].prod(axis=2)
+        itemPatients = patientFactors[:, self.interventionsOfItem, :].prod(axis=2)
+        patientNumbers = self.patients * itemPatients
+        costs = (patientNumbers * self.unitCosts + self.fixedCosts) * itemPrice
+
+        isCurrent = ~self.isSubstitution
+        currentCosts = self._sumItems(costs, isCurrent)
+        currentPatients = self._sumItems(patientNumbers, isCurrent)
+        switching = self._sumItems(patientNumbers, self.isSubstitution, np.maximum)
+        estimationPenetration = np.ones((numScenarios, len(self.estimations), self.numTimepoints))
+        withTrend = self.trendOfEstimation >= 0
+        estimationPenetration[:, withTrend, :] = penetrationFactors[:, self.trendOfEstimation[withTrend], :]
+
+        # Patients that no longer (or, if negative, also) switch go to the Current items. Share of the
+        # Current items in the situation after introduction: all (add-on) or none (replacement), plus those
+        addOn = self.isAddOn.reshape(1, -1, 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            moved = np.where(currentPatients != 0, switching * (1 - estimationPenetration) / currentPatients, 0.0)
+            allOnCurrent = np.where(addOn & (currentPatients != 0), switching / currentPatients, 0.0)
+        currentShare = np.clip(addOn + moved, 0.0, None)
+
+        itemScale = np.where(self.isSubstitution.reshape(1, -1, 1), estimationPenetration[:, self.estimationOfItem, :],
+                             np.where(addOn[:, self.estimationOfItem, :], currentShare[:, self.estimationOfItem, :], 1.0))
+        itemCosts = np.where(self.isSubstitution.reshape(1, -1, 1), costs * itemScale, costs)
+        # The costs before introduction (all patients on the current treatment) and after it
+        current = currentCosts * (1 + allOnCurrent)
+        total = self._sumItems(itemCosts, self.isSubstitution) + currentCosts * currentShare
+
+        mask = self.timepointMask
+        itemMask = mask[self.estimationOfItem]
+        masked = lambda array, m: np.where(m, array, np.nan)
+        return {'current': masked(current, mask), 'total': masked(total, mask), 'impact': masked(total - current, mask),
+                'itemPatients': masked(patientNumbers * itemScale, itemMask),
+                'itemCosts': masked(costs * itemScale, itemMask)}
+
+    def evaluate(self, price: dict = None, patients: dict = None, penetration: dict = None) -> dict:
+        """
+        Recomputes all estimations for one what-if scenario. Returns estimation × timepoint arrays
+        'current' (all patients on the current treatment), 'total' and 'impact' (total − current) and
+        item × timepoint arrays 'itemPatients' and 'itemCosts', the line items as stated in the
+        estimation's convention. Factors may be a factor or a sequence of per-timepoint factors.
+        """
+        wrap = lambda factors: {name: [value] for name, value in (factors or {}).items()}
+        result = self._evaluate(wrap(price), wrap(patients), wrap(penetration), 1)
+        return {name: array[0] for name, array in result.items()}
+
+    def sweep(self, grid: dict) -> tuple[list[dict], dict]:
+        """
+        Evaluates every combination of the parameter values in grid, a dict of
+        ('price' | 'patients' | 'penetration', id) → list of values, in one vectorized pass.
+        Returns the combinations and arrays like evaluate() with a leading scenario axis.
+        """
+        keys = list(grid)
+        combinations = [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+        parameters = {'price': {}, 'patients': {}, 'penetration': {}}
+        for key in keys:
+            kind, name = key
+            parameters[kind][name] = [combination[key] for combination in combinations]
+        numScenarios = max(len(combinations), 1)
+        return combinations, self._evaluate(parameters['price'], parameters['patients'],
+                                            parameters['penetration'], numScenarios)
+
+    def _deviation(self, result: dict, e: int) -> float:
+        """Sum of the differences between the stated and the recomputed Total and Additional costs of estimation e."""
+        statement, estimation = self.estimations[e]
+        deviation = 0.0
+        for costType, computed in (('Total', result['total'][e]), ('Additional', result['impact'][e])):
+            for t, value in enumerate(self.stated.get((statement, estimation, costType), [])[:len(self.timepoints[e])]):
+                deviation += abs(value - computed[t])
+        return deviation
+
+    def check(self, tolerance: float = 1.0, relativeTolerance: float = 1e-5) -> list[str]:
+        """
+        Returns the stated Total and Additional costs that differ from the recomputed ones by more than
+        tolerance or relativeTolerance of the stated costs (the stated costs are rounded from unit costs),
+        and the estimations whose convention differs from the one their stated costs match.
+        """
+        baseline = self.evaluate()
+        problems = []
+        for e, (statement, estimation) in enumerate(self.estimations):
+            if self.conventions[e] != self.statedConventions[e]:
+                problems.append(f"{statement} {estimation}: stated costs follow the {self.statedConventions[e]} "
+                                f"convention, not {self.conventions[e]}")
+            for costType, computed in (('Total', baseline['total'][e]), ('Additional', baseline['impact'][e])):
+                stated = self.stated.get((statement, estimation, costType))
+                if stated is None:
+                    continue
+                for t, value in enumerate(stated[:len(self.timepoints[e])]):
+                    if abs(value - computed[t]) > max(tolerance, relativeTolerance * abs(value)):
+                        problems.append(f"{statement} {estimation}: {costType} at {self.timepoints[e][t]} is "
+                                        f"{value:,.0f}, recomputed {computed[t]:,.0f}")
+        return problems
+
+
+def parseFactor(text: str) -> list[float]:
+    """Parses '0.8' or '0.2,0.4,0.5' (per timepoint)."""
+    values = [float(value) for value in text.split(',')]
+    return values[0] if len(values) == 1 else values
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Recompute the budget impact of package statements, with what-if changes")
+    parser.add_argument("inputs", type=str, nargs="+", help="Package statement YAML files")
+    parser.add_argument("--price", type=str, nargs=2, action="append", default=[], metavar=("INTERVENTION", "FACTOR"),
+                        help="Multiply the unit costs of an intervention")
+    parser.add_argument("--patients", type=str, nargs=2, action="append", default=[], metavar=("INTERVENTION", "FACTOR"),
+                        help="Multiply the number of patients of an intervention")
+    parser.add_argument("--penetration", type=str, nargs=2, action="append", default=[],
+                        metavar=("TREND_ASSUMPTION", "FACTORS"),
+                        help="Multiply the market penetration of a trend assumption, optionally per timepoint (0.5,0.8,1)")
+    parser.add_argument("--convention", type=str, nargs=2, action="append", default=[],
+                        metavar=("COST_ESTIMATION", "CONVENTION"),
+                        help=f"Convention of the Total and Additional costs of a cost estimation ({', '.join(CONVENTIONS)}; "
+                             f"default: the one its stated costs match)")
+    parser.add_argument("--check", action="store_true",
+                        help="Report stated Total/Additional costs that differ from the recomputed costs")
+    args = parser.parse_args()
+
+    try:
+        model = BudgetImpactModel.fromYamlFiles(args.inputs, dict(args.convention))
+        if args.check:
+            problems = model.check()
+            for problem in problems:
+                print(problem)
+            sys.exit(1 if problems else 0)
+
+        result = model.evaluate(price={i: parseFactor(f) for i, f in args.price},
+                                patients={i: parseFactor(f) for i, f in args.patients},
+                                penetration={t: parseFactor(f) for t, f in args.penetration})
+    except (KeyError, ValueError) as e:
+        # Unknown ids, conventions, and factors that are not numbers or do not match the timepoints
+        parser.error(e.args[0] if e.args else str(e))
+    print("statement\tcost estimation\tscenario\ttimepoint\tcurrent\ttotal\tbudget impact")
+    for e, (statement, estimation) in enumerate(model.estimations):
+        for t, timepoint in enumerate(model.timepoints[e]):
+            print(f"{statement}\t{estimation}\t{model.scenarios[e]}\t{timepoint}\t"
+                  f"{result['current'][e, t]:.0f}\t{result['total'][e, t]:.0f}\t{result['impact'][e, t]:.0f}")
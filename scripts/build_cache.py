@@ -0,0 +1,67 @@
+import hashlib
+import json
+import os
+
+
+def hashFile(fileName: str) -> str:
+    """Returns the SHA-256 hex digest of a file's contents."""
+    h = hashlib.sha256()
+    with open(fileName, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BuildCache:
+    """
+    Manifest of content hashes for incremental rebuilds.
+
+    An output is up to date when the hash of its input, the hash of the code it was
+    generated with (the dependency files plus any extra version strings) and the hash
+    of the output file itself all match what was recorded when it was last built.
+    The manifest is a JSON file and is only written by the process calling save().
+    """
+
+    def __init__(self, manifestFileName: str, dependencies: list[str], versions: dict = None):
+        self.manifestFileName = manifestFileName
+        h = hashlib.sha256()
+        for fileName in sorted(dependencies):
+            h.update(os.path.basename(fileName).encode())
+            h.update(hashFile(fileName).encode())
+        for key, value in sorted((versions or {}).items()):
+            h.update(f"{key}={value}".encode())
+        self.codeHash = h.hexdigest()
+        self.entries = {}
+        if os.path.exists(manifestFileName):
+            with open(manifestFileName, 'r') as f:
+                manifest = json.load(f)
+            self.entries = manifest.get('entries', {})
+
+    def _key(self, inputFileName: str, outputFileName: str) -> str:
+        return f"{os.path.normpath(inputFileName)} -> {os.path.normpath(outputFileName)}"
+
+    def isUpToDate(self, inputFileName: str, outputFileName: str, options: str = "") -> bool:
+        entry = self.entries.get(self._key(inputFileName, outputFileName))
+        if entry is None or not os.path.exists(outputFileName):
+            return False
+        return (entry['code'] == self.codeHash
+                and entry['options'] == options
+                and entry['input'] == hashFile(inputFileName)
+                and entry['output'] == hashFile(outputFileName))
+
+    def update(self, inputFileName: str, outputFileName: str, options: str = ""):
+        self.entries[self._key(inputFileName, outputFileName)] = {
+            'code': self.codeHash,
+            'options': options,
+            'input': hashFile(inputFileName),
+            'output': hashFile(outputFileName),
+        }
+
+    def save(self):
+        directory = os.path.dirname(self.manifestFileName)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmpFileName = self.manifestFileName + '.tmp'
+        with open(tmpFileName, 'w') as f:
+            json.dump({'entries': self.entries}, f, indent=2, sort_keys=True)
+        os.replace(tmpFileName, self.manifestFileName)
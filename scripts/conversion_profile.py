@@ -0,0 +1,89 @@
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class ConversionProfile:
+    """
+    Wall time, triples added and (with memory) peak memory of the phases of one conversion and of the
+    sections of addPackageStatement. Sections are measured between calls to mark(), so the converter only
+    needs one call where each section starts. Memory is measured with tracemalloc, which slows down the
+    conversion, so it is only traced when asked for.
+    """
+
+    def __init__(self, statement: str, memory: bool = False):
+        self.statement = statement
+        self.memory = memory
+        self.phases = {}
+        self.sections = {}
+        self.triples = 0
+        self._section = None
+        self._start = time.perf_counter()
+        self._stopTracing = memory and not tracemalloc.is_tracing()
+        if self._stopTracing:
+            tracemalloc.start()
+
+    def _begin(self) -> tuple:
+        if self.memory:
+            tracemalloc.reset_peak()
+            return time.perf_counter(), tracemalloc.get_traced_memory()[0]
+        return time.perf_counter(), 0
+
+    def _measurement(self, begin: tuple) -> dict:
+        start, startMemory = begin
+        result = {'seconds': round(time.perf_counter() - start, 6)}
+        if self.memory:
+            result['peakMemory'] = tracemalloc.get_traced_memory()[1] - startMemory
+        return result
+
+    @contextmanager
+    def phase(self, name: str):
+        """Measures a phase of the conversion, such as parsing the YAML or serializing the graph."""
+        begin = self._begin()
+        try:
+            yield
+        finally:
+            self.phases[name] = self._measurement(begin)
+
+    def mark(self, section: str, g):
+        """Ends the current section of addPackageStatement, if any, and starts the next one."""
+        self.endSection(g)
+        self._section = section, len(g), self._begin()
+
+    def endSection(self, g):
+        if self._section is None:
+            return
+        section, triples, begin = self._section
+        result = self._measurement(begin)
+        result['triples'] = len(g) - triples
+        self.sections[section] = result
+        self.triples = len(g)
+        self._section = None
+
+    def report(self) -> dict:
+        if self._stopTracing:
+            tracemalloc.stop()
+            self._stopTracing = False
+        return {
+            'statement': self.statement,
+            'seconds': round(time.perf_counter() - self._start, 6),
+            'triples': self.triples,
+            'phases': self.phases,
+            'sections': self.sections,
+        }
+
+
+def formatReport(report: dict) -> str:
+    """One JSON line per conversion, for log files and metrics collectors."""
+    return json.dumps(report, separators=(',', ':'))
+
+
+def writeReport(report: dict, fileName: str):
+    """Appends the report as a JSON line to fileName, or writes it to stderr if fileName is '-'."""
+    if fileName == '-':
+        print(formatReport(report), file=sys.stderr)
+        return
+    with open(fileName, 'a') as f:
+        f.write(formatReport(report) + '\n')
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+# Extracts small modules from the external ontologies, with only the terms the FPR build refers to.
+# Similar to `robot extract --method mireot`: each term keeps its own annotations and types and the chain of
+# its named superclasses, anonymous class expressions are left out.
+import argparse
+import glob
+import hashlib
+import os
+import sys
+from rdflib import Graph, URIRef, BNode
+from rdflib.namespace import RDFS
+
+from build_cache import hashFile
+from graph_cache import GraphCache
+from prefixes import loadPrefixes, expandCurie
+from robot_template import ROOT_DIR, loadOntology, readTemplate, parseTemplateString, shortForm
+
+
+TEMPLATES = [
+    'src/model/classes.tsv',
+    'src/model/object-properties.tsv',
+    'src/model/data-properties.tsv',
+    'src/model/instances.tsv',
+    'src/data/taxonomy.tsv',
+]
+
+# Namespaces in scripts/package_statements.py with terms from the external ontologies
+CODE_NAMESPACES = ['STATO', 'IAO', 'RO', 'UO', 'OBI', 'FABIO']
+
+
+def templateSignature(templateFileNames: list[str], prefixes: dict) -> set[str]:
+    """
+    Returns every name a template may use to refer to a term: the cells, their split values and
+    the words of 'property value' cells, the properties in the template strings, and CURIEs expanded to IRIs.
+    """
+    names = set()
+    for fileName in templateFileNames:
+        template, rows = readTemplate(fileName)
+        for templateString in template:
+            keyword, argument, _ = parseTemplateString(templateString)
+            names.add(argument.rpartition('@')[0] or argument.rpartition('^^')[0] or argument)
+        for row in rows:
+            for cell in row:
+                names.add(cell)
+                names.update(cell.split('|'))
+                for value in cell.split('|'):
+                    names.update(value.split())
+    names.update([expandCurie(name, prefixes) for name in names])
+    names.discard('')
+    return names
+
+
+def codeSignature() -> set[str]:
+    """Returns the IRIs of the external terms used by the package statement converter."""
+    import package_statements
+    iris = set()
+    for name in CODE_NAMESPACES:
+        namespace = getattr(package_statements, name)
+        for attribute, value in vars(namespace).items():
+            if isinstance(value, URIRef):
+                iris.add(str(value))
+        for attribute in getattr(namespace, '__annotations__', {}):
+            if not attribute.startswith('_'):
+                iris.add(str(namespace._NS[attribute]))
+    return iris
+
+
+def extractModule(g: Graph, signature: set[str]) -> Graph:
+    """Returns the terms of g named in signature, by IRI, label or local name, with their named superclasses."""
+    terms = set()
+    for s in set(g.subjects()):
+        if not isinstance(s, URIRef):
+            continue
+        if str(s) in signature or shortForm(str(s)) in signature \
+                or any(str(label) in signature for label in g.objects(s, RDFS.label)):
+            terms.add(s)
+
+    # MIREOT upper terms: the superclasses and superproperties up to the top
+    todo = list(terms)
+    while todo:
+        term = todo.pop()
+        for p in (RDFS.subClassOf, RDFS.subPropertyOf):
+            for parent in g.objects(term, p):
+                if isinstance(parent, URIRef) and parent not in terms:
+                    terms.add(parent)
+                    todo.append(parent)
+
+    module = Graph()
+    for term in terms:
+        for p, o in g.predicate_objects(term):
+            if not isinstance(o, BNode):
+                module.add((term, p, o))
+    return module
+
+
+class ModuleCache:
+    """
+    Extracted modules stored as N-Triples files in a cache directory. A module is named after its
+    source file and a hash of the file, the signature and this extractor, so it is extracted again only
+    when one of those changes. Stale modules of the same source file are removed.
+    """
+
+    def __init__(self, cacheDir: str, prefixes: dict, signature: set[str], graphCache=None):
+        self.cacheDir = cacheDir
+        self.prefixes = prefixes
+        self.signature = signature
+        self.graphCache = graphCache
+        h = hashlib.sha256()
+        for name in sorted(signature):
+            h.update(name.encode('utf-8') + b'\n')
+        h.update(hashFile(__file__).encode())
+        self.signatureHash = h.hexdigest()
+
+    def path(self, fileName: str) -> str:
+        h = hashlib.sha256(f"{hashFile(fileName)} {self.signatureHash}".encode()).hexdigest()[:16]
+        return os.path.join(self.cacheDir, f"{os.path.basename(fileName)}-{h}.nt")
+
+    def load(self, fileName: str) -> Graph:
+        """Returns the module for an external ontology file, extracting it if it is not cached yet."""
+        moduleFileName = self.path(fileName)
+        if os.path.exists(moduleFileName):
+            return Graph().parse(moduleFileName, format='nt')
+        module = extractModule(loadOntology(fileName, self.prefixes, self.graphCache), self.signature)
+        os.makedirs(self.cacheDir, exist_ok=True)
+        for stale in glob.glob(os.path.join(self.cacheDir, glob.escape(os.path.basename(fileName)) + '-*.nt')):
+            os.remove(stale)
+        tmpFileName = moduleFileName + '.tmp'
+        module.serialize(tmpFileName, format='nt', encoding='utf-8')
+        os.replace(tmpFileName, moduleFileName)
+        return module
+
+
+def createModuleCache(cacheDir: str, prefixes: dict, graphCache=None) -> ModuleCache:
+    templates = [os.path.join(ROOT_DIR, fileName) for fileName in TEMPLATES]
+    return ModuleCache(cacheDir, prefixes, templateSignature(templates, prefixes) | codeSignature(), graphCache)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Extract modules with the terms used by FPR from external ontologies")
+    parser.add_argument("inputs", type=str, nargs="+", help="External ontology files")
+    parser.add_argument("--output-dir", type=str, required=True, help="Directory for the cached modules")
+    parser.add_argument("--prefixes", type=str, default=os.path.join(ROOT_DIR, 'src', 'prefixes.jsonld'),
+                        help="JSON-LD context with the prefixes used in the templates")
+    parser.add_argument("--graph-cache", type=str, default=None, help="Directory of cached parsed external ontologies")
+    args = parser.parse_args()
+
+    graphCache = GraphCache(args.graph_cache) if args.graph_cache else None
+    cache = createModuleCache(args.output_dir, loadPrefixes(args.prefixes), graphCache)
+    for inputFileName in args.inputs:
+        cached = os.path.exists(cache.path(inputFileName))
+        module = cache.load(inputFileName)
+        print(f"{inputFileName}: {len(module)} triples{' (cached)' if cached else ''}", file=sys.stderr)
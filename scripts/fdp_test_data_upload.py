@@ -1,34 +1,114 @@
-import requests
+import argparse
 import csv
 import hashlib
+import json
+import os
+import queue
+import threading
+import urllib.parse
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+DEFAULT_EMAIL = "albert.einstein@example.com"
+# DEFAULT_PASSWORD = "password"
+DEFAULT_PASSWORD = "zJdDvlpam#i9118W"
+
+# Responses that are retried with exponential backoff
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+# Responses to a non-idempotent request (POST) that are retried, if they have a Retry-After header
+RETRY_AFTER_STATUS_CODES = [429, 503]
+
+
+class IdempotentRetry(Retry):
+    """
+    Retries requests of allowed_methods (by default the idempotent ones, not POST) on RETRY_STATUS_CODES
+    and read errors. Other requests may already have been processed, e.g. a POST that created a
+    dataset, so they are only retried when the server asks to try again later: 429 or 503 with
+    Retry-After. Requests whose connection failed are always retried, as they were not sent.
+    """
 
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if self._is_method_retryable(method):
+            return super().is_retry(method, status_code, has_retry_after)
+        return bool(self.total and has_retry_after and status_code in RETRY_AFTER_STATUS_CODES)
 
-def get_token(url):
+
+def create_session(pool_size=8, retries=5, backoff_factor=0.5, allowed_methods=Retry.DEFAULT_ALLOWED_METHODS):
+    """
+    Creates a session that keeps up to pool_size connections per host open and retries requests
+    answered with 429 or 5xx (see IdempotentRetry), waiting backoff_factor * 2^n seconds (or Retry-After).
+    """
+    retry = IdempotentRetry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=allowed_methods,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_token(url, email=DEFAULT_EMAIL, password=DEFAULT_PASSWORD, session=requests):
     headers = {
         "Accept": "application/json",
         "Content-Type": "application/json"
     }
 
     data = {
-        "email": "albert.einstein@example.com",
-        # "password": "password"
-        "password": "zJdDvlpam#i9118W"
+        "email": email,
+        "password": password
     }
 
-    response = requests.post(url, json=data, headers=headers)
+    response = session.post(url, json=data, headers=headers)
     response.raise_for_status()
     token = response.json().get("token")
 
     return token
 
 
-def add_dataset(url, token, dataset_info):
-    headers = {
-        "Accept": "text/turtle",
-        "Content-Type": "text/turtle",
-        "Authorization": f"Bearer {token}"
-    }
-    
+class FDPClient:
+    """
+    Authenticated access to a FAIR Data Point that can be shared between threads.
+    All requests go through one pooled session. The token is fetched once and
+    refreshed (by one thread only) when the FDP answers 401.
+    """
+
+    def __init__(self, baseurl, email=DEFAULT_EMAIL, password=DEFAULT_PASSWORD, session=None):
+        self.baseurl = baseurl
+        self.email = email
+        self.password = password
+        self.session = session or create_session()
+        self._token = None
+        self._lock = threading.Lock()
+
+    def get_token(self, expired=None):
+        """Returns the cached token, fetching a new one if there is none or if it equals expired."""
+        with self._lock:
+            if self._token is None or self._token == expired:
+                self._token = get_token(f"{self.baseurl}tokens", self.email, self.password, self.session)
+            return self._token
+
+    def request(self, method, url, headers, **kwargs):
+        token = self.get_token()
+        response = self.session.request(method, url, headers={**headers, "Authorization": f"Bearer {token}"}, **kwargs)
+        if response.status_code == 401:
+            token = self.get_token(expired=token)
+            response = self.session.request(method, url, headers={**headers, "Authorization": f"Bearer {token}"}, **kwargs)
+        return response
+
+
+def get_dataset_body(dataset_info):
     body = f"""
             <> a dcat:Resource, dcat:Dataset;
         <http://www.w3.org/2000/01/rdf-schema#label> "Dataset" ;
@@ -118,7 +198,19 @@ def add_dataset(url, token, dataset_info):
         <http://semanticscience.org/resource/SIO_000332> <https://www.wikidata.org/wiki/Q8777> .
     """
 
-    response = requests.post(url, data=body, headers=headers)
+    return body
+
+
+def add_dataset(client, url, dataset_info, body=None):
+    headers = {
+        "Accept": "text/turtle",
+        "Content-Type": "text/turtle"
+    }
+
+    if body is None:
+        body = get_dataset_body(dataset_info)
+
+    response = client.request("POST", url, headers, data=body.encode("utf-8"))
     assert response.status_code == 201, f"Failed to add dataset: {response.text}"
     
     location = response.headers.get("Location")
@@ -126,10 +218,9 @@ def add_dataset(url, token, dataset_info):
     return location
 
 
-def publish_dataset(location, token):
+def publish_dataset(client, location):
 
     headers = {
-        "Authorization": f"Bearer {token}",
         "Accept": "application/json",
         "Content-Type": "application/json"
     }
@@ -137,11 +228,117 @@ def publish_dataset(location, token):
     data = '{"current": "PUBLISHED"}'
 
     url = f"{location}/meta/state"
-    response = requests.put(url, headers=headers, data=data)
+    response = client.request("PUT", url, headers, data=data)
     
     return response.status_code
 
 
+def update_dataset(client, location, dataset_info):
+    headers = {
+        "Accept": "text/turtle",
+        "Content-Type": "text/turtle"
+    }
+
+    body = get_dataset_body(dataset_info)
+
+    response = client.request("PUT", location, headers, data=body.encode("utf-8"))
+    assert response.status_code == 200, f"Failed to update dataset: {response.text}"
+
+    return response.status_code
+
+
+def delete_dataset(client, location):
+    response = client.request("DELETE", location, {"Accept": "application/json"})
+    assert response.status_code in (200, 204, 404), f"Failed to delete dataset: {response.text}"
+
+    return response.status_code
+
+
+def upload_dataset(client, dataset_info, body=None):
+    """Adds and publishes one dataset. Returns the dataset location and the publish status code."""
+    location = add_dataset(client, f"{client.baseurl}dataset", dataset_info, body)
+    status = publish_dataset(client, location)
+    return location, status
+
+
+_DONE = object()
+
+
+def run_pipeline(source, stages, queue_size=16):
+    """
+    Runs a pipeline of threads joined by bounded queues and yields the output of the last stage.
+    source is iterated in its own thread; stages is a list of (function, number of threads) and
+    each function maps one item to the item passed on to the next stage. As every queue holds at
+    most queue_size items, memory use does not depend on the length of source, and all stages
+    run concurrently. Results of stages with more than one thread arrive out of order. The first
+    exception raised by the source or a stage is re-raised after the pipeline has drained.
+    """
+    queues = [queue.Queue(queue_size) for _ in range(len(stages) + 1)]
+    errors = []
+
+    def feed():
+        try:
+            for item in source:
+                queues[0].put(item)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            queues[0].put(_DONE)
+
+    def work(function, in_queue, out_queue, remaining, lock):
+        while True:
+            item = in_queue.get()
+            if item is _DONE:
+                # Pass the marker on to the other threads of this stage
+                in_queue.put(_DONE)
+                break
+            try:
+                out_queue.put(function(item))
+            except Exception as e:
+                errors.append(e)
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                out_queue.put(_DONE)
+
+    threads = [threading.Thread(target=feed, daemon=True)]
+    for i, (function, thread_count) in enumerate(stages):
+        remaining, lock = [thread_count], threading.Lock()
+        threads += [threading.Thread(target=work, args=(function, queues[i], queues[i + 1], remaining, lock), daemon=True)
+                    for _ in range(thread_count)]
+    for thread in threads:
+        thread.start()
+
+    while True:
+        item = queues[-1].get()
+        if item is _DONE:
+            break
+        yield item
+    if errors:
+        raise errors[0]
+
+
+def upload_datasets(client, dataset_infos, parallelism=4, queue_size=16):
+    """
+    Uploads datasets as a pipeline: dataset_infos (which may be a lazy generator, for example over
+    the rows of a CSV file) is consumed in one thread, the metadata bodies are rendered in another,
+    and parallelism threads upload them, so rendering overlaps with network I/O and the first upload
+    starts right away. Yields, in completion order, (dataset_info, location, status, error) where
+    error is None or the exception raised.
+    """
+    def render(dataset_info):
+        return dataset_info, get_dataset_body(dataset_info)
+
+    def upload(item):
+        dataset_info, body = item
+        try:
+            return (dataset_info, *upload_dataset(client, dataset_info, body), None)
+        except Exception as e:
+            return dataset_info, None, None, e
+
+    yield from run_pipeline(dataset_infos, [(render, 1), (upload, parallelism)], queue_size)
+
+
 def get_dataset_info(title, version, description, identifier, isPartOf, keywords, healthThemes, page):
     keyword_string = ', '.join([f'"{kw.strip()}"' for kw in keywords])
     health_theme_string = ', '.join([f'<{ht.strip()}>' for ht in healthThemes])
@@ -160,27 +357,112 @@ def get_dataset_info(title, version, description, identifier, isPartOf, keywords
     return dataset_info
 
 
+def iter_pakketadviezen_csv(filepath):
+    """
+    Reads the ZIN pakketadviezen CSV file row by row, yielding dictionaries
+    with column headers as keys.
+    """
+    with open(filepath, newline='', encoding='utf-8-sig') as csvfile:
+        reader = csv.DictReader(csvfile, delimiter=';')
+        yield from reader
+
+
 def read_pakketadviezen_csv(filepath):
     """
     Reads the ZIN pakketadviezen CSV file and returns a list of dictionaries.
     Each dictionary represents a row with column headers as keys.
     """
-    with open(filepath, newline='', encoding='utf-8-sig') as csvfile:
-        reader = csv.DictReader(csvfile, delimiter=';')
-        return list(reader)
+    return list(iter_pakketadviezen_csv(filepath))
 
 
-baseurl = "https://fdp-zin.dci.thehyve.nl/"
+def load_sync_state(filepath):
+    """
+    Reads the sync state: for each dataset identifier the location it was uploaded to, the hash
+    of the metadata that was uploaded and whether it was published (missing means it was).
+    """
+    if not os.path.exists(filepath):
+        return {"datasets": {}}
+    with open(filepath, "r") as f:
+        return json.load(f)
 
-pakketadviezen = read_pakketadviezen_csv("../src/data/ZIN_pakketadviezen_2024_ChatGPT_20250917(2024 Pakketadviezen).csv")
-# catalog_uri="http://localhost/catalog/932dbf1b-38af-4fb0-8118-ebfad5dedd23"
-catalog_uri = "https://fdp-zin.dci.thehyve.nl/catalog/b4f2d88f-bd6e-44e7-a4a4-87861aab964d"
 
-token = get_token(f"{baseurl}tokens")
+def save_sync_state(filepath, state):
+    with open(f"{filepath}.tmp", "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(f"{filepath}.tmp", filepath)
 
-# Publicatiedatum;Aandoening;ICD-10;Indicatie;Behandeling;RxNorm;
-for row in pakketadviezen:
-    
+
+def get_dataset_hash(dataset_info):
+    return hashlib.sha256(get_dataset_body(dataset_info).encode("utf-8")).hexdigest()
+
+
+def sync_datasets(client, dataset_infos, state, parallelism=4, prune=False):
+    """
+    Brings the catalog in line with dataset_infos, using state (see load_sync_state) instead of
+    querying the catalog. New datasets are added and published, datasets whose metadata changed
+    are updated in place, and with prune datasets that are no longer listed are deleted.
+    A dataset that was added but could not be published is recorded as unpublished, and publishing
+    it (after updating it, if its metadata changed) is retried on the next sync instead of adding it
+    again. Unchanged datasets cost no requests. state is updated for every step that succeeds.
+    Yields (action, identifier, location, error) per action, where action is the step that failed
+    if error is not None.
+    """
+    known = state.setdefault("datasets", {})
+    wanted = {}
+    for dataset_info in dataset_infos:
+        if dataset_info["identifier"] in wanted:
+            print(f"Skipping duplicate dataset '{dataset_info['title']}'")
+            continue
+        wanted[dataset_info["identifier"]] = dataset_info
+
+    actions = []
+    for identifier, dataset_info in wanted.items():
+        entry = known.get(identifier)
+        if entry is None:
+            actions.append(("add", identifier, dataset_info))
+        elif not entry.get("published", True):
+            actions.append(("publish", identifier, dataset_info))
+        elif entry["hash"] != get_dataset_hash(dataset_info):
+            actions.append(("update", identifier, dataset_info))
+    if prune:
+        actions += [("delete", identifier, None) for identifier in known if identifier not in wanted]
+
+    def run(action):
+        """Returns (step, identifier, location, new state entry or None, error)."""
+        kind, identifier, dataset_info = action
+        location = known[identifier]["location"] if identifier in known else None
+        step = kind
+        try:
+            if kind == "delete":
+                delete_dataset(client, location)
+                return kind, identifier, location, None, None
+            if kind == "add":
+                location = add_dataset(client, f"{client.baseurl}dataset", dataset_info)
+            elif kind == "update" or known[identifier]["hash"] != get_dataset_hash(dataset_info):
+                step = "update"
+                update_dataset(client, location, dataset_info)
+            if kind != "update":
+                step = "publish"
+                status = publish_dataset(client, location)
+                assert 200 <= status < 300, f"Failed to publish dataset: status {status}"
+            return kind, identifier, location, {"location": location, "hash": get_dataset_hash(dataset_info)}, None
+        except Exception as e:
+            if step == "publish":
+                entry = {"location": location, "hash": get_dataset_hash(dataset_info), "published": False}
+                return step, identifier, location, entry, e
+            return step, identifier, location, None, e
+
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        for step, identifier, location, entry, error in executor.map(run, actions):
+            if step == "delete" and error is None:
+                del known[identifier]
+            elif entry is not None:
+                known[identifier] = entry
+            yield step, identifier, location, error
+
+
+def get_dataset_info_from_row(row, catalog_uri):
+    # Publicatiedatum;Aandoening;ICD-10;Indicatie;Behandeling;RxNorm;
     keywords = [ row["Aandoening"].strip(), 
                 # row["Indicatie"].strip(), 
                 row["Behandeling"].strip(), 
@@ -188,7 +470,7 @@ for row in pakketadviezen:
     health_theme = [ht.strip() for ht in row["Wikidata-geneesmiddel-URI"].split(";") if ht.strip()]
     health_theme += [ht.strip() for ht in row["Wikidata-Indicatie-URI"].split(";") if ht.strip()]
     
-    dataset_info = get_dataset_info(
+    return get_dataset_info(
         title=row["Naam besluit"],
         version="0.0.1",
         description=row["Samenvatting"],
@@ -198,12 +480,200 @@ for row in pakketadviezen:
         healthThemes=health_theme,
         page=row["PDF_link"]
     )
-    
-    location = add_dataset(f"{baseurl}dataset", token, dataset_info)
-    print(f"Dataset added at: {location}")
-    status = publish_dataset(location, token)
-    print(f"Publish status code: {status}")
-
 
 
+class LocalFDP:
+    """
+    In-process stand-in for a FAIR Data Point, for trying out and testing uploads without one. Serves
+    POST tokens (for email and password), POST dataset, PUT/GET/DELETE dataset/<id> and PUT
+    dataset/<id>/meta/state with bearer token authentication. Use as a context manager; url is the base URL.
+
+    Failures can be scheduled with fail(): the next matching requests get the given status, optionally
+    with Retry-After, and with processed=True only after the request has taken effect (as when a proxy
+    times out). expire_tokens() makes the issued tokens invalid, so the next requests get 401.
+    requests lists (method, path, status) of every request served.
+    """
 
+    def __init__(self, email=DEFAULT_EMAIL, password=DEFAULT_PASSWORD):
+        self.email = email
+        self.password = password
+        self.tokens = set()
+        self.datasets = {}
+        self.requests = []
+        self.faults = []
+        self.lock = threading.Lock()
+        store = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _respond(self, status, body=b"", headers=None):
+                with store.lock:
+                    store.requests.append((self.command, self.path, status))
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _fault(self):
+                """Removes and returns the first scheduled fault that matches this request, or None."""
+                with store.lock:
+                    for i, fault in enumerate(store.faults):
+                        if fault["method"] in (None, self.command) and fault["path"] in self.path:
+                            fault["times"] -= 1
+                            if fault["times"] == 0:
+                                del store.faults[i]
+                            return fault
+                return None
+
+            def _handle(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                fault = self._fault()
+                if fault is not None and not fault["processed"]:
+                    self._respond(fault["status"], headers=fault["headers"])
+                    return
+                status, responseBody, headers = self._process(body)
+                if fault is not None:
+                    status, responseBody, headers = fault["status"], b"", fault["headers"]
+                self._respond(status, responseBody, headers)
+
+            def _process(self, body):
+                path = urllib.parse.urlparse(self.path).path.strip("/").split("/")
+                if path == ["tokens"] and self.command == "POST":
+                    credentials = json.loads(body or b"{}")
+                    if (credentials.get("email"), credentials.get("password")) != (store.email, store.password):
+                        return 401, b"", {}
+                    token = uuid.uuid4().hex
+                    with store.lock:
+                        store.tokens.add(token)
+                    return 200, json.dumps({"token": token}).encode("utf-8"), {"Content-Type": "application/json"}
+                authorization = self.headers.get("Authorization", "")
+                with store.lock:
+                    if authorization[len("Bearer "):] not in store.tokens:
+                        return 401, b"", {}
+                    if path == ["dataset"] and self.command == "POST":
+                        identifier = str(uuid.uuid4())
+                        store.datasets[identifier] = {"body": body.decode("utf-8"), "state": "DRAFT"}
+                        return 201, b"", {"Location": f"{store.url}dataset/{identifier}"}
+                    if len(path) < 2 or path[0] != "dataset" or path[1] not in store.datasets:
+                        return 404, b"", {}
+                    dataset = store.datasets[path[1]]
+                    if path[2:] == ["meta", "state"] and self.command == "PUT":
+                        dataset["state"] = json.loads(body)["current"]
+                        return 200, b"", {}
+                    if path[2:]:
+                        return 404, b"", {}
+                    if self.command == "PUT":
+                        dataset["body"] = body.decode("utf-8")
+                        return 200, b"", {}
+                    if self.command == "DELETE":
+                        del store.datasets[path[1]]
+                        return 204, b"", {}
+                    return 200, dataset["body"].encode("utf-8"), {"Content-Type": "text/turtle"}
+
+            do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def fail(self, status, method=None, path="", times=1, retry_after=None, processed=False):
+        """
+        Answers the next times requests with method (None for any) whose path contains path with status,
+        and a Retry-After header if retry_after is given. With processed, the request takes effect first.
+        """
+        headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+        with self.lock:
+            self.faults.append({"status": status, "method": method, "path": path, "times": times,
+                                "headers": headers, "processed": processed})
+
+    def expire_tokens(self):
+        with self.lock:
+            self.tokens.clear()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Upload the ZIN pakketadviezen as datasets to a FAIR Data Point")
+    parser.add_argument("--baseurl", type=str, default="https://fdp-zin.dci.thehyve.nl/",
+                        help="Base URL of the FDP, ending with /")
+    parser.add_argument("--local", action="store_true",
+                        help="Upload to an in-process stand-in FDP (LocalFDP) instead, to try out the upload")
+    # catalog_uri="http://localhost/catalog/932dbf1b-38af-4fb0-8118-ebfad5dedd23"
+    parser.add_argument("--catalog", type=str,
+                        default="https://fdp-zin.dci.thehyve.nl/catalog/b4f2d88f-bd6e-44e7-a4a4-87861aab964d",
+                        help="URI of the catalog the datasets are part of")
+    parser.add_argument("--csv", type=str,
+                        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "data",
+                                             "ZIN_pakketadviezen_2024_ChatGPT_20250917(2024 Pakketadviezen).csv"),
+                        help="Pakketadviezen CSV file to upload")
+    parser.add_argument("--parallelism", type=int, default=4, help="Number of datasets uploaded concurrently")
+    parser.add_argument("--retries", type=int, default=5,
+                        help="Number of retries on 429 and 5xx responses (POST only on 429/503 with Retry-After)")
+    parser.add_argument("--queue-size", type=int, default=16,
+                        help="Number of datasets buffered between the read, render and upload stages")
+    parser.add_argument("--sync-state", type=str, default=None,
+                        help="JSON file recording what was uploaded; only new or changed datasets are uploaded")
+    parser.add_argument("--prune", action="store_true",
+                        help="With --sync-state, delete datasets that are no longer in the CSV")
+    args = parser.parse_args()
+
+    email = os.environ.get("FDP_EMAIL", DEFAULT_EMAIL)
+    password = os.environ.get("FDP_PASSWORD", DEFAULT_PASSWORD)
+    session = create_session(pool_size=args.parallelism, retries=args.retries)
+    state = None
+    if args.sync_state:
+        state = load_sync_state(args.sync_state)
+        if state.setdefault("catalog", args.catalog) != args.catalog:
+            parser.error(f"{args.sync_state} belongs to catalog {state['catalog']}")
+
+    def run(baseurl):
+        """Uploads or syncs the datasets of the CSV file to the FDP at baseurl. Returns the number of failures."""
+        client = FDPClient(baseurl, email, password, session)
+        pakketadviezen = iter_pakketadviezen_csv(args.csv)
+        dataset_infos = (get_dataset_info_from_row(row, args.catalog) for row in pakketadviezen)
+
+        failed = 0
+        if state is not None:
+            try:
+                for action, identifier, location, error in sync_datasets(client, dataset_infos, state,
+                                                                         args.parallelism, args.prune):
+                    if error is not None:
+                        failed += 1
+                        print(f"Failed to {action} dataset {identifier}: {error}")
+                    else:
+                        print(f"Dataset {identifier} {action}{'d' if action.endswith('e') else 'ed'}: {location}")
+            finally:
+                save_sync_state(args.sync_state, state)
+            return failed
+
+        for dataset_info, location, status, error in upload_datasets(client, dataset_infos, args.parallelism,
+                                                                     args.queue_size):
+            if error is not None:
+                failed += 1
+                print(f"Failed to upload '{dataset_info['title']}': {error}")
+                continue
+            print(f"Dataset added at: {location}")
+            print(f"Publish status code: {status}")
+            if not 200 <= status < 300:
+                failed += 1
+        return failed
+
+    if args.local:
+        with LocalFDP(email, password) as local:
+            failed = run(local.url)
+            published = sum(dataset["state"] == "PUBLISHED" for dataset in local.datasets.values())
+            print(f"Local FDP: {len(local.datasets)} datasets, {published} published, {len(local.requests)} requests")
+    else:
+        failed = run(args.baseurl)
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+
+# Generates synthetic package statements to test conversion, validation and querying at registry scale.
+# The sections and fields come from template_package_statement.yaml; field values are sampled from the
+# real package statements, so taxonomy terms resolve and texts, codes and numbers look like real ones.
+import argparse
+import copy
+import os
+import random
+import sys
+import yaml
+
+from package_statements import MAPPING_TSV, SRC_DIR, findPackageStatementFiles, getTaxonomyResolver
+from statement_mapping import readRows
+from validate_package_statement import REFERENCES
+
+
+TEMPLATE_YAML = os.path.join(SRC_DIR, 'data', 'template_package_statement.yaml')
+DATA_DIR = os.path.join(SRC_DIR, 'data')
+
+# Fields set by the generator itself rather than sampled: ids, references and the BIA numbers
+GENERATED_FIELDS = {'id', 'observation-groups', 'time-points', 'number-of-patients', 'intervention-market-penetration',
+                    'total-costs', 'number-of-items'} | {path.split('[]')[0] for _, path, _ in REFERENCES}
+
+# Fields with taxonomy terms, only sampled from labels that are in the taxonomy
+TAXONOMY_FIELDS = {(row['Section'], row['Field']) for row in readRows(MAPPING_TSV) if row['Kind'] == 'taxonomy'}
+
+
+def collectValues(fileNames: list[str], resolve=None) -> dict:
+    """
+    Returns {(section, field): [values]} of all records in the given package statements. With resolve,
+    taxonomy labels for which resolve(label) returns None are left out.
+    """
+    values = {}
+    for fileName in fileNames:
+        with open(fileName, 'r') as f:
+            data = yaml.safe_load(f)
+        for section, records in data.items():
+            for record in [records] if isinstance(records, dict) else records or []:
+                for field, value in record.items():
+                    if resolve is not None and (section, field) in TAXONOMY_FIELDS:
+                        if isinstance(value, list):
+                            value = [label for label in value if resolve(label) is not None]
+                        elif value is not None and resolve(value) is None:
+                            value = None
+                    if value is not None and value != [] and field not in GENERATED_FIELDS:
+                        values.setdefault((section, field), []).append(value)
+    return values
+
+
+class PackageStatementGenerator:
+    """
+    Generates package statements with the sections and fields of the template. Sizes are the number of
+    interventions (at least 2: the new intervention and its comparators), outcomes and timepoints per
+    statement. Fields without values in the samples are left out, as the template asks for missing values.
+    The cost estimations follow the budget impact model of budget_impact.py, so they check out.
+    """
+
+    def __init__(self, template: dict, values: dict, interventions: int = 3, outcomes: int = 5,
+                 timepoints: int = 3, seed: int = 0):
+        if interventions < 2:
+            raise ValueError("A package statement needs at least 2 interventions")
+        self.template = template
+        self.values = values
+        self.numInterventions = interventions
+        self.numOutcomes = outcomes
+        self.numTimepoints = timepoints
+        self.seed = seed
+
+    def _record(self, rng: random.Random, section: str, recordId: str = None, **fields) -> dict:
+        """A record with the template fields of section, sampled values and the given fields."""
+        templateRecords = self.template[section]
+        templateRecord = templateRecords if isinstance(templateRecords, dict) else templateRecords[0]
+        record = {'id': recordId} if recordId else {}
+        for field in templateRecord:
+            if field in GENERATED_FIELDS:
+                continue
+            samples = self.values.get((section, field))
+            if samples:
+                record[field] = self._vary(rng, copy.deepcopy(rng.choice(samples)))
+        record.update(fields)
+        return record
+
+    @staticmethod
+    def _vary(rng: random.Random, value):
+        # Numbers are spread around the sampled value; booleans and everything else are kept
+        if isinstance(value, float):
+            return round(value * rng.lognormvariate(0, 0.3), 2)
+        if isinstance(value, int) and not isinstance(value, bool) and value > 1000:
+            return int(value * rng.uniform(0.5, 1.5))
+        return value
+
+    def generate(self, index: int) -> dict:
+        """Generates package statement number index, the same one for the same seed and index."""
+        rng = random.Random(f"{self.seed}-{index}")
+        name = f"Syn{index}"
+        timepoints = list(range(1, self.numTimepoints + 1)) if self.numTimepoints > 1 else ['default']
+
+        populations = [self._record(rng, 'populations', f"Population-{name}-{i}") for i in (1, 2)]
+        populationIds = [population['id'] for population in populations]
+        interventions = [self._record(rng, 'interventions', f"Intervention-{name}-{i}")
+                         for i in range(1, self.numInterventions + 1)]
+        for intervention in interventions:
+            intervention['costs'] = round(rng.lognormvariate(9, 1.5), 2)
+        interventionIds = [intervention['id'] for intervention in interventions]
+        interventionGroups = [
+            self._record(rng, 'intervention-groups', f"InterventionGroup-{name}-Intervention",
+                         **{'intervention-ids': interventionIds[:1]}),
+            self._record(rng, 'intervention-groups', f"InterventionGroup-{name}-Comparator",
+                         **{'intervention-ids': interventionIds[1:]}),
+        ]
+        outcomes = [self._record(rng, 'outcomes', f"Outcome-{name}-{i}") for i in range(1, self.numOutcomes + 1)]
+        outcomeIds = [outcome['id'] for outcome in outcomes]
+        publications = [self._record(rng, 'publications', f"JournalArticle-{name}-{i}")
+                        for i in range(1, rng.randint(1, 3) + 1)]
+        publicationIds = [publication['id'] for publication in publications]
+        cohortIds = [f"Cohort-{name}-Intervention", f"Cohort-{name}-Comparator"]
+        outcomeMeasurements = [
+            self._record(rng, 'outcome-measurements', f"OutcomeMeasurement-{outcomeId}",
+                         **{'outcome-id': outcomeId, 'cohort-ids': cohortIds})
+            for outcomeId in outcomeIds
+        ]
+        searches = [self._record(rng, 'literature-searches', f"LS-{name}-{i}") for i in (1, 2)]
+        hasAppropriateUse = rng.random() < 1 / 3
+
+        iic = self._record(rng, 'intervention-indication-combination-assessments', f"IICAssessment-{name}", **{
+            'intervention-id': interventionIds[0],
+            'indication-ids': populationIds,
+            'emsmp-id': f"EMSMP-{name}",
+            'bia-id': f"BIA-{name}",
+        })
+        if hasAppropriateUse:
+            iic['au-id'] = f"AU-{name}"
+        data = {
+            'package-statement': self._record(rng, 'package-statement', f"PS-{name}",
+                                              **{'iic-assessments': [iic['id']]}),
+            'populations': populations,
+            'interventions': interventions,
+            'intervention-groups': interventionGroups,
+            'outcomes': outcomes,
+            'outcome-groups': [self._record(rng, 'outcome-groups', f"OutcomeGroup-{name}",
+                                            **{'outcome-ids': outcomeIds})],
+            'picots': [self._record(rng, 'picots', f"PICO-{name}", **{
+                'population-ids': populationIds,
+                'intervention-group-id': interventionGroups[0]['id'],
+                'comparator-group-id': interventionGroups[1]['id'],
+                'outcome-group-ids': [f"OutcomeGroup-{name}"],
+            })],
+            'intervention-indication-combination-assessments': [iic],
+            'emsmps': [self._record(rng, 'emsmps', f"EMSMP-{name}", **{
+                'picots-id': f"PICO-{name}",
+                'slr-id': f"SLR-{name}",
+                'outcome-measurement-ids': [measurement['id'] for measurement in outcomeMeasurements],
+            })],
+            'systematic-literature-reviews': [self._record(rng, 'systematic-literature-reviews', f"SLR-{name}", **{
+                'literature-searches': [search['id'] for search in searches],
+                'literature-reference-list': f"LRL-{name}",
+            })],
+            'literature-searches': searches,
+            'publications': publications,
+            'literature-reference-lists': [self._record(rng, 'literature-reference-lists', f"LRL-{name}", **{
+                'number-of-items': len(publicationIds),
+                'references': publicationIds,
+            })],
+            'studies': [self._record(rng, 'studies', f"Study-{name}", **{'publication-ids': publicationIds})],
+            'cohorts': [
+                self._record(rng, 'cohorts', cohortIds[0], **{'study-id': f"Study-{name}",
+                                                               'intervention-group-id': interventionGroups[0]['id']}),
+                self._record(rng, 'cohorts', cohortIds[1], **{'study-id': f"Study-{name}",
+                                                               'intervention-group-id': interventionGroups[1]['id']}),
+            ],
+            'outcome-measurements': outcomeMeasurements,
+            'bias': [self._record(rng, 'bias', f"BIA-{name}", **{
+                'trend-assumption-id': f"TrendAssumption-{name}",
+                'cost-estimation-ids': [f"CostEstimation-{name}"],
+            })],
+            'scenarios': [self._record(rng, 'scenarios', f"Scenario-{name}")],
+        }
+        data.update(self._budgetImpact(rng, name, timepoints, interventions))
+        if hasAppropriateUse:
+            data['appropriate-use'] = self._record(rng, 'appropriate-use', f"AU-{name}")
+        return data
+
+    def _budgetImpact(self, rng: random.Random, name: str, timepoints: list, interventions: list[dict]) -> dict:
+        """
+        Trend assumption and cost estimation of the new intervention (the first one) partly substituting its
+        comparators, with a market penetration that grows over time. The groups are those of trodelvy_ps:
+        Current for the patients that stay on the comparators and Substitution for those that switch, with
+        Total = Current + Substitution and Additional = Total − the costs of all patients on the comparators.
+        """
+        patients = [int(rng.lognormvariate(7, 1.5)) + 1] * len(timepoints)
+        # Below 1, so that some patients stay on the comparators and their unit costs can be recomputed
+        finalPenetration = rng.uniform(0.2, 0.9)
+        penetration = [round(finalPenetration * (i + 1) / len(timepoints), 2) for i in range(len(timepoints))]
+        newIntervention, comparators = interventions[0], interventions[1:]
+        newPatients = [min(round(n * p), n - 1) for n, p in zip(patients, penetration)]
+        comparatorCosts = sum(comparator['costs'] for comparator in comparators)
+        current = [round((n - m) * comparatorCosts, 2) for n, m in zip(patients, newPatients)]
+        substitution = [round(m * newIntervention['costs'], 2) for m in newPatients]
+        total = [round(c + s, 2) for c, s in zip(current, substitution)]
+        additional = [round(t - n * comparatorCosts, 2) for t, n in zip(total, patients)]
+        comparatorIds = [comparator['id'] for comparator in comparators]
+        allIds = [newIntervention['id']] + comparatorIds
+        timeUnit = {'time-unit': 'year'} if timepoints != ['default'] else {}
+        return {
+            'trend-assumptions': [self._record(rng, 'trend-assumptions', f"TrendAssumption-{name}", **{
+                'scenario-id': f"Scenario-{name}",
+                'time-points': timepoints,
+                **timeUnit,
+                'number-of-patients': patients,
+                'intervention-market-penetration': penetration,
+            })],
+            'cost-estimations': [self._record(rng, 'cost-estimations', f"CostEstimation-{name}", **{
+                **timeUnit,
+                'time-points': timepoints,
+                'trend-assumption-id': f"TrendAssumption-{name}",
+                'scenario-id': f"Scenario-{name}",
+                'observation-groups': [
+                    {'type': 'Current', 'intervention-ids': comparatorIds,
+                     'number-of-patients': [n - m for n, m in zip(patients, newPatients)], 'total-costs': current},
+                    {'type': 'Substitution', 'intervention-ids': [newIntervention['id']],
+                     'number-of-patients': newPatients, 'total-costs': substitution},
+                    {'type': 'Additional', 'intervention-ids': allIds, 'number-of-patients': newPatients,
+                     'total-costs': additional},
+                    {'type': 'Total', 'intervention-ids': allIds, 'number-of-patients': patients,
+                     'total-costs': total},
+                ],
+            })],
+        }
+
+
+def createGenerator(interventions: int = 3, outcomes: int = 5, timepoints: int = 3,
+                    seed: int = 0) -> PackageStatementGenerator:
+    """A generator based on the template and the package statements in src/data."""
+    with open(TEMPLATE_YAML, 'r') as f:
+        template = yaml.safe_load(f)
+    values = collectValues(findPackageStatementFiles([DATA_DIR]), getTaxonomyResolver().resolve)
+    return PackageStatementGenerator(template, values, interventions, outcomes, timepoints, seed)
+
+
+def writePackageStatements(generator: PackageStatementGenerator, count: int, outputDir: str) -> list[str]:
+    """Writes count statements as <outputDir>/synthetic<index>_ps.yaml and returns their file names."""
+    os.makedirs(outputDir, exist_ok=True)
+    fileNames = []
+    for index in range(count):
+        fileName = os.path.join(outputDir, f"synthetic{index:05d}_ps.yaml")
+        with open(fileName, 'w') as f:
+            yaml.safe_dump(generator.generate(index), f, allow_unicode=True, sort_keys=False)
+        fileNames.append(fileName)
+    return fileNames
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate synthetic package statements")
+    parser.add_argument("count", type=int, help="Number of package statements")
+    parser.add_argument("--output-dir", type=str, required=True, help="Directory for the YAML files")
+    parser.add_argument("--interventions", type=int, default=3, help="Interventions per statement (default: 3)")
+    parser.add_argument("--outcomes", type=int, default=5, help="Outcomes per statement (default: 5)")
+    parser.add_argument("--timepoints", type=int, default=3,
+                        help="Timepoints of the budget impact analysis, 1 for 'default' (default: 3)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    args = parser.parse_args()
+
+    generator = createGenerator(args.interventions, args.outcomes, args.timepoints, args.seed)
+    fileNames = writePackageStatements(generator, args.count, args.output_dir)
+    print(f"Wrote {len(fileNames)} package statements to {args.output_dir}", file=sys.stderr)
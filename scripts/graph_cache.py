@@ -0,0 +1,90 @@
+import hashlib
+import marshal
+import os
+from array import array
+from rdflib import Graph, URIRef, BNode, Literal
+
+from build_cache import hashFile
+
+
+# Bump when the encoding changes, so old cache files are not read
+FORMAT_VERSION = 1
+MAGIC = b'FPRGRAPH%d\n' % FORMAT_VERSION
+
+
+def encodeGraph(g: Graph) -> bytes:
+    """
+    Encodes a graph as a term dictionary plus the sorted triples as integer ids into that dictionary.
+    Terms are (kind, value, language, datatype) tuples with kind 'u' (IRI), 'b' (blank node) or 'l' (literal).
+    """
+    ids = {}
+    terms = []
+
+    def termId(term) -> int:
+        i = ids.get(term)
+        if i is None:
+            i = ids[term] = len(terms)
+            if isinstance(term, Literal):
+                terms.append(('l', str(term), term.language, str(term.datatype) if term.datatype else None))
+            elif isinstance(term, BNode):
+                terms.append(('b', str(term), None, None))
+            else:
+                terms.append(('u', str(term), None, None))
+        return i
+
+    triples = sorted((termId(s), termId(p), termId(o)) for s, p, o in g)
+    encoded = array('I')
+    for triple in triples:
+        encoded.extend(triple)
+    return MAGIC + marshal.dumps((terms, encoded.tobytes()))
+
+
+def decodeGraph(data: bytes) -> Graph:
+    if not data.startswith(MAGIC):
+        raise ValueError("Not a graph cache file of version %d" % FORMAT_VERSION)
+    terms, encoded = marshal.loads(data[len(MAGIC):])
+    nodes = []
+    for kind, value, language, datatype in terms:
+        if kind == 'u':
+            nodes.append(URIRef(value))
+        elif kind == 'b':
+            nodes.append(BNode(value))
+        else:
+            nodes.append(Literal(value, lang=language, datatype=URIRef(datatype) if datatype else None))
+    ids = array('I')
+    ids.frombytes(encoded)
+    g = Graph()
+    g.addN((nodes[ids[i]], nodes[ids[i + 1]], nodes[ids[i + 2]], g) for i in range(0, len(ids), 3))
+    return g
+
+
+class GraphCache:
+    """
+    Parsed graphs stored in a compact binary form, keyed by the content hash of the source file.
+
+    A cache file is written once, atomically, and never modified afterwards, so any number of
+    processes can read the cache concurrently. A variant string distinguishes different ways
+    of parsing the same file, such as extra prefix declarations.
+    """
+
+    def __init__(self, cacheDir: str):
+        self.cacheDir = cacheDir
+
+    def path(self, fileName: str, variant: str = '') -> str:
+        h = hashlib.sha256(f"{hashFile(fileName)} {variant}".encode()).hexdigest()
+        return os.path.join(self.cacheDir, h + '.bin')
+
+    def load(self, fileName: str, parse=None, variant: str = '') -> Graph:
+        """Returns the graph in fileName, calling parse(fileName) only when it is not cached yet."""
+        cacheFileName = self.path(fileName, variant)
+        if os.path.exists(cacheFileName):
+            with open(cacheFileName, 'rb') as f:
+                return decodeGraph(f.read())
+        g = parse(fileName) if parse else Graph().parse(fileName)
+        os.makedirs(self.cacheDir, exist_ok=True)
+        # Unique temporary name, in case several processes cache the same file at the same time
+        tmpFileName = f"{cacheFileName}.{os.getpid()}.tmp"
+        with open(tmpFileName, 'wb') as f:
+            f.write(encodeGraph(g))
+        os.replace(tmpFileName, cacheFileName)
+        return g
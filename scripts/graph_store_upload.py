@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+
+# Uploads generated package statements to a SPARQL 1.1 Graph Store Protocol endpoint, such as the
+# rdf-graphs/service endpoint of a GraphDB repository, with one named graph per statement.
+import argparse
+import gzip
+import os
+import sys
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from rdflib import Dataset, Graph, BNode, URIRef
+from rdflib.util import guess_format
+from urllib3.util.retry import Retry
+
+from fdp_test_data_upload import create_session
+from rdf_stream import ntTerm
+from registry import getGraphName
+
+
+N_TRIPLES = 'application/n-triples'
+# Triples per request; larger graphs are uploaded in several requests
+DEFAULT_CHUNK_SIZE = 100000
+
+
+def readStatement(fileName: str) -> tuple[list[str], int]:
+    """
+    Reads a generated statement file (optionally gzip-compressed) and returns its distinct triples as
+    sorted N-Triples lines, with the triples that have blank nodes first, and the number of those.
+    """
+    name = fileName[:-3] if fileName.endswith('.gz') else fileName
+    with (gzip.open(fileName, 'rb') if name != fileName else open(fileName, 'rb')) as f:
+        dataset = Dataset().parse(f, format=guess_format(name))
+    withBNodes, withoutBNodes = set(), set()
+    for s, p, o, _ in dataset.quads():
+        line = f"{ntTerm(s)} {ntTerm(p)} {ntTerm(o)} .\n"
+        (withBNodes if isinstance(s, BNode) or isinstance(o, BNode) else withoutBNodes).add(line)
+    return sorted(withBNodes) + sorted(withoutBNodes), len(withBNodes)
+
+
+def chunkLines(lines: list[str], chunkSize: int, blankNodeLines: int = 0) -> list[list[str]]:
+    """
+    Splits the lines into chunks of at most chunkSize. Blank node labels only hold within one request,
+    so the first blankNodeLines lines, the triples with blank nodes, all stay in the first chunk.
+    """
+    firstSize = max(chunkSize, blankNodeLines)
+    return [lines[:firstSize]] + [lines[i:i + chunkSize] for i in range(firstSize, len(lines), chunkSize)]
+
+
+def gzipBody(lines: list[str]) -> bytes:
+    # Compressed in memory, one chunk at a time, so a retried request can send the body again
+    return gzip.compress(''.join(lines).encode('utf-8'), compresslevel=6, mtime=0)
+
+
+class GraphStoreClient:
+    """
+    Named graphs of a SPARQL 1.1 Graph Store Protocol endpoint, identified with ?graph=<IRI>. All requests
+    go through one pooled, retrying session (see create_session), which can be shared between threads.
+    Triples are counted with a SPARQL query if a query endpoint is given, and otherwise by reading the graph.
+    """
+
+    def __init__(self, endpoint: str, queryEndpoint: str = None, session=None, auth: tuple = None):
+        self.endpoint = endpoint
+        self.queryEndpoint = queryEndpoint
+        self.session = session or create_session()
+        self.auth = auth
+
+    def graphUrl(self, graphName) -> str:
+        separator = '&' if '?' in self.endpoint else '?'
+        return f"{self.endpoint}{separator}graph={urllib.parse.quote(str(graphName), safe='')}"
+
+    def send(self, method: str, graphName, lines: list[str]):
+        """PUT replaces the graph, POST adds the triples to it."""
+        response = self.session.request(method, self.graphUrl(graphName), data=gzipBody(lines), auth=self.auth,
+                                        headers={'Content-Type': N_TRIPLES, 'Content-Encoding': 'gzip'})
+        response.raise_for_status()
+
+    def delete(self, graphName):
+        response = self.session.delete(self.graphUrl(graphName), auth=self.auth)
+        if response.status_code != 404:
+            response.raise_for_status()
+
+    def count(self, graphName) -> int:
+        if self.queryEndpoint is not None:
+            query = f"SELECT (COUNT(*) AS ?n) WHERE {{ GRAPH {ntTerm(URIRef(graphName))} {{ ?s ?p ?o }} }}"
+            response = self.session.post(self.queryEndpoint, data={'query': query}, auth=self.auth,
+                                         headers={'Accept': 'application/sparql-results+json'})
+            response.raise_for_status()
+            return int(response.json()['results']['bindings'][0]['n']['value'])
+        response = self.session.get(self.graphUrl(graphName), auth=self.auth, headers={'Accept': N_TRIPLES},
+                                    stream=True)
+        if response.status_code == 404:
+            return 0
+        response.raise_for_status()
+        return sum(1 for line in response.iter_lines() if line.strip() and not line.startswith(b'#'))
+
+
+def uploadStatement(client: GraphStoreClient, fileName: str, chunkSize: int = DEFAULT_CHUNK_SIZE,
+                    check: bool = True) -> dict:
+    """
+    Replaces the named graph of a statement file: the first chunk is PUT, the others are POSTed. With
+    check, the triples in the graph are counted afterwards and a ValueError is raised if they do not
+    match the file.
+    """
+    graphName = getGraphName(fileName)
+    lines, blankNodeLines = readStatement(fileName)
+    chunks = chunkLines(lines, chunkSize, blankNodeLines)
+    for i, chunk in enumerate(chunks):
+        client.send('PUT' if i == 0 else 'POST', graphName, chunk)
+    result = {'graph': graphName, 'triples': len(lines), 'chunks': len(chunks)}
+    if check:
+        result['loaded'] = client.count(graphName)
+        if result['loaded'] != len(lines):
+            raise ValueError(f"{graphName} has {result['loaded']} triples after loading {len(lines)} from {fileName}")
+    return result
+
+
+def uploadStatements(client: GraphStoreClient, fileNames: list[str], parallelism: int = 4,
+                     chunkSize: int = DEFAULT_CHUNK_SIZE, check: bool = True):
+    """
+    Uploads statement files concurrently, parallelism graphs at a time. Yields, in completion order,
+    (fileName, result, error) where error is None or the exception raised.
+    """
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        futures = {executor.submit(uploadStatement, client, fileName, chunkSize, check): fileName
+                   for fileName in fileNames}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+
+
+class LocalGraphStore:
+    """
+    In-process stand-in for a Graph Store Protocol endpoint, backed by an rdflib Dataset, for trying
+    out and testing uploads without a triplestore. Supports GET, PUT, POST and DELETE with ?graph= and
+    gzip-compressed request bodies. Use as a context manager; url is the endpoint.
+    """
+
+    def __init__(self):
+        self.dataset = Dataset()
+        self.requests = []
+        self.lock = threading.Lock()
+        store = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _graph(self):
+                query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+                return URIRef(query['graph'][0])
+
+            def _respond(self, status: int, body: bytes = b'', contentType: str = N_TRIPLES):
+                self.send_response(status)
+                self.send_header('Content-Type', contentType)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _receive(self, replace: bool):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                if self.headers.get('Content-Encoding') == 'gzip':
+                    body = gzip.decompress(body)
+                graphName = self._graph()
+                g = Graph().parse(data=body, format='nt')
+                with store.lock:
+                    store.requests.append((self.command, graphName, len(g)))
+                    existed = graphName in {c.identifier for c in store.dataset.graphs()}
+                    if replace:
+                        store.dataset.remove_graph(graphName)
+                    target = store.dataset.graph(graphName)
+                    for triple in g:
+                        target.add(triple)
+                self._respond(204 if existed else 201)
+
+            def do_PUT(self):
+                self._receive(replace=True)
+
+            def do_POST(self):
+                self._receive(replace=False)
+
+            def do_GET(self):
+                graphName = self._graph()
+                with store.lock:
+                    store.requests.append(('GET', graphName, None))
+                    if graphName not in {c.identifier for c in store.dataset.graphs()}:
+                        self._respond(404)
+                        return
+                    body = ''.join(f"{ntTerm(s)} {ntTerm(p)} {ntTerm(o)} .\n"
+                                   for s, p, o in store.dataset.graph(graphName)).encode('utf-8')
+                self._respond(200, body)
+
+            def do_DELETE(self):
+                with store.lock:
+                    store.dataset.remove_graph(self._graph())
+                self._respond(204)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/rdf-graphs/service"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Upload generated package statements to a Graph Store Protocol endpoint")
+    parser.add_argument("inputs", type=str, nargs="+", help="Generated package statements (.ttl, .nt, .nq, optionally .gz)")
+    parser.add_argument("--endpoint", type=str, default=None,
+                        help="Graph Store endpoint, e.g. http://localhost:7200/repositories/fpr/rdf-graphs/service")
+    parser.add_argument("--query-endpoint", type=str, default=None,
+                        help="SPARQL endpoint to count the loaded triples with, e.g. http://localhost:7200/repositories/fpr "
+                             "(default: read each graph back)")
+    parser.add_argument("--local", action="store_true",
+                        help="Upload to an in-process stand-in endpoint instead, to try out the upload")
+    parser.add_argument("--parallelism", type=int, default=4, help="Number of graphs uploaded concurrently")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Maximum number of triples per request (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--retries", type=int, default=5, help="Number of retries on 429 and 5xx responses")
+    parser.add_argument("--no-check", action="store_true", help="Do not count the triples after loading")
+    args = parser.parse_args()
+    if not args.local and not args.endpoint:
+        parser.error("--endpoint or --local is required")
+
+    user = os.environ.get("GRAPH_STORE_USER")
+    auth = (user, os.environ.get("GRAPH_STORE_PASSWORD", "")) if user else None
+    # Adding the same triples again does not change a graph, so POSTed chunks (without blank nodes) can be retried too
+    session = create_session(pool_size=args.parallelism, retries=args.retries,
+                             allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {'POST'})
+
+    def run(endpoint: str, queryEndpoint: str) -> int:
+        client = GraphStoreClient(endpoint, queryEndpoint, session, auth)
+        failed = 0
+        for fileName, result, error in uploadStatements(client, args.inputs, args.parallelism, args.chunk_size,
+                                                        not args.no_check):
+            if error is not None:
+                failed += 1
+                print(f"FAILED {fileName}: {error}", file=sys.stderr)
+            else:
+                print(f"{result['graph']}: {result['triples']} triples in {result['chunks']} request(s)")
+        return failed
+
+    if args.local:
+        with LocalGraphStore() as local:
+            failed = run(local.url, None)
+    else:
+        failed = run(args.endpoint, args.query_endpoint)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+
+# Registry of package statements as one N-Quads file with one named graph per statement, for bulk
+# loading into a triplestore, with an offset index to read or replace one graph without a full scan.
+import argparse
+import json
+import os
+import sys
+from rdflib import Dataset, Graph, URIRef
+
+from build_cache import hashFile
+from rdf_stream import ntTerm
+from registry import getGraphName
+
+
+# The file is compacted when more than this fraction of it is free space
+COMPACT_RATIO = 0.5
+
+
+def _freeBlock(size: int) -> bytes:
+    """Bytes that fill a free slot: an N-Quads comment, or a blank line if there is only room for one byte."""
+    if size == 1:
+        return b'\n'
+    return b'#' + b' ' * (size - 2) + b'\n'
+
+
+def graphBlock(g: Graph, name: URIRef) -> bytes:
+    """The triples of g as sorted N-Quads lines in graph name, so an unchanged graph gives the same bytes."""
+    suffix = f" {ntTerm(name)} .\n"
+    return ''.join(sorted(f"{ntTerm(s)} {ntTerm(p)} {ntTerm(o)}{suffix}" for s, p, o in g)).encode('utf-8')
+
+
+class NQuadsDataset:
+    """
+    An N-Quads file in which the lines of each named graph are one contiguous block, with an index
+    (<fileName>.index.json) of the offset and length of each block and the source file it was read from.
+
+    A changed graph is written over its old block if it fits, otherwise into a free slot or at the end
+    of the file. Left-over and freed bytes are filled with comment lines, so the file is always valid
+    N-Quads with only the current graphs and can be bulk-loaded as it is. When free space exceeds
+    COMPACT_RATIO of the file, the blocks are rewritten one after another in a new file.
+    If the index does not match the file, e.g. after an interrupted update, it is rebuilt by scanning
+    the file; all graphs are then reloaded on the next update.
+    """
+
+    def __init__(self, fileName: str):
+        self.fileName = fileName
+        self.indexFileName = fileName + '.index.json'
+        if not os.path.exists(fileName):
+            with open(fileName, 'wb'):
+                pass
+        self.graphs = {}
+        self.free = []
+        index = None
+        if os.path.exists(self.indexFileName):
+            with open(self.indexFileName, 'r') as f:
+                index = json.load(f)
+        if index is not None and index.get('size') == os.path.getsize(fileName):
+            self.graphs = index['graphs']
+            self.free = index['free']
+        else:
+            self.rebuildIndex()
+
+    def size(self) -> int:
+        return os.path.getsize(self.fileName)
+
+    def freeBytes(self) -> int:
+        return sum(size for offset, size in self.free)
+
+    def rebuildIndex(self):
+        """Finds the blocks of the graphs by scanning the file. Comment and blank lines are free space."""
+        self.graphs, self.free = {}, []
+        offset = 0
+        current = None
+        with open(self.fileName, 'rb') as f:
+            for line in f:
+                stripped = line.strip()
+                if not stripped or stripped.startswith(b'#'):
+                    name = None
+                else:
+                    # The graph name is the last term before the final ' .'
+                    name = stripped[:-1].rstrip().rsplit(b' ', 1)[1][1:-1].decode('utf-8')
+                if current is not None and current[0] == name:
+                    current[2] += len(line)
+                else:
+                    if current is not None:
+                        self._addScannedBlock(*current)
+                    current = [name, offset, len(line)]
+                offset += len(line)
+        if current is not None:
+            self._addScannedBlock(*current)
+        self.save()
+
+    def _addScannedBlock(self, name, offset: int, length: int):
+        if name is None:
+            self.free.append([offset, length])
+        else:
+            self.graphs[name] = {'offset': offset, 'length': length, 'slot': length, 'source': None, 'hash': None}
+
+    def save(self):
+        tmpFileName = self.indexFileName + '.tmp'
+        with open(tmpFileName, 'w') as f:
+            json.dump({'size': self.size(), 'graphs': self.graphs, 'free': self.free}, f, indent=2, sort_keys=True)
+        os.replace(tmpFileName, self.indexFileName)
+
+    def read(self, name) -> bytes:
+        """The N-Quads lines of one graph."""
+        entry = self.graphs[str(name)]
+        with open(self.fileName, 'rb') as f:
+            f.seek(entry['offset'])
+            return f.read(entry['length'])
+
+    def graph(self, name) -> Graph:
+        """One graph, parsed from its block only."""
+        dataset = Dataset()
+        dataset.parse(data=self.read(name), format='nquads')
+        g = Graph(identifier=URIRef(name))
+        for triple in dataset.graph(URIRef(name)):
+            g.add(triple)
+        return g
+
+    def _allocate(self, f, length: int) -> tuple:
+        """Returns (offset, slot size) of the first free slot that fits length bytes, or of the end of the file."""
+        for i, (offset, size) in enumerate(self.free):
+            if size >= length:
+                del self.free[i]
+                return offset, size
+        return f.seek(0, os.SEEK_END), length
+
+    def _release(self, f, offset: int, size: int):
+        f.seek(offset)
+        f.write(_freeBlock(size))
+        self.free.append([offset, size])
+
+    def put(self, name, block: bytes, source: str = None, contentHash: str = None):
+        """Writes the N-Quads lines of a graph, replacing its previous version."""
+        name = str(name)
+        with open(self.fileName, 'r+b') as f:
+            entry = self.graphs.get(name)
+            if entry is not None and entry['slot'] >= len(block):
+                offset, slot = entry['offset'], entry['slot']
+            else:
+                if entry is not None:
+                    self._release(f, entry['offset'], entry['slot'])
+                offset, slot = self._allocate(f, len(block))
+            f.seek(offset)
+            f.write(block)
+            if slot > len(block):
+                f.write(_freeBlock(slot - len(block)))
+        self.graphs[name] = {'offset': offset, 'length': len(block), 'slot': slot,
+                             'source': source, 'hash': contentHash}
+
+    def remove(self, name):
+        entry = self.graphs.pop(str(name))
+        with open(self.fileName, 'r+b') as f:
+            self._release(f, entry['offset'], entry['slot'])
+
+    def compact(self):
+        """Rewrites the graphs, sorted by name, without free space."""
+        tmpFileName = self.fileName + '.tmp'
+        graphs = {}
+        with open(self.fileName, 'rb') as source, open(tmpFileName, 'wb') as target:
+            for name, entry in sorted(self.graphs.items()):
+                source.seek(entry['offset'])
+                graphs[name] = dict(entry, offset=target.tell(), slot=entry['length'])
+                target.write(source.read(entry['length']))
+        os.replace(tmpFileName, self.fileName)
+        self.graphs, self.free = graphs, []
+        self.save()
+
+    def load(self, fileNames: list[str], prune: bool = False) -> dict:
+        """
+        Writes the graphs of the statement files whose contents changed, like Registry.load. Returns graph
+        name → 'added', 'updated', 'unchanged' or 'removed'.
+        """
+        results = {}
+        try:
+            for fileName in fileNames:
+                name = getGraphName(fileName)
+                entry = self.graphs.get(str(name))
+                h = hashFile(fileName)
+                if entry is not None and entry['hash'] == h:
+                    results[name] = 'unchanged'
+                    continue
+                self.put(name, graphBlock(Graph().parse(fileName), name), os.path.abspath(fileName), h)
+                results[name] = 'updated' if entry is not None else 'added'
+            if prune:
+                for name in self.graphs.keys() - {str(n) for n in results}:
+                    self.remove(name)
+                    results[URIRef(name)] = 'removed'
+        finally:
+            self.save()
+        if self.freeBytes() > COMPACT_RATIO * self.size():
+            self.compact()
+        return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Registry of package statements as one indexed N-Quads file")
+    parser.add_argument("dataset", type=str, help="N-Quads file; the index is written next to it")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    loadParser = subparsers.add_parser("load", help="Write the graphs of (changed) package statement files")
+    loadParser.add_argument("inputs", type=str, nargs="+", help="Generated package statements (.ttl, .nt)")
+    loadParser.add_argument("--prune", action="store_true", help="Remove statements that are not in inputs")
+    getParser = subparsers.add_parser("get", help="Print the N-Quads of one package statement")
+    getParser.add_argument("name", type=str, help="Graph name, or the name of the statement file")
+    subparsers.add_parser("list", help="List the package statements with the offset and length of their graph")
+    subparsers.add_parser("compact", help="Rewrite the file without free space")
+    args = parser.parse_args()
+
+    dataset = NQuadsDataset(args.dataset)
+    if args.command == "load":
+        for name, status in sorted(dataset.load(args.inputs, args.prune).items()):
+            print(f"{status}: {name}")
+    elif args.command == "get":
+        name = args.name if args.name in dataset.graphs else str(getGraphName(args.name))
+        if name not in dataset.graphs:
+            parser.error(f"no graph {name} in {args.dataset}")
+        sys.stdout.buffer.write(dataset.read(name))
+    elif args.command == "compact":
+        dataset.compact()
+    else:
+        for name, entry in sorted(dataset.graphs.items()):
+            print(f"{name}\t{entry['offset']}\t{entry['length']}")
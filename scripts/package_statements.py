@@ -1,11 +1,27 @@
+import argparse
+import glob
+import hashlib
 import types
-import urllib.parse
 import yaml
 import os
+from contextlib import nullcontext
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import rdflib
 from rdflib import Graph, Namespace, URIRef, BNode, Literal
-from rdflib.namespace import RDF, RDFS, OWL, XSD, SKOS, PROV, TIME, SDO, DefinedNamespace, ClosedNamespace, DC, DCTERMS, ORG, QB, URIPattern
+from rdflib.namespace import RDF, RDFS, OWL, XSD, SKOS, PROV, TIME, SDO, DefinedNamespace, ClosedNamespace, DC, DCTERMS, ORG, QB
 import sys
 
+import bia_export
+from bia_export import biaTableFileNames, writeBiaTables
+from build_cache import BuildCache
+from conversion_profile import ConversionProfile, writeReport
+from prefixes import loadPrefixes
+from rdf_stream import TripleWriter, openOutput, resolveRelativeIris, serializeJelly, serializeJsonLd
+from statement_mapping import StatementMapping, loadStatementMapping
+from taxonomy import TaxonomyResolver
+from validate_package_statement import validatePackageStatement
+
 
 class FPR(DefinedNamespace):
     _NS = Namespace("https://w3id.org/zinl/fpr-o#")
@@ -180,25 +196,69 @@ class UO(DefinedNamespace):
 
 TAX = Namespace("https://w3id.org/zinl/fpr-tax#")
 
+PACKAGE_STATEMENTS_IRI = "https://w3id.org/zinl/package-statements/"
 
-def addLitIfPresent(g: Graph, subject: URIRef, predicate: URIRef, col, key: str) -> Graph:
-    obj = col.get(key)
-    if obj is None:
-        return g
-    g.add((subject, predicate, Literal(obj)))
-    return g
+# Prefixes of the terms in the mapping tables
+MAPPING_NAMESPACES = {
+    'rdf': RDF, 'rdfs': RDFS, 'xsd': XSD, 'dc': DC, 'dcterms': DCTERMS, 'prov': PROV, 'schema': SDO, 'qb': QB,
+    'fpr': FPR, 'pico': PICO, 'obi': OBI, 'fabio': FABIO, 'iao': IAO, 'stato': STATO, 'ro': RO, 'uo': UO,
+}
 
-def addIntIfPresent(g: Graph, subject: URIRef, predicate: URIRef, col, key: str) -> Graph:
-    obj = col.get(key)
-    if obj is None:
-        return g
-    g.add((subject, predicate, Literal(obj, datatype=XSD.integer)))
-    return g
+# Skolem IRIs of the nodes that are blank nodes unless the conversion is skolemized
+SKOLEM_IRI = PACKAGE_STATEMENTS_IRI + ".well-known/genid/"
+
+PACKAGE_STATEMENT_GLOB = "*_ps.yaml"
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(SCRIPTS_DIR), 'src')
+TAXONOMY_TSV = os.path.join(SRC_DIR, 'data', 'taxonomy.tsv')
+PREFIXES_JSONLD = os.path.join(SRC_DIR, 'prefixes.jsonld')
+# Mapping of the YAML fields to RDF, see statement_mapping.py
+MAPPING_TSV = os.path.join(SRC_DIR, 'model', 'package-statement-mapping.tsv')
+ENUMS_TSV = os.path.join(SRC_DIR, 'model', 'package-statement-enums.tsv')
+
+# File extensions per output format and compression
+OUTPUT_EXTENSIONS = {'turtle': '.ttl', 'nt': '.nt', 'nquads': '.nq', 'json-ld': '.jsonld', 'jelly': '.jelly'}
+COMPRESSION_EXTENSIONS = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+# Formats written line by line while converting; the others are serialized from an in-memory graph
+STREAMED_FORMATS = ('nt', 'nquads')
+
+# Files whose contents determine the conversion output (mapping code and namespace classes)
+CONVERTER_SOURCES = [os.path.abspath(__file__)] + [os.path.join(SCRIPTS_DIR, module) for module in (
+    'rdf_stream.py', 'prefixes.py', 'taxonomy.py', 'validate_package_statement.py', 'bia_export.py',
+    'statement_mapping.py')] + [TAXONOMY_TSV, PREFIXES_JSONLD, MAPPING_TSV, ENUMS_TSV]
+
+
+_taxonomyResolver = None
+
+def getTaxonomyResolver() -> TaxonomyResolver:
+    # Loaded once per process
+    global _taxonomyResolver
+    if _taxonomyResolver is None:
+        _taxonomyResolver = TaxonomyResolver.fromTemplate(TAXONOMY_TSV, loadPrefixes(PREFIXES_JSONLD), TAX)
+    return _taxonomyResolver
+
+_jsonLdContext = None
+
+def getJsonLdContext() -> dict:
+    # The prefixes of src/prefixes.jsonld, loaded once per process
+    global _jsonLdContext
+    if _jsonLdContext is None:
+        _jsonLdContext = loadPrefixes(PREFIXES_JSONLD)
+    return _jsonLdContext
 
-# TODO: Use different local name pattern
+# TODO: Use different local name pattern for terms that are not in the taxonomy
 def getTaxonomyTerm(label: str) -> URIRef:
-    encoded_label = urllib.parse.quote(label)
-    return TAX[encoded_label]
+    return getTaxonomyResolver().getTerm(label)
+
+_statementMapping = None
+
+def getStatementMapping() -> StatementMapping:
+    # Compiled once per process
+    global _statementMapping
+    if _statementMapping is None:
+        _statementMapping = loadStatementMapping(MAPPING_TSV, ENUMS_TSV, MAPPING_NAMESPACES, getTaxonomyTerm)
+    return _statementMapping
 
 def addNamespaces(g: Graph):
     g.bind("fpr", FPR)
@@ -215,19 +275,166 @@ def addNamespaces(g: Graph):
     g.bind("UO", UO)
 
 
-def createPackageStatementsFromYaml(inputFileName: str, outputFileName: str):
-    # Load YAML data
-    with open(inputFileName, 'r') as f:
-        data = yaml.safe_load(f)
-
-    # Create RDF graph
-    g = Graph()
-    addNamespaces(g)
-
-    name = os.path.splitext(os.path.basename(inputFileName))[0]
-    NSDATA = Namespace("https://w3id.org/zinl/package-statements/" + name + "#")
-    g.bind("data", NSDATA)
-
+def blankNode(parent: URIRef, role: str) -> BNode:
+    return BNode()
+
+
+def skolemNode(parent: URIRef, role: str) -> URIRef:
+    """A stable IRI for the node with this role of parent, so the same input always gives the same output."""
+    return URIRef(SKOLEM_IRI + hashlib.sha256(f"{parent} {role}".encode('utf-8')).hexdigest()[:32])
+
+
+def _addPublisher(g: Graph, package: dict, subj: URIRef, data: dict, NSDATA: Namespace):
+    g.add((subj, DCTERMS.publisher, NSDATA["OrganizationalUnit-Team-Pakket-en-Advies"]))
+
+
+def _addIICAssessmentNodes(g: Graph, iic: dict, subj: URIRef, data: dict, NSDATA: Namespace, node=blankNode):
+    ## Add Costeffectiveness
+    costEffectiveness = node(subj, 'cost-effectiveness')
+    g.add((costEffectiveness, RDF.type, FPR.CostEffectiveness))
+    g.add((costEffectiveness, FPR.isCostEffective, Literal(iic['cost-effective'], datatype=XSD.boolean)))
+    g.add((subj, FPR.hasCostEffectiveness, costEffectiveness))
+    meaText = iic.get('managed-entry-agreement-text')
+    if meaText:
+        mea = node(subj, 'managed-entry-agreement')
+        g.add((mea, RDF.type, FPR.ManagedEntryAgreement))
+        g.add((mea, SKOS.note, Literal(meaText)))
+        g.add((subj, FPR.hasManagedEntryAgreement, mea))
+
+
+def _addEMSMPOutcomeMeasurements(g: Graph, emsmp: dict, subj: URIRef, data: dict, NSDATA: Namespace):
+    # Tie outcome measurements to EMSMP:
+    for outcomeMeasurementId in data.get('outcome-measurement-ids', []):
+        g.add((subj, FPR.hasOutcomeMeasurement, NSDATA[outcomeMeasurementId]))
+
+
+def _addDateLimit(g: Graph, search: dict, subj: URIRef, data: dict, NSDATA: Namespace, node=blankNode):
+    rangeBeginning = search.get('range-beginning')
+    rangeEnd = search.get('range-end')
+
+    # :YearRange a time:Interval ;
+    #   time:hasBeginning [ a time:Instant ; time:inXSDgYear "2000"^^xsd:gYear ] ;
+    #   time:hasEnd [ a time:Instant ; time:inXSDgYear "2010"^^xsd:gYear ] .
+
+    # Add TIME.hasBeginning and TIME.hasEnd if present
+    if rangeBeginning or rangeEnd:
+        yearRange = node(subj, 'date-limit')
+        g.add((yearRange, RDF.type, TIME.Interval))
+        g.add((subj, FPR.hasDateLimit, yearRange))
+        if rangeBeginning:
+            beginning = node(yearRange, 'beginning')
+            g.add((beginning, RDF.type, TIME.Instant))
+            g.add((beginning, TIME.inXSDgYear, Literal(rangeBeginning, datatype=XSD.gYear)))
+            g.add((yearRange, TIME.hasBeginning, beginning))
+        if rangeEnd:
+            end = node(yearRange, 'end')
+            g.add((end, RDF.type, TIME.Instant))
+            g.add((end, TIME.inXSDgYear, Literal(rangeEnd, datatype=XSD.gYear)))
+            g.add((yearRange, TIME.hasEnd, end))
+
+
+def _addStudyCitations(g: Graph, study: dict, subj: URIRef, data: dict, NSDATA: Namespace):
+    # TODO: incomplete mapping
+    for publicationId in data.get('literature-reference-lists', []):
+        g.add((subj, DCTERMS.bibliographicCitation, NSDATA[publicationId]))
+        g.add((NSDATA[publicationId], IAO.isAbout, subj))
+
+
+def _addConfidenceInterval(g: Graph, outcomeMeasurement: dict, subj: URIRef, data: dict, NSDATA: Namespace,
+                           node=blankNode):
+    ciLower = outcomeMeasurement.get('ci-lower')
+    ciUpper = outcomeMeasurement.get('ci-upper')
+
+    # Create blank nodes for lower and upper limit, and for CI95
+    if ciUpper and ciLower:
+        ci = node(subj, 'ci95')
+        ciLowerBN = node(ci, 'lower-limit')
+        g.add((ciLowerBN, RDF.type, STATO.lowerLimit))
+        g.add((ciLowerBN, STATO.hasValue, Literal(outcomeMeasurement['ci-lower'], datatype=XSD.float)))
+        ciUpperBN = node(ci, 'upper-limit')
+        g.add((ciUpperBN, RDF.type, STATO.upperLimit))
+        g.add((ciUpperBN, STATO.hasValue, Literal(outcomeMeasurement['ci-upper'], datatype=XSD.float)))
+        g.add((ci, RDF.type, STATO.CI95))
+        g.add((ci, IAO.isAbout, subj))
+        g.add((ci, RO.hasPart, ciLowerBN))
+        g.add((ci, RO.hasPart, ciUpperBN))
+
+
+def _addTrendObservations(g: Graph, trend: dict, subjDataset: URIRef, data: dict, NSDATA: Namespace):
+    for i, timepoint in enumerate(trend.get('time-points', ['default'])):
+        postfix = timepoint
+        timeUnit = trend.get('time-unit')
+        if timeUnit:
+            postfix = f"{timeUnit}-{timepoint}"
+        subjTimepoint = NSDATA[f"{trend['id']}-{postfix}"]
+        g.add((subjTimepoint, RDF.type, QB.Observation))
+        g.add((subjTimepoint, QB.dataSet, subjDataset))
+        g.add((subjTimepoint, FPR.hasTimepoint, Literal(timepoint)))
+        g.add((subjTimepoint, FPR.hasNumberOfPatients, Literal(trend['number-of-patients'][i], datatype=XSD.integer)))
+        interventionMarketPenetration = trend.get('intervention-market-penetration')
+        if interventionMarketPenetration:
+            g.add((subjTimepoint, FPR.hasMarketPenetration, Literal(trend['intervention-market-penetration'][i], datatype=XSD.float)))
+
+
+def _addCostObservations(g: Graph, costEstimation: dict, subjCostEstimation: URIRef, data: dict, NSDATA: Namespace):
+    for observationGroup in costEstimation.get('observation-groups', []):
+        costEstimationType = observationGroup['type']
+        for i, timepoint in enumerate(costEstimation.get('time-points', ['default'])):
+            postfix = timepoint
+            timeUnit = costEstimation.get('time-unit')
+            if timeUnit:
+                postfix = f"{timeUnit}-{timepoint}"
+            interventionIds = '-'.join(observationGroup.get('intervention-ids', []))
+            subjTimepoint = NSDATA[f"{costEstimation['id']}-{interventionIds}-{costEstimationType}-{postfix}"]
+            g.add((subjTimepoint, RDF.type, QB.Observation))
+            g.add((subjTimepoint, FPR.hasCostType, FPR[costEstimationType]))
+            g.add((subjTimepoint, QB.dataSet, subjCostEstimation))
+            g.add((subjTimepoint, FPR.hasTimepoint, Literal(timepoint)))
+            for interventionId in observationGroup.get('intervention-ids', []):
+                g.add((subjTimepoint, FPR.hasIntervention, NSDATA[interventionId]))
+            g.add((subjTimepoint, FPR.hasNumberOfPatients, Literal(observationGroup['number-of-patients'][i], datatype=XSD.integer)))
+            g.add((subjTimepoint, FPR.hasTotalCosts, Literal(observationGroup['total-costs'][i], datatype=XSD.float)))
+
+
+def _addAgreements(g: Graph, au: dict, subj: URIRef, data: dict, NSDATA: Namespace):
+    for i, agreement in enumerate(au.get('agreements', [])):
+        itemUri = NSDATA[f"Agreement-{i}"]
+        g.add((subj, DCTERMS.hasPart, itemUri))
+        g.add((itemUri, DCTERMS.title, Literal(agreement, lang="nl")))
+
+
+# Triples that do not follow from the fields of a record one by one (blank nodes, observations per
+# timepoint), added after the mapped fields of each record of these sections
+SECTION_EXTRAS = {
+    'package-statement': _addPublisher,
+    'intervention-indication-combination-assessments': _addIICAssessmentNodes,
+    'emsmps': _addEMSMPOutcomeMeasurements,
+    'literature-searches': _addDateLimit,
+    'studies': _addStudyCitations,
+    'outcome-measurements': _addConfidenceInterval,
+    'trend-assumptions': _addTrendObservations,
+    'cost-estimations': _addCostObservations,
+    'appropriate-use': _addAgreements,
+}
+# The same with skolem IRIs instead of blank nodes
+SKOLEMIZED_SECTION_EXTRAS = dict(SECTION_EXTRAS, **{
+    section: partial(SECTION_EXTRAS[section], node=skolemNode)
+    for section in ('intervention-indication-combination-assessments', 'literature-searches', 'outcome-measurements')
+})
+
+
+def addPackageStatement(g: Graph, data: dict, NSDATA: Namespace, profile: ConversionProfile = None,
+                        skolemize: bool = False) -> Graph:
+    """
+    Adds the triples of a parsed package statement YAML document to g. Only g.add() is used,
+    so g can also be a TripleWriter that streams the triples to a file as they are produced.
+    The fields of each section are mapped as in src/model/package-statement-mapping.tsv,
+    plus the SECTION_EXTRAS. With a profile, the time and triples of each section are recorded.
+    With skolemize, cost-effectiveness, managed-entry agreements, date limits and confidence intervals
+    get skolem IRIs derived from their parent and role instead of blank nodes.
+    """
+    mark = profile.mark if profile is not None else lambda section, g: None
+    mark('organisations', g)
     # Add ZIN organisations
     zin = NSDATA["Organization-ZorginstituutNederland"]
     zorg1 = NSDATA["OrganizationalUnit-Department-Zorg-I"]
@@ -241,397 +448,261 @@ def createPackageStatementsFromYaml(inputFileName: str, outputFileName: str):
     g.add((teamPackageAndAdvice, RDFS.label, Literal("Team Pakket en Advies")))
     g.add((zorg1, ORG.hasUnit, teamPackageAndAdvice))
 
-    # Add package statement
-    package = data['package-statement']
-    subj = NSDATA[package['id']]
-    g.add((subj, RDF.type, FPR.PackageStatement))
-    g.add((subj, FPR.hasPackageType, FPR[package['package-type']]))
-    medicationSubtype = package.get('package-type-medication-subtype')
-    if medicationSubtype:
-        g.add((subj, FPR.hasPackageTypeMedicationSubtype, FPR[medicationSubtype]))
-    g.add((subj, RDFS.label, Literal(package['title'])))
-    g.add((subj, DCTERMS.issued, Literal(package['date'], datatype=XSD.date)))
-    g.add((subj, FPR.hasCaseNumber, Literal(package['case-number'], datatype=XSD.integer)))
-    g.add((subj, FPR.hasSerialNumber, Literal(package['serial-number'], datatype=XSD.integer)))
-    g.add((subj, FPR.hasStatus, FPR[package['status']]))
-    for contact in package['contact-person']:
-        g.add((subj, DC.contributor, Literal(contact))) # TODO: Use Agent or FOAF
-    g.add((subj, DCTERMS.publisher, teamPackageAndAdvice))
-    g.add((subj, RDFS.seeAlso, URIRef(package['see-also'])))
-    guarantee_document = package.get('guarantee-document')
-    if guarantee_document:
-        g.add((subj, FPR.hasGuaranteeDocument, URIRef(guarantee_document)))
-    for iic in package['iic-assessments']:
-        g.add((subj, FPR.hasIICAssessment, NSDATA[iic]))
-
-    # Create populations
-    for population in data['populations']:
-        subj = NSDATA[population['id']]
-        g.add((subj, RDF.type, PICO.Population))
-        g.add((subj, RDFS.label, Literal(population['title'])))
-        sex = population.get('sex')
-        if sex:
-            g.add((subj, PICO.sex, getTaxonomyTerm(sex)))
-        age = population.get('age')
-        if age:
-            g.add((subj, PICO.age, getTaxonomyTerm(age)))
-        for condition in population['conditions']:
-            g.add((subj, PICO.condition, getTaxonomyTerm(condition)))
-        for treatment in population.get('treatment', []):
-            g.add((subj, PICO.treatment, getTaxonomyTerm(treatment)))
-
-    # Create interventions
-    for intervention in data['interventions']:
-        subj = NSDATA[intervention['id']]
-        g.add((subj, RDF.type, PICO.Intervention))
-        g.add((subj, DCTERMS.title, Literal(intervention['title'])))
-        g.add((subj, PICO.appliedIntervention, getTaxonomyTerm(intervention['applied-intervention'])))
-        g.add((subj, PICO.interventionRationale, Literal(intervention['intervention-rationale'])))
-        g.add((subj, PICO.interventionClassification, getTaxonomyTerm(intervention['intervention-classification'])))
-        addLitIfPresent(g, subj, FPR.hasMarketingAuthorizationHolder, intervention, 'marketing-authorization-holder')
-        addIntIfPresent(g, subj, FPR.hasClaimCode, intervention, 'claim-code')
-        addLitIfPresent(g, subj, FPR.hasCareActivityCode, intervention, 'care-activity-code')
-        addLitIfPresent(g, subj, FPR.hasCareProductCode, intervention, 'care-product-code')
-        # For pharmaceuticals, add drug information:
-        addLitIfPresent(g, subj, FPR.hasINN, intervention, 'inn')
-        addLitIfPresent(g, subj, FPR.hasATCCode, intervention, 'atc-code')
-        addLitIfPresent(g, subj, FPR.hasEMARef, intervention, 'ema-id')
-        # TODO: Add schedule, dose, duration
-        costs = intervention.get('costs')
-        if costs:
-            g.add((subj, FPR.hasTotalCosts, Literal(costs, datatype=XSD.float)))
-        child_interventions = intervention.get('child-interventions', [])
-        for child in child_interventions:
-            g.add((subj, PICO.childIntervention, NSDATA[child]))
-
-    # Create intervention groups:
-    for interventionGroup in data['intervention-groups']:
-        subj = NSDATA[interventionGroup['id']]
-        g.add((subj, RDF.type, PICO.InterventionGroup))
-        interventionIds = interventionGroup.get('intervention-ids', [])
-        for interventionId in interventionIds:
-            g.add((subj, PICO.intervention, NSDATA[interventionId]))
-
-    # Create outcomes
-    for outcome in data['outcomes']:
-        subj = NSDATA[outcome['id']]
-        g.add((subj, RDF.type, PICO.Outcome))
-        g.add((subj, RDFS.label, Literal(outcome['name'])))
-        g.add((subj, PICO.outcomeClassification, getTaxonomyTerm(outcome['outcome-classification'])))
-        g.add((subj, PICO.outcomeMeasurement, getTaxonomyTerm(outcome['outcome-measurement'])))
-        specificMetric = outcome.get('specific-metric')
-        if specificMetric:
-            g.add((subj, PICO.specificMetric, getTaxonomyTerm(specificMetric)))
-        g.add((subj, FPR.isSurrogateOutcome, Literal(outcome['surrogate-outcome'], datatype=XSD.boolean)))
-
-    # Create outcome groups:
-    for outcomeGroup in data['outcome-groups']:
-        subj = NSDATA[outcomeGroup['id']]
-        g.add((subj, RDF.type, PICO.OutcomeGroup))
-        g.add((subj, PICO.endpoint, Literal(outcomeGroup['endpoint'])))
-        outcomeIds = outcomeGroup.get('outcome-ids', [])
-        for outcomeId in outcomeIds:
-            g.add((subj, PICO.outcome, NSDATA[outcomeId]))
-
-    # Create PICO
-    for picots in data['picots']:
-        subj = NSDATA[picots['id']]
-        g.add((subj, RDF.type, PICO.PICO))
-        for populationId in picots.get('population-ids', []):
-            g.add((subj, PICO.population, NSDATA[populationId]))
-        g.add((subj, PICO.interventionGroup, NSDATA[picots['intervention-group-id']]))
-        g.add((subj, PICO.comparatorGroup, NSDATA[picots['comparator-group-id']]))
-        for outcomeId in picots.get('outcome-group-ids', []):
-            g.add((subj, PICO.outcome, NSDATA[outcomeId]))
-
-    # Create intervention-hasIndication-combination-assessments
-    for iic in data['intervention-indication-combination-assessments']:
-        subj = NSDATA[iic['id']]
-        g.add((subj, RDF.type, FPR.IICAssessment))
-        assessmentType = iic.get('assessment-type')
-        if assessmentType == "Initial":
-            g.add((subj, FPR.hasAssessmentType, FPR.InitialAssessment))
-        elif assessmentType == "Reassessment":
-            g.add((subj, FPR.hasAssessmentType, FPR.Reassessment))
-        elif assessmentType == "Indication extension":
-            g.add((subj, FPR.hasAssessmentType, FPR.IndicationExtension))
-        elif assessmentType == "Indication broadening":
-            g.add((subj, FPR.hasAssessmentType, FPR.IndicationBroadening))
-        g.add((subj, FPR.hasIntervention, NSDATA[iic['intervention-id']]))
-        for indicationId in iic.get('indication-ids', []):
-            g.add((subj, FPR.hasIndication, NSDATA[indicationId]))
-        g.add((subj, FPR.hasEMSMP, NSDATA[iic['emsmp-id']]))
-        g.add((subj, FPR.hasBIA, NSDATA[iic['bia-id']]))
-        g.add((subj, FPR.hasConclusion, FPR[iic['conclusion']]))
-        g.add((subj, FPR.hasConclusionText, Literal(iic['conclusion-text'])))
-        ## Add Costeffectiveness
-        costEffectiveness = BNode()
-        g.add((costEffectiveness, RDF.type, FPR.CostEffectiveness))
-        g.add((costEffectiveness, FPR.isCostEffective, Literal(iic['cost-effective'], datatype=XSD.boolean)))
-        g.add((subj, FPR.hasCostEffectiveness, costEffectiveness))
-        meaText = iic.get('managed-entry-agreement-text')
-        if meaText:
-            mea = BNode()
-            g.add((mea, RDF.type, FPR.ManagedEntryAgreement))
-            g.add((mea, SKOS.note, Literal(meaText)))
-            g.add((subj, FPR.hasManagedEntryAgreement, mea))
-
-    # Create established medical science and medical practice
-    for emsmp in data['emsmps']:
-        subj = NSDATA[emsmp['id']]
-        g.add((subj, RDF.type, FPR.EMSMP))
-        g.add((subj, DCTERMS.title, Literal(emsmp['title'])))
-        g.add((subj, FPR.hasPICO, NSDATA[emsmp['picots-id']]))
-        g.add((subj, FPR.hasSystematicLiteratureReview, NSDATA[emsmp['slr-id']]))
-        # Tie outcome measurements to EMSMP:
-        for outcomeMeasurementId in data.get('outcome-measurement-ids', []):
-            g.add((subj, FPR.hasOutcomeMeasurement, NSDATA[outcomeMeasurementId]))
-        relative_effectiveness = emsmp.get('relative-effectiveness')
-        if relative_effectiveness:
-            g.add((subj, FPR.hasRelativeEffectiveness, FPR[relative_effectiveness]))
-        g.add((subj, FPR.adheresToEMSMP, Literal(emsmp['adheres-to-emsmps'], datatype=XSD.boolean)))
-
-    # Systematic literature reviews
-    for slr in data['systematic-literature-reviews']:
-        subj = NSDATA[slr['id']]
-        g.add((subj, RDF.type, FPR.SystematicLiteratureReview))
-        g.add((subj, DCTERMS.title, Literal(slr['title'])))
-        for searchId in slr.get('literature-searches', []):
-            g.add((subj, DCTERMS.hasPart, NSDATA[searchId]))
-        g.add((subj, SDO.result, NSDATA[slr['literature-reference-list']]))
-        g.add((NSDATA[slr['literature-reference-list']], PROV.wasGeneratedBy, subj))
-
-    # Literature search
-    for search in data['literature-searches']:
-        subj = NSDATA[search['id']]
-        g.add((subj, RDF.type, FPR.LiteratureSearch))
-        g.add((subj, RDFS.label, Literal(search['label'])))
-        g.add((subj, PROV.endedAtTime, Literal(search['end-time'], datatype=XSD.dateTime)))
-        g.add((subj, SDO.name, Literal(search['target-db'])))
-        g.add((subj, SDO.target, URIRef(search['target-url'])))
-        g.add((subj, SDO.query, Literal(search['query'])))
-        evidenceType = search.get('evidence-type')
-        if evidenceType == "Clinical Trial" or evidenceType == "RCT":
-            g.add((subj, FPR.hasEvidenceType, OBI.ClinicalTrial))
-        elif evidenceType == "Systematic Review":
-            g.add((subj, FPR.hasEvidenceType, FABIO.SystematicLiteratureReview))
-        elif evidenceType is None:
-            pass
-        else:
-            raise NotImplementedError(f"Evidence type '{evidenceType}' not implemented")
-            
-        rangeBeginning = search.get('range-beginning')
-        rangeEnd = search.get('range-end')
-        
-        # :YearRange a time:Interval ;
-        #   time:hasBeginning [ a time:Instant ; time:inXSDgYear "2000"^^xsd:gYear ] ;
-        #   time:hasEnd [ a time:Instant ; time:inXSDgYear "2010"^^xsd:gYear ] .
-    
-        # Add TIME.hasBeginning and TIME.hasEnd if present
-        if rangeBeginning or rangeEnd:
-            yearRange = BNode()
-            g.add((yearRange, RDF.type, TIME.Interval))
-            g.add((subj, FPR.hasDateLimit, yearRange))
-            if rangeBeginning:
-                beginning = BNode()
-                g.add((beginning, RDF.type, TIME.Instant))
-                g.add((beginning, TIME.inXSDgYear, Literal(rangeBeginning, datatype=XSD.gYear)))
-                g.add((yearRange, TIME.hasBeginning, beginning))
-            if rangeEnd:
-                end = BNode()
-                g.add((end, RDF.type, TIME.Instant))
-                g.add((end, TIME.inXSDgYear, Literal(rangeEnd, datatype=XSD.gYear)))
-                g.add((yearRange, TIME.hasEnd, end))
-
-    # Publications:
-    for publication in data['publications']:
-        subj = NSDATA[publication['id']]
-        g.add((subj, DCTERMS.title, Literal(publication['title'])))
-        publicationType = publication['type']
-        if publicationType == "JournalArticle":
-            g.add((subj, RDF.type, FABIO.JournalArticle))
-        elif publicationType == "Manuscript":
-            g.add((subj, RDF.type, FABIO.Manuscript))
-        else:
-            raise NotImplementedError(f"Publication type '{publicationType}' not implemented")
-            # TODO: incomplete mapping
-    
-    # Literature reference list
-    for lrl in data['literature-reference-lists']:
-        subj = NSDATA[lrl['id']]
-        g.add((subj, RDF.type, FABIO.SystematicLiteratureReview))
-        g.add((subj, DCTERMS.title, Literal(lrl['title'])))
-        g.add((subj, SDO.numberOfItems, Literal(lrl['number-of-items'], datatype=XSD.integer)))
-        for referenceId in lrl.get('references', []):
-            g.add((subj, SDO.itemListElement, NSDATA[referenceId]))
-            g.add((subj, PROV.hadMember, NSDATA[referenceId]))
-
-    # Studies:
-    for study in data['studies']:
-        subj = NSDATA[study['id']]
-        g.add((subj, RDF.type, OBI.ClinicalTrial))
-        g.add((subj, DCTERMS.title, Literal(study['title'])))
-        g.add((subj, DCTERMS.source, URIRef(study['registry'])))
-        g.add((subj, DCTERMS.identifier, Literal(study['registry-id'])))
-        g.add((subj, RDFS.seeAlso, URIRef(study['url'])))
-        # TODO: incomplete mapping
-        for publicationId in data.get('literature-reference-lists', []):
-            g.add((subj, DCTERMS.bibliographicCitation, NSDATA[publicationId]))
-            g.add((NSDATA[publicationId], IAO.isAbout, subj))
-    
-    # Cohorts:
-    for cohort in data['cohorts']:
-        subj = NSDATA[cohort['id']]
-        g.add((subj, RDF.type, STATO.Cohort))
-        g.add((subj, RO.participatesIn, NSDATA[cohort['study-id']]))
-        g.add((subj, RO.concretizes, NSDATA[cohort['intervention-group-id']]))
-    
-    # Outcome measurements
-    for outcomeMeasurement in data['outcome-measurements']:
-        subj = NSDATA[outcomeMeasurement['id']]
-        measureType = outcomeMeasurement.get('type')
-        if measureType == 'standardized mean difference':
-            g.add((subj, RDF.type, STATO.StandardizedMeanDifference))
-        elif measureType == 'mean difference':
-            g.add((subj, RDF.type, STATO.MeanDifference))
-        elif measureType == 'median difference':
-            g.add((subj, RDF.type, STATO.MedianDifference))
-        elif measureType == 'hazard ratio':
-            g.add((subj, RDF.type, STATO.HazardRatio))
-        elif measureType == 'risk ratio':
-            g.add((subj, RDF.type, STATO.RelativeRisk))
-        elif measureType == 'absolute difference':
-            g.add((subj, RDF.type, STATO.AbsoluteDifference))
-        elif measureType is None:
-            pass
-        else:
-            raise NotImplementedError(f"Outcome measurement type '{measureType}' not implemented")
-            # TODO: add other types
-        for cohortId in outcomeMeasurement.get('cohort-ids', []):
-            g.add((subj, IAO.isAbout, NSDATA[cohortId]))
-        g.add((subj, IAO.isQualityMeasurementOf, URIRef(outcomeMeasurement['outcome-id'])))
-        g.add((subj, STATO.hasValue, Literal(outcomeMeasurement['value'], datatype=XSD.float)))
-        unit = outcomeMeasurement.get('unit')
-        if unit == '%':
-            g.add((subj, IAO.hasMeasurementUnitLabel, UO.percent))
-        elif unit == 'ml':
-            g.add((subj, IAO.hasMeasurementUnitLabel, UO.milliliter))
-        elif unit == 'months':
-            g.add((subj, IAO.hasMeasurementUnitLabel, UO.month))
-        elif unit is None:
-            pass
-        else:
-            raise NotImplementedError(f"Outcome measurement unit '{unit}' not implemented")
-        # Confidence interval
-        ciLower = outcomeMeasurement.get('ci-lower')
-        ciUpper = outcomeMeasurement.get('ci-upper')
-        
-        # Create blank nodes for lower and upper limit, and for CI95
-        if ciUpper and ciLower:
-            ciLowerBN = BNode()
-            g.add((ciLowerBN, RDF.type, STATO.lowerLimit))
-            g.add((ciLowerBN, STATO.hasValue, Literal(outcomeMeasurement['ci-lower'], datatype=XSD.float)))
-            ciUpperBN = BNode()
-            g.add((ciUpperBN, RDF.type, STATO.upperLimit))
-            g.add((ciUpperBN, STATO.hasValue, Literal(outcomeMeasurement['ci-upper'], datatype=XSD.float)))
-            ci = BNode()
-            g.add((ci, RDF.type, STATO.CI95))
-            g.add((ci, IAO.isAbout, subj))
-            g.add((ci, RO.hasPart, ciLowerBN))
-            g.add((ci, RO.hasPart, ciUpperBN))
-
-    # Trend assumptions
-    trendAssumptionURIPattern = URIPattern(NSDATA + "DataSet-{id}")
-    for trend in data.get('trend-assumptions', []):
-        subjDataset = trendAssumptionURIPattern.format(id=trend['id'])
-        g.add((subjDataset, RDF.type, QB.DataSet))
-        g.add((subjDataset, DCTERMS.title, Literal(trend['title'])))
-        g.add((subjDataset, FPR.hasScenario, NSDATA[trend['scenario-id']]))
-        for i, timepoint in enumerate(trend.get('time-points', ['default'])):
-            postfix = timepoint
-            timeUnit = trend.get('time-unit')
-            if timeUnit:
-                postfix = f"{timeUnit}-{timepoint}"
-            subjTimepoint = NSDATA[f"{trend['id']}-{postfix}"]
-            g.add((subjTimepoint, RDF.type, QB.Observation))
-            g.add((subjTimepoint, QB.dataSet, subjDataset))
-            g.add((subjTimepoint, FPR.hasTimepoint, Literal(timepoint)))
-            g.add((subjTimepoint, FPR.hasNumberOfPatients, Literal(trend['number-of-patients'][i], datatype=XSD.integer)))
-            interventionMarketPenetration = trend.get('intervention-market-penetration')
-            if interventionMarketPenetration:
-                g.add((subjTimepoint, FPR.hasMarketPenetration, Literal(trend['intervention-market-penetration'][i], datatype=XSD.float)))
-
-    # Scenarios:
-    for i, scenario in enumerate(data.get('scenarios', [])):
-        subjScenario = NSDATA[scenario['id']]
-        g.add((subjScenario, RDF.type, FPR.Scenario))
-        g.add((subjScenario, DCTERMS.title, Literal(scenario['title'])))
-        g.add((subjScenario, DCTERMS.description, Literal(scenario['description'])))
-
-    # Cost estimations:
-    costEstimationPattern = URIPattern(NSDATA + "DataSet-{id}")
-    for i, costEstimation in enumerate(data.get('cost-estimations', [])):
-        subjCostEstimation = costEstimationPattern.format(id=costEstimation['id'])
-        g.add((subjCostEstimation, RDF.type, QB.DataSet))
-        g.add((subjCostEstimation, DCTERMS.title, Literal(costEstimation['title'])))
-        g.add((subjCostEstimation, FPR.hasScenario, NSDATA[costEstimation['scenario-id']]))
-        g.add((subjCostEstimation, PROV.wasDerivedFrom, trendAssumptionURIPattern.format(id=costEstimation['trend-assumption-id'])))
-        for observationGroup in costEstimation.get('observation-groups', []):
-            costEstimationType = observationGroup['type']            
-            for i, timepoint in enumerate(costEstimation.get('time-points', ['default'])):
-                postfix = timepoint
-                timeUnit = costEstimation.get('time-unit')
-                if timeUnit:
-                    postfix = f"{timeUnit}-{timepoint}"
-                interventionIds = '-'.join(observationGroup.get('intervention-ids', []))
-                subjTimepoint = NSDATA[f"{costEstimation['id']}-{interventionIds}-{costEstimationType}-{postfix}"]
-                g.add((subjTimepoint, RDF.type, QB.Observation))
-                g.add((subjTimepoint, FPR.hasCostType, FPR[costEstimationType]))
-                g.add((subjTimepoint, QB.dataSet, subjCostEstimation))
-                g.add((subjTimepoint, FPR.hasTimepoint, Literal(timepoint)))
-                for interventionId in observationGroup.get('intervention-ids', []):
-                    g.add((subjTimepoint, FPR.hasIntervention, NSDATA[interventionId]))
-                g.add((subjTimepoint, FPR.hasNumberOfPatients, Literal(observationGroup['number-of-patients'][i], datatype=XSD.integer)))
-                g.add((subjTimepoint, FPR.hasTotalCosts, Literal(observationGroup['total-costs'][i], datatype=XSD.float)))
-
-    # BIA:
-    for bia in data['bias']:
-        subj = NSDATA[bia['id']]
-        g.add((subj, RDF.type, FPR.BIA))
-        g.add((subj, DCTERMS.title, Literal(bia['title'])))
-        trendAssumption = trendAssumptionURIPattern.format(id=bia['trend-assumption-id'])
-        g.add((subj, FPR.hasTrendAssumption, trendAssumption))
-        for costEstimationId in bia['cost-estimation-ids']:
-            costEstimation = costEstimationPattern.format(id=costEstimationId)
-            g.add((subj, FPR.hasCostEstimation, costEstimation))
-
-    # Appropriate use agreements
-    au = data.get('appropriate-use', [])
-    if au:
-        subj = NSDATA[au['id']]
-        g.add((subj, RDF.type, FPR.AppropriateUseAgreement))
-        g.add((subj, DCTERMS.title, Literal(au['title'])))
-        date = au.get('date')
-        if date:
-            g.add((subj, DCTERMS.issued, Literal(date, datatype=XSD.date)))
-        for i, agreement in enumerate(au.get('agreements', [])):
-            itemUri = NSDATA[f"Agreement-{i}"]
-            g.add((subj, DCTERMS.hasPart, itemUri))
-            g.add((itemUri, DCTERMS.title, Literal(agreement, lang="nl")))
-
-
-    # Serialize graph to Turtle to file
-    g.serialize(outputFileName, 'turtle', NSDATA)
-
+    extras = SKOLEMIZED_SECTION_EXTRAS if skolemize else SECTION_EXTRAS
+    getStatementMapping().emit(g, data, NSDATA, extras, mark)
+    if profile is not None:
+        profile.endSection(g)
+    return g
 
 
-if __name__ == '__main__':
-    if len(sys.argv) != 3:
-        print(f"Usage: {sys.argv[0]} <input_yaml_file> <output_ttl_file>")
-        sys.exit(1)
+def createPackageStatementsFromYaml(inputFileName: str, outputFileName: str, format: str = 'turtle',
+                                    compress: str = None, strict: bool = False, columnarDir: str = None,
+                                    columnarFormat: str = 'parquet', profile: ConversionProfile = None,
+                                    skolemize: bool = False):
+    """
+    Converts a package statement YAML file to RDF. Turtle ('turtle', for reading), JSON-LD ('json-ld',
+    compacted with the prefixes of src/prefixes.jsonld) and binary Jelly ('jelly', needs pyjelly) output
+    is built in an in-memory graph; N-Triples ('nt') and N-Quads ('nquads', one named graph per statement)
+    are written line by line as the triples are produced and are the fastest to write and to bulk-load.
+    With compress='gzip' or 'zstd' (needs zstandard) the output is compressed while it is written.
+    Dangling cross-references are checked before conversion and taxonomy labels that are not in
+    the taxonomy after conversion. Both are reported together, as a warning or, with strict, as a
+    ValueError (in which case no output is left behind).
+    With columnarDir, the cost estimations and trend assumptions are also written as tables
+    (see bia_export.py) in columnarFormat.
+    With a profile, the time of each phase (parse, validate, convert, serialize, columnar) and the
+    time and triples of each section are recorded. Line-based formats are written while converting,
+    so for those the convert phase includes serializing.
+    With skolemize, nodes that would be blank nodes get stable IRIs (see addPackageStatement), so the
+    same input gives the same output in every run.
+    """
+    phase = profile.phase if profile is not None else nullcontext
+    getTaxonomyResolver().popUnknown()
+    # Load YAML data
+    with phase('parse'):
+        with open(inputFileName, 'r') as f:
+            data = yaml.safe_load(f)
+
+    with phase('validate'):
+        problems = validatePackageStatement(data)
+    if problems:
+        message = f"Invalid references in {inputFileName}:\n  " + "\n  ".join(problems)
+        if strict:
+            raise ValueError(message)
+        print(f"WARNING: {message}", file=sys.stderr)
 
-    inputFileName = sys.argv[1]
-    outputFileName = sys.argv[2]
+    name = os.path.splitext(os.path.basename(inputFileName))[0]
+    NSDATA = Namespace(PACKAGE_STATEMENTS_IRI + name + "#")
+
+    if format in STREAMED_FORMATS:
+        graphName = URIRef(PACKAGE_STATEMENTS_IRI + name) if format == 'nquads' else None
+        with phase('convert'), openOutput(outputFileName, compress) as stream:
+            addPackageStatement(TripleWriter(stream, graphName, base=str(NSDATA)), data, NSDATA, profile, skolemize)
+    elif format in OUTPUT_EXTENSIONS:
+        # Create RDF graph
+        with phase('convert'):
+            g = Graph()
+            addNamespaces(g)
+            g.bind("data", NSDATA)
+            addPackageStatement(g, data, NSDATA, profile, skolemize)
+        # Serialize graph to file
+        with phase('serialize'), openOutput(outputFileName, compress) as stream:
+            resolveRelativeIris(g, str(NSDATA))
+            if format == 'turtle':
+                # No @base: rdflib would write the IRIs in NSDATA relative to it, e.g. <X> for NSDATA#X,
+                # which a parser resolves to the sibling IRI PACKAGE_STATEMENTS_IRI + X
+                g.serialize(stream, format)
+            elif format == 'json-ld':
+                serializeJsonLd(g, stream, dict(getJsonLdContext(), data=str(NSDATA)))
+            else:
+                serializeJelly(g, stream)
+    else:
+        raise NotImplementedError(f"Output format '{format}' not implemented")
+
+    unknownTerms = getTaxonomyResolver().popUnknown()
+    if unknownTerms:
+        message = f"Unknown taxonomy terms in {inputFileName}: {', '.join(repr(term) for term in unknownTerms)}"
+        if strict:
+            os.remove(outputFileName)
+            raise ValueError(message)
+        print(f"WARNING: {message}", file=sys.stderr)
+
+    if columnarDir is not None:
+        with phase('columnar'):
+            writeBiaTables(data, name, columnarDir, columnarFormat)
+
+
+def findPackageStatementFiles(patterns: list[str]) -> list[str]:
+    """Expand directories and glob patterns to a sorted list of package statement YAML files."""
+    fileNames = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, PACKAGE_STATEMENT_GLOB)
+        fileNames.update(glob.glob(pattern))
+    return sorted(fileNames)
+
+
+def _convertPackageStatement(inputFileName: str, outputFileName: str, format: str, compress: str, strict: bool,
+                             columnarDir: str, columnarFormat: str, profile: bool, profileMemory: bool,
+                             skolemize: bool):
+    # Runs in a worker process; errors are returned as text so one failing statement does not stop the batch
+    conversionProfile = ConversionProfile(inputFileName, profileMemory) if profile else None
+    try:
+        createPackageStatementsFromYaml(inputFileName, outputFileName, format, compress, strict,
+                                        columnarDir, columnarFormat, conversionProfile, skolemize)
+    except Exception as e:
+        return inputFileName, f"{type(e).__name__}: {e}", None
+    return inputFileName, None, conversionProfile.report() if profile else None
+
+
+def createBuildCache(manifestFileName: str, columnarDir: str = None) -> BuildCache:
+    """
+    Opens the rebuild manifest, keyed on the converter sources and the rdflib/PyYAML versions, and with
+    columnarDir on the pyarrow version the tables are written with.
+    """
+    versions = {'rdflib': rdflib.__version__, 'yaml': yaml.__version__}
+    if columnarDir is not None:
+        versions['pyarrow'] = bia_export.pa.__version__ if bia_export.pa is not None else None
+    return BuildCache(manifestFileName, CONVERTER_SOURCES, versions)
+
+
+def _cachedOutputs(inputFileName: str, outputFileName: str, columnarDir: str = None,
+                   columnarFormat: str = 'parquet') -> list[str]:
+    """The files converting inputFileName writes: the output file, and with columnarDir its BIA tables."""
+    if columnarDir is None:
+        return [outputFileName]
+    name = os.path.splitext(os.path.basename(inputFileName))[0]
+    return [outputFileName] + biaTableFileNames(name, columnarDir, columnarFormat)
+
+
+def isUpToDate(cache: BuildCache, inputFileName: str, outputFileName: str, options: str, columnarDir: str = None,
+               columnarFormat: str = 'parquet') -> bool:
+    """Whether every file the conversion writes exists and is recorded in the cache for this input and options."""
+    return all(cache.isUpToDate(inputFileName, output, options)
+               for output in _cachedOutputs(inputFileName, outputFileName, columnarDir, columnarFormat))
+
+
+def updateCache(cache: BuildCache, inputFileName: str, outputFileName: str, options: str, columnarDir: str = None,
+                columnarFormat: str = 'parquet'):
+    for output in _cachedOutputs(inputFileName, outputFileName, columnarDir, columnarFormat):
+        cache.update(inputFileName, output, options)
+
+
+def createPackageStatementsFromYamlBatch(inputFileNames: list[str], outputDir: str, workers: int = None,
+                                         cache: BuildCache = None, format: str = 'turtle', compress: str = None,
+                                         strict: bool = False, columnarDir: str = None,
+                                         columnarFormat: str = 'parquet', profileFileName: str = None,
+                                         profileMemory: bool = False, skolemize: bool = False) -> dict:
+    """
+    Converts a batch of package statement YAML files on a process pool.
+    Each <name>.yaml is written to <outputDir>/<name>.ttl (or the extension of the chosen
+    format and compression). Returns a dict mapping each
+    converted input file to None on success or to an error message on failure. With a
+    cache, files that are up to date are skipped (and left out of the result) and the
+    manifest is updated for every successful conversion.
+    With profileFileName, a ConversionProfile report of each successful conversion is appended
+    to that file as a JSON line ('-' for stderr), with peak memory if profileMemory.
+    skolemize is passed on to createPackageStatementsFromYaml.
+    """
+    os.makedirs(outputDir, exist_ok=True)
+    extension = OUTPUT_EXTENSIONS[format] + COMPRESSION_EXTENSIONS[compress]
+    options = f"{format} {compress} {strict} {columnarDir} {columnarFormat} {skolemize}"
+    jobs = {}
+    for inputFileName in inputFileNames:
+        name = os.path.splitext(os.path.basename(inputFileName))[0]
+        outputFileName = os.path.join(outputDir, name + extension)
+        if cache is None or not isUpToDate(cache, inputFileName, outputFileName, options, columnarDir, columnarFormat):
+            jobs[inputFileName] = outputFileName
+    results = {}
+    if not jobs:
+        return results
+    with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count(), len(jobs))) as executor:
+        futures = [executor.submit(_convertPackageStatement, inputFileName, outputFileName, format, compress, strict,
+                                   columnarDir, columnarFormat, profileFileName is not None, profileMemory,
+                                   skolemize)
+                   for inputFileName, outputFileName in jobs.items()]
+        for future in as_completed(futures):
+            inputFileName, error, report = future.result()
+            results[inputFileName] = error
+            if report is not None:
+                writeReport(report, profileFileName)
+            if error is None and cache is not None:
+                updateCache(cache, inputFileName, jobs[inputFileName], options, columnarDir, columnarFormat)
+    if cache is not None:
+        cache.save()
+    return results
 
-    createPackageStatementsFromYaml(inputFileName, outputFileName)
 
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert package statement YAML files to RDF")
+    parser.add_argument("paths", type=str, nargs="+",
+                        help="<input_yaml_file> <output_file>, or with --batch: directories or glob patterns of YAML files")
+    parser.add_argument("--batch", action="store_true",
+                        help=f"Convert all matching files (directories are searched for '{PACKAGE_STATEMENT_GLOB}')")
+    parser.add_argument("--output-dir", type=str, default=".", help="Output directory in batch mode")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes in batch mode (default: number of CPUs)")
+    parser.add_argument("--format", choices=list(OUTPUT_EXTENSIONS), default='turtle',
+                        help="Output format: turtle or json-ld for reading, line-based nt/nquads (streamed while "
+                             "converting) or binary jelly (requires pyjelly) for loading into a triplestore")
+    parser.add_argument("--compress", choices=[c for c in COMPRESSION_EXTENSIONS if c], default=None,
+                        help="Compress the output (zstd requires zstandard)")
+    parser.add_argument("--strict", action="store_true",
+                        help="Fail on dangling references and on taxonomy terms that are not in src/data/taxonomy.tsv "
+                             "instead of warning")
+    parser.add_argument("--cache", type=str, default=None,
+                        help="Manifest file of input hashes; statements that did not change since the last build are skipped")
+    parser.add_argument("--columnar-dir", type=str, default=None,
+                        help="Also write the cost estimations and trend assumptions as tables to this directory "
+                             "(requires pyarrow)")
+    parser.add_argument("--columnar-format", choices=['parquet', 'arrow'], default='parquet',
+                        help="File format of the tables: parquet, or arrow for memory-mapped reads")
+    parser.add_argument("--profile", type=str, default=None,
+                        help="Append the time and triples per section of each conversion as a JSON line to this file "
+                             "('-' for stderr)")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="Also record peak memory per section in the profile (slower)")
+    parser.add_argument("--skolemize", action="store_true",
+                        help="Give blank nodes stable IRIs derived from their parent and role, so unchanged input "
+                             "gives identical output")
+    args = parser.parse_args()
+
+    cache = createBuildCache(args.cache, args.columnar_dir) if args.cache else None
+
+    if not args.batch:
+        if len(args.paths) != 2:
+            parser.error("expected <input_yaml_file> <output_file>")
+        inputFileName, outputFileName = args.paths
+        options = (f"{args.format} {args.compress} {args.strict} {args.columnar_dir} {args.columnar_format} "
+                   f"{args.skolemize}")
+        if cache is not None and isUpToDate(cache, inputFileName, outputFileName, options, args.columnar_dir,
+                                            args.columnar_format):
+            print(f"{outputFileName} is up to date")
+            sys.exit(0)
+        profile = ConversionProfile(inputFileName, args.profile_memory) if args.profile else None
+        createPackageStatementsFromYaml(inputFileName, outputFileName, args.format, args.compress, args.strict,
+                                        args.columnar_dir, args.columnar_format, profile, args.skolemize)
+        if profile is not None:
+            writeReport(profile.report(), args.profile)
+        if cache is not None:
+            updateCache(cache, inputFileName, outputFileName, options, args.columnar_dir, args.columnar_format)
+            cache.save()
+        sys.exit(0)
+
+    inputFileNames = findPackageStatementFiles(args.paths)
+    if not inputFileNames:
+        parser.error(f"no package statement files found in {', '.join(args.paths)}")
+
+    results = createPackageStatementsFromYamlBatch(inputFileNames, args.output_dir, args.workers, cache,
+                                                   args.format, args.compress, args.strict,
+                                                   args.columnar_dir, args.columnar_format,
+                                                   args.profile, args.profile_memory, args.skolemize)
+    failed = {fileName: error for fileName, error in results.items() if error is not None}
+    for fileName in sorted(results):
+        if fileName in failed:
+            print(f"FAILED {fileName}: {failed[fileName]}", file=sys.stderr)
+        else:
+            print(f"Converted {fileName}")
+    skipped = len(inputFileNames) - len(results)
+    print(f"{len(results) - len(failed)} of {len(results)} package statements converted, {skipped} up to date")
+    sys.exit(1 if failed else 0)
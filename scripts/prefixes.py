@@ -0,0 +1,15 @@
+import json
+
+
+def loadPrefixes(fileName: str) -> dict:
+    """Reads the prefix → namespace mapping from a JSON-LD context file such as src/prefixes.jsonld."""
+    with open(fileName, 'r') as f:
+        return json.load(f)['@context']
+
+
+def expandCurie(curie: str, prefixes: dict) -> str:
+    """Expands prefix:localName to a full IRI. Values without a known prefix are returned unchanged."""
+    prefix, sep, localName = curie.partition(':')
+    if sep and prefix in prefixes and not localName.startswith('//'):
+        return prefixes[prefix] + localName
+    return curie
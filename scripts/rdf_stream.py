@@ -0,0 +1,133 @@
+import gzip
+import json
+import urllib.parse
+from rdflib import URIRef, BNode, Literal
+from rdflib.plugins.serializers.jsonld import from_rdf
+
+try:
+    import zstandard
+except ImportError:
+    # Optional dependency, only needed for zstd compression
+    zstandard = None
+
+try:
+    from pyjelly.integrations.rdflib.serialize import flat_stream_to_file
+except ImportError:
+    # Optional dependency, only needed for the binary Jelly format
+    flat_stream_to_file = None
+
+
+_LITERAL_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '"': '\\"',
+    '\n': '\\n',
+    '\r': '\\r',
+})
+
+
+def resolveIri(term: str, base: str) -> str:
+    """
+    Resolves a relative IRI against base. In a namespace that ends with '#', such as that of a package
+    statement, relative IRIs are the ids of its records: 'Outcome-X' becomes <base>Outcome-X, the IRI of
+    the record itself, and not the sibling document that RFC 3986 resolution would give.
+    """
+    if base.endswith('#'):
+        return base + term
+    return urllib.parse.urljoin(base, term)
+
+
+def ntTerm(term, base: str = None) -> str:
+    """Returns the N-Triples representation of an rdflib term. Relative IRIs are resolved against base."""
+    if isinstance(term, Literal):
+        lexical = '"' + str(term).translate(_LITERAL_ESCAPES) + '"'
+        if term.language:
+            return f"{lexical}@{term.language}"
+        if term.datatype:
+            return f"{lexical}^^<{term.datatype}>"
+        return lexical
+    if isinstance(term, BNode):
+        return f"_:{term}"
+    if base is not None and ':' not in term:
+        return f"<{resolveIri(term, base)}>"
+    return f"<{term}>"
+
+
+def resolveRelativeIris(g, base: str):
+    """
+    Replaces the relative IRIs in g by IRIs resolved against base, as ntTerm does, so that every
+    output format has the same absolute IRIs.
+    """
+    def resolve(term):
+        if isinstance(term, URIRef) and ':' not in term:
+            return URIRef(resolveIri(term, base))
+        return term
+
+    relative = [triple for triple in g if any(resolve(term) is not term for term in triple)]
+    for triple in relative:
+        g.remove(triple)
+        g.add(tuple(resolve(term) for term in triple))
+    return g
+
+
+def serializeJsonLd(g, stream, context: dict):
+    """
+    Writes g as JSON-LD compacted with context. rdflib orders the nodes differently in every process,
+    so they are sorted by @id to write the same bytes for the same graph.
+    """
+    obj = from_rdf(g, context, auto_compact=True)
+    nodes = obj.get('@graph')
+    if nodes:
+        nodes.sort(key=lambda node: node.get('@id', ''))
+    stream.write(json.dumps(obj, indent=2, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+
+
+def serializeJelly(g, stream):
+    """Writes g in the binary Jelly format, with the triples sorted to write the same bytes for the same graph."""
+    if flat_stream_to_file is None:
+        raise ImportError("The Jelly format needs pyjelly, install it with: pip install pyjelly")
+    flat_stream_to_file(iter(sorted(g)), stream)
+
+
+def openOutput(fileName: str, compress: str = None):
+    """Opens a binary output stream, optionally compressed. compress is None, 'gzip' or 'zstd'."""
+    if compress is None:
+        return open(fileName, 'wb')
+    if compress == 'gzip':
+        # Without a timestamp in the header, the same contents give the same file
+        return gzip.GzipFile(fileName, 'wb', mtime=0)
+    if compress == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstd compression needs zstandard, install it with: pip install zstandard")
+        return zstandard.open(fileName, 'wb')
+    raise NotImplementedError(f"Compression '{compress}' not implemented")
+
+
+class TripleWriter:
+    """
+    Write-through replacement for an rdflib Graph that only supports add().
+
+    Each triple is written to the stream as an N-Triples line, or as an N-Quads line when a
+    graph name is given, as soon as it is added. Relative IRIs are resolved against base.
+    Nothing is kept in memory, so duplicate triples are written as often as they are added;
+    RDF loaders treat them as one.
+    """
+
+    def __init__(self, stream, graphName: URIRef = None, base: str = None):
+        self.stream = stream
+        self.base = base
+        self.suffix = f" {ntTerm(graphName)} .\n" if graphName is not None else " .\n"
+        self.count = 0
+
+    def add(self, triple):
+        s, p, o = triple
+        base = self.base
+        self.stream.write(f"{ntTerm(s, base)} {ntTerm(p, base)} {ntTerm(o, base)}{self.suffix}".encode('utf-8'))
+        self.count += 1
+        return self
+
+    def bind(self, prefix, namespace, *args, **kwargs):
+        # Line-based formats have no prefixes
+        pass
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+
+# Local registry of package statements: all generated statements in one persistent SQLite store,
+# with one named graph per statement, queryable together with SPARQL.
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+from rdflib import Graph, Dataset, URIRef, BNode, Literal
+from rdflib.store import Store, VALID_STORE, NO_STORE
+
+from build_cache import hashFile
+
+
+PACKAGE_STATEMENTS_IRI = "https://w3id.org/zinl/package-statements/"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    language TEXT NOT NULL,
+    datatype TEXT NOT NULL,
+    UNIQUE (kind, value, language, datatype)
+);
+CREATE TABLE IF NOT EXISTS graphs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    source TEXT,
+    hash TEXT
+);
+CREATE TABLE IF NOT EXISTS quads (
+    g INTEGER NOT NULL,
+    s INTEGER NOT NULL,
+    p INTEGER NOT NULL,
+    o INTEGER NOT NULL,
+    PRIMARY KEY (g, s, p, o)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS quads_spo ON quads (s, p, o, g);
+CREATE INDEX IF NOT EXISTS quads_pos ON quads (p, o, s, g);
+CREATE INDEX IF NOT EXISTS quads_osp ON quads (o, s, p, g);
+CREATE TABLE IF NOT EXISTS namespaces (
+    prefix TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL
+);
+"""
+
+
+def _encodeTerm(term) -> tuple:
+    if isinstance(term, Literal):
+        return ('l', str(term), term.language or '', str(term.datatype) if term.datatype else '')
+    if isinstance(term, BNode):
+        return ('b', str(term), '', '')
+    return ('u', str(term), '', '')
+
+
+def _decodeTerm(kind: str, value: str, language: str, datatype: str):
+    if kind == 'u':
+        return URIRef(value)
+    if kind == 'b':
+        return BNode(value)
+    return Literal(value, lang=language or None, datatype=URIRef(datatype) if datatype else None)
+
+
+class SQLiteStore(Store):
+    """
+    Context-aware rdflib store in a SQLite database. Terms are stored once in a dictionary table and
+    quads as integer ids, with SPO, POS and OSP indexes so any triple pattern is an index lookup.
+    """
+
+    context_aware = True
+    graph_aware = True
+    formula_aware = False
+    transaction_aware = True
+
+    def __init__(self, configuration=None, identifier=None):
+        self.connection = None
+        self._termIds = {}
+        self._terms = {}
+        super().__init__(configuration, identifier)
+
+    def open(self, configuration: str, create: bool = False):
+        if not create and not os.path.exists(configuration):
+            return NO_STORE
+        self.connection = sqlite3.connect(configuration)
+        # Readers (queries) are not blocked while the registry is being loaded
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction: bool = False):
+        if self.connection is not None:
+            if commit_pending_transaction:
+                self.connection.commit()
+            self.connection.close()
+            self.connection = None
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+        # Ids of terms added in the transaction are no longer valid
+        self._termIds.clear()
+        self._terms.clear()
+
+    # Term dictionary
+
+    def _termId(self, term, create: bool = False) -> int:
+        key = _encodeTerm(term)
+        termId = self._termIds.get(key)
+        if termId is None:
+            row = self.connection.execute(
+                "SELECT id FROM terms WHERE kind = ? AND value = ? AND language = ? AND datatype = ?", key).fetchone()
+            if row is None:
+                if not create:
+                    return None
+                termId = self.connection.execute(
+                    "INSERT INTO terms (kind, value, language, datatype) VALUES (?, ?, ?, ?)", key).lastrowid
+            else:
+                termId = row[0]
+            self._termIds[key] = termId
+        return termId
+
+    def _term(self, termId: int):
+        term = self._terms.get(termId)
+        if term is None:
+            row = self.connection.execute(
+                "SELECT kind, value, language, datatype FROM terms WHERE id = ?", (termId,)).fetchone()
+            term = self._terms[termId] = _decodeTerm(*row)
+        return term
+
+    def _graphId(self, context, create: bool = False) -> int:
+        name = str(context.identifier if isinstance(context, Graph) else context)
+        row = self.connection.execute("SELECT id FROM graphs WHERE name = ?", (name,)).fetchone()
+        if row is not None:
+            return row[0]
+        if not create:
+            return None
+        return self.connection.execute("INSERT INTO graphs (name) VALUES (?)", (name,)).lastrowid
+
+    def _where(self, triple, context) -> tuple[str, list]:
+        """Returns the SQL condition and parameters for a triple pattern, or None if it cannot match."""
+        conditions = []
+        parameters = []
+        for column, term in zip(('s', 'p', 'o'), triple):
+            if term is None:
+                continue
+            termId = self._termId(term)
+            if termId is None:
+                return None
+            conditions.append(f"{column} = ?")
+            parameters.append(termId)
+        if context is not None:
+            graphId = self._graphId(context)
+            if graphId is None:
+                return None
+            conditions.append("g = ?")
+            parameters.append(graphId)
+        return " AND ".join(conditions) or "1", parameters
+
+    # Store interface
+
+    def add(self, triple, context, quoted: bool = False):
+        self.addN([(*triple, context)])
+
+    def addN(self, quads):
+        graphIds = {}
+        rows = []
+        for s, p, o, context in quads:
+            key = context.identifier
+            if key not in graphIds:
+                graphIds[key] = self._graphId(context, create=True)
+            rows.append((graphIds[key], self._termId(s, True), self._termId(p, True), self._termId(o, True)))
+        self.connection.executemany("INSERT OR IGNORE INTO quads (g, s, p, o) VALUES (?, ?, ?, ?)", rows)
+
+    def remove(self, triple, context=None):
+        where = self._where(triple, context)
+        if where is not None:
+            self.connection.execute(f"DELETE FROM quads WHERE {where[0]}", where[1])
+
+    def triples(self, triple, context=None):
+        where = self._where(triple, context)
+        if where is None:
+            return
+        if context is not None:
+            cursor = self.connection.execute(f"SELECT s, p, o FROM quads WHERE {where[0]}", where[1])
+            for s, p, o in cursor:
+                yield (self._term(s), self._term(p), self._term(o)), iter([context])
+            return
+        cursor = self.connection.execute(
+            f"SELECT s, p, o, group_concat(g) FROM quads WHERE {where[0]} GROUP BY s, p, o", where[1])
+        for s, p, o, graphIds in cursor:
+            contexts = [self._context(int(graphId)) for graphId in graphIds.split(',')]
+            yield (self._term(s), self._term(p), self._term(o)), iter(contexts)
+
+    def _context(self, graphId: int) -> Graph:
+        name = self.connection.execute("SELECT name FROM graphs WHERE id = ?", (graphId,)).fetchone()[0]
+        return Graph(store=self, identifier=URIRef(name))
+
+    def __len__(self, context=None) -> int:
+        if context is None:
+            return self.connection.execute("SELECT count(*) FROM (SELECT DISTINCT s, p, o FROM quads)").fetchone()[0]
+        graphId = self._graphId(context)
+        if graphId is None:
+            return 0
+        return self.connection.execute("SELECT count(*) FROM quads WHERE g = ?", (graphId,)).fetchone()[0]
+
+    def contexts(self, triple=None):
+        if triple is None:
+            rows = self.connection.execute("SELECT name FROM graphs ORDER BY name")
+        else:
+            where = self._where(triple, None)
+            if where is None:
+                return
+            rows = self.connection.execute(
+                f"SELECT name FROM graphs WHERE id IN (SELECT g FROM quads WHERE {where[0]}) ORDER BY name", where[1])
+        for (name,) in rows.fetchall():
+            yield Graph(store=self, identifier=URIRef(name))
+
+    def add_graph(self, graph):
+        self._graphId(graph, create=True)
+
+    def remove_graph(self, graph):
+        graphId = self._graphId(graph)
+        if graphId is not None:
+            self.connection.execute("DELETE FROM quads WHERE g = ?", (graphId,))
+            self.connection.execute("DELETE FROM graphs WHERE id = ?", (graphId,))
+
+    def bind(self, prefix, namespace, override: bool = True):
+        if override:
+            self.connection.execute("INSERT OR REPLACE INTO namespaces (prefix, namespace) VALUES (?, ?)",
+                                    (prefix, str(namespace)))
+        else:
+            self.connection.execute("INSERT OR IGNORE INTO namespaces (prefix, namespace) VALUES (?, ?)",
+                                    (prefix, str(namespace)))
+
+    def namespace(self, prefix):
+        row = self.connection.execute("SELECT namespace FROM namespaces WHERE prefix = ?", (prefix,)).fetchone()
+        return URIRef(row[0]) if row else None
+
+    def prefix(self, namespace):
+        row = self.connection.execute("SELECT prefix FROM namespaces WHERE namespace = ?", (str(namespace),)).fetchone()
+        return row[0] if row else None
+
+    def namespaces(self):
+        for prefix, namespace in self.connection.execute("SELECT prefix, namespace FROM namespaces").fetchall():
+            yield prefix, URIRef(namespace)
+
+    # Registry bookkeeping
+
+    def graphSources(self) -> dict:
+        """Returns graph name → (source file, content hash) for all graphs."""
+        return {name: (source, h) for name, source, h in
+                self.connection.execute("SELECT name, source, hash FROM graphs")}
+
+    def setGraphSource(self, name: URIRef, source: str, h: str):
+        self.connection.execute("UPDATE graphs SET source = ?, hash = ? WHERE name = ?", (source, h, str(name)))
+
+
+def getGraphName(fileName: str) -> URIRef:
+    """Graph name of a generated statement, as used for the N-Quads output of package_statements.py."""
+    name = os.path.basename(fileName)
+    for extension in ('.gz', '.zst', '.ttl', '.nt', '.nq', '.jsonld', '.jelly'):
+        if name.endswith(extension):
+            name = name[:-len(extension)]
+    return URIRef(PACKAGE_STATEMENTS_IRI + name)
+
+
+class Registry:
+    """
+    Package statements in a persistent store. Each statement file is a named graph; SPARQL queries
+    run over the union of all graphs. Loading only parses files whose contents changed.
+    """
+
+    def __init__(self, fileName: str):
+        self.store = SQLiteStore()
+        self.store.open(fileName, create=True)
+        self.dataset = Dataset(store=self.store, default_union=True)
+
+    def load(self, fileNames: list[str], prune: bool = False) -> dict:
+        """
+        Loads statement files into their named graphs, replacing earlier versions. With prune, graphs
+        whose file is not among fileNames are removed. Returns graph name → 'added', 'updated',
+        'unchanged' or 'removed'.
+        """
+        sources = self.store.graphSources()
+        results = {}
+        for fileName in fileNames:
+            name = getGraphName(fileName)
+            h = hashFile(fileName)
+            if str(name) in sources and sources[str(name)][1] == h:
+                results[name] = 'unchanged'
+                continue
+            g = Graph().parse(fileName)
+            # Replace the graph in one transaction, so a failed load keeps the previous version
+            try:
+                graph = Graph(store=self.store, identifier=name)
+                self.store.remove_graph(graph)
+                self.store.add_graph(graph)
+                self.store.addN((s, p, o, graph) for s, p, o in g)
+                self.store.setGraphSource(name, os.path.abspath(fileName), h)
+                self.store.commit()
+            except BaseException:
+                self.store.rollback()
+                raise
+            results[name] = 'updated' if str(name) in sources else 'added'
+        if prune:
+            for name in sources.keys() - {str(n) for n in results}:
+                self.store.remove_graph(URIRef(name))
+                results[URIRef(name)] = 'removed'
+            self.store.commit()
+        return results
+
+    def graphs(self) -> list[URIRef]:
+        return [g.identifier for g in self.store.contexts()]
+
+    def version(self) -> str:
+        """Hash of the names and contents of all statements; changes whenever a statement is loaded or removed."""
+        h = hashlib.sha256()
+        for name, (source, contentHash) in sorted(self.store.graphSources().items()):
+            h.update(f"{name} {contentHash}\n".encode())
+        return h.hexdigest()
+
+    def query(self, query, **kwargs):
+        """Runs a SPARQL query over all statements. Use GRAPH ?g { ... } to find the statement of a match."""
+        return self.dataset.query(query, **kwargs)
+
+    def close(self):
+        self.store.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local registry of package statements in a SQLite store")
+    parser.add_argument("registry", type=str, help="Registry database file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    loadParser = subparsers.add_parser("load", help="Load (changed) package statement files")
+    loadParser.add_argument("inputs", type=str, nargs="+", help="Generated package statements (.ttl, .nt)")
+    loadParser.add_argument("--prune", action="store_true", help="Remove statements that are not in inputs")
+    queryParser = subparsers.add_parser("query", help="Run a SPARQL query over all package statements")
+    queryParser.add_argument("query", type=str, help="SPARQL query, or @file to read it from a file")
+    subparsers.add_parser("list", help="List the package statements in the registry")
+    args = parser.parse_args()
+
+    registry = Registry(args.registry)
+    try:
+        if args.command == "load":
+            for name, status in sorted(registry.load(args.inputs, args.prune).items()):
+                print(f"{status}: {name}")
+        elif args.command == "query":
+            query = args.query
+            if query.startswith('@'):
+                with open(query[1:], 'r') as f:
+                    query = f.read()
+            result = registry.query(query)
+            sys.stdout.write(result.serialize(format='csv').decode('utf-8'))
+        else:
+            for name in registry.graphs():
+                print(name)
+    finally:
+        registry.close()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+# The standard questions about package statements (see use_case/demo_iknl.ipynb) as prepared queries.
+import argparse
+from collections import OrderedDict
+from rdflib import Graph, Namespace
+from rdflib.namespace import DCTERMS, QB
+from rdflib.plugins.sparql import prepareQuery
+
+
+FPR = Namespace("https://w3id.org/zinl/fpr-o#")
+PICO = Namespace("http://data.cochrane.org/ontologies/pico/")
+
+NAMESPACES = {'fpr': FPR, 'pico': PICO, 'dcterms': DCTERMS, 'qb': QB}
+
+QUESTIONS = {
+    # What is/are the Intervention(s)?
+    'interventions': """
+        SELECT DISTINCT ?iic ?intervention ?title
+        {
+            ?iic a fpr:IICAssessment ;
+                fpr:hasIntervention ?intervention .
+            ?intervention dcterms:title ?title .
+        }
+        ORDER BY ?iic ?title
+    """,
+    # What is the Indication (PICO)?
+    'indications': """
+        SELECT DISTINCT ?iic ?title ?population ?age ?sex ?condition
+        {
+            ?iic a fpr:IICAssessment ;
+                fpr:hasIntervention ?intervention ;
+                fpr:hasIndication ?population .
+            ?intervention dcterms:title ?title .
+            ?population pico:sex ?sex ;
+                pico:age ?age ;
+                pico:condition ?condition .
+        }
+        ORDER BY ?iic ?title
+    """,
+    # Trend assumption: how many patients fall within the eligible indication?
+    'trendAssumptionPatients': """
+        SELECT ?iic ?bia ?trendAssumption ?nrOfPatients ?timepoint
+        {
+            ?iic a fpr:IICAssessment ;
+                fpr:hasBIA ?bia .
+            ?bia fpr:hasTrendAssumption ?trendAssumption .
+            ?obs qb:dataSet ?trendAssumption ;
+                fpr:hasNumberOfPatients ?nrOfPatients ;
+                fpr:hasTimepoint ?timepoint .
+        }
+        ORDER BY ?iic ?timepoint
+    """,
+    # How many patients were estimated to use this Intervention, at what costs?
+    'costEstimations': """
+        SELECT DISTINCT ?iic ?intervention ?costEstimation ?costType ?childIntervention ?nrOfPatients ?costs ?timepoint
+        {
+            ?iic a fpr:IICAssessment ;
+                fpr:hasBIA ?bia ;
+                fpr:hasIntervention ?intervention .
+            ?bia fpr:hasCostEstimation ?costEstimation .
+            ?obs qb:dataSet ?costEstimation ;
+                fpr:hasCostType ?costType ;
+                fpr:hasIntervention ?childIntervention ;
+                fpr:hasNumberOfPatients ?nrOfPatients ;
+                fpr:hasTotalCosts ?costs ;
+                fpr:hasTimepoint ?timepoint .
+        }
+        ORDER BY ?intervention ?costType ?timepoint
+    """,
+    # Which IIC assessments have this conclusion (fpr:Positive or fpr:Negative)?
+    'assessmentsByConclusion': """
+        SELECT DISTINCT ?iic ?conclusion ?intervention
+        {
+            ?iic a fpr:IICAssessment ;
+                fpr:hasConclusion ?conclusion ;
+                fpr:hasIntervention ?intervention .
+        }
+        ORDER BY ?iic
+    """,
+}
+
+# Parsed and translated to SPARQL algebra once, when the module is imported
+PREPARED_QUERIES = {name: prepareQuery(query, initNs=NAMESPACES) for name, query in QUESTIONS.items()}
+
+
+def graphVersion(graph: Graph) -> int:
+    """
+    Version of an in-memory graph: an order-independent hash of its triples. Computing it is linear in
+    the size of the graph but much cheaper than evaluating a query. Only valid within one process.
+    """
+    h = 0
+    for triple in graph:
+        h ^= hash(triple)
+    return hash((len(graph), h))
+
+
+class QuestionCache:
+    """
+    Answers the standard questions about a graph or Registry, caching up to maxSize results.
+
+    Results are cached per question and bindings and are dropped as soon as the version of the
+    source changes: Registry.version() for a registry, otherwise a hash of the graph's triples.
+    A version function can be given for sources that know cheaper ways to tell they changed.
+    """
+
+    def __init__(self, source, maxSize: int = 128, version=None):
+        self.source = source
+        self.maxSize = maxSize
+        self.versionFunction = version
+        self.results = OrderedDict()
+        self.resultsVersion = None
+        self.hits = 0
+        self.misses = 0
+
+    def version(self):
+        if self.versionFunction is not None:
+            return self.versionFunction()
+        if hasattr(self.source, 'version'):
+            return self.source.version()
+        return graphVersion(self.source)
+
+    def ask(self, question: str, **bindings) -> list[dict]:
+        """Returns the rows of a standard question as dicts of variable name → rdflib term."""
+        version = self.version()
+        if version != self.resultsVersion:
+            self.results.clear()
+            self.resultsVersion = version
+        key = (question, tuple(sorted(bindings.items())))
+        rows = self.results.get(key)
+        if rows is not None:
+            self.results.move_to_end(key)
+            self.hits += 1
+            return list(rows)
+        self.misses += 1
+        result = self.source.query(PREPARED_QUERIES[question], initBindings=bindings)
+        rows = [{str(var): row[var] for var in result.vars if row.get(var) is not None} for row in result.bindings]
+        self.results[key] = rows
+        if len(self.results) > self.maxSize:
+            self.results.popitem(last=False)
+        return list(rows)
+
+    def interventions(self, iic=None) -> list[dict]:
+        return self.ask('interventions', **({'iic': iic} if iic else {}))
+
+    def indications(self, iic=None) -> list[dict]:
+        return self.ask('indications', **({'iic': iic} if iic else {}))
+
+    def trendAssumptionPatients(self, iic=None) -> list[dict]:
+        return self.ask('trendAssumptionPatients', **({'iic': iic} if iic else {}))
+
+    def costEstimations(self, iic=None) -> list[dict]:
+        return self.ask('costEstimations', **({'iic': iic} if iic else {}))
+
+    def assessmentsByConclusion(self, conclusion=FPR.Negative) -> list[dict]:
+        return self.ask('assessmentsByConclusion', conclusion=conclusion)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Answer a standard question about package statements")
+    parser.add_argument("question", type=str, choices=sorted(QUESTIONS), help="Question to answer")
+    parser.add_argument("inputs", type=str, nargs="+",
+                        help="Package statement files, or one registry database (.sqlite)")
+    args = parser.parse_args()
+
+    if len(args.inputs) == 1 and args.inputs[0].endswith('.sqlite'):
+        from registry import Registry
+        source = Registry(args.inputs[0])
+    else:
+        source = Graph()
+        for inputFileName in args.inputs:
+            source.parse(inputFileName)
+    for row in QuestionCache(source).ask(args.question):
+        print("\t".join(f"{name}={value}" for name, value in row.items()))
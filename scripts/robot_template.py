@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+
+# Native replacement for the `robot merge ... template` steps in the Makefile.
+# Supports the subset of ROBOT template strings used in src/model/*.tsv and src/data/taxonomy.tsv:
+# https://robot.obolibrary.org/template
+import argparse
+import csv
+import os
+import sys
+import time
+from rdflib import Graph, URIRef, Literal
+from rdflib.namespace import RDF, RDFS, OWL, XSD
+
+from graph_cache import GraphCache
+from prefixes import loadPrefixes, expandCurie
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Annotation properties that are built into OWL and therefore not declared
+BUILTIN_ANNOTATION_PROPERTIES = {RDFS.label, RDFS.comment, RDFS.seeAlso, RDFS.isDefinedBy, OWL.versionInfo,
+                                 OWL.deprecated}
+BUILTIN_DATATYPES = {URIRef(str(XSD) + name) for name in (
+    'string', 'integer', 'float', 'double', 'decimal', 'boolean', 'date', 'dateTime', 'anyURI', 'gYear')}
+
+# Prefixes ROBOT knows by default, which some inputs (src/model/generic.ttl) rely on without declaring them
+DEFAULT_PREFIXES = {
+    'dcterms': 'http://purl.org/dc/terms/',
+}
+
+ENTITY_TYPES = {
+    'class': OWL.Class,
+    'object property': OWL.ObjectProperty,
+    'data property': OWL.DatatypeProperty,
+    'annotation property': OWL.AnnotationProperty,
+    'datatype': RDFS.Datatype,
+}
+
+
+def shortForm(iri: str) -> str:
+    """Local name of an IRI, as used by ROBOT (OWL API short form) to resolve unprefixed names."""
+    for separator in ('#', '/', '_'):
+        if separator in iri:
+            iri = iri.rsplit(separator, 1)[1] or iri
+            break
+    return iri
+
+
+class EntityIndex:
+    """
+    Names of the entities in the input ontologies, used to resolve template values given as labels.
+    As in ROBOT, rdfs:labels take precedence over local names, and entities added later
+    (templates compiled earlier in the build) override the input ontologies.
+    """
+
+    def __init__(self):
+        self.labels = {}
+        self.shortForms = {}
+        self.kinds = {}
+
+    def addGraph(self, g: Graph):
+        for s, kind in g.subject_objects(RDF.type):
+            if isinstance(s, URIRef) and kind in (OWL.Class, OWL.ObjectProperty, OWL.DatatypeProperty,
+                                                   OWL.AnnotationProperty, RDFS.Datatype, RDF.Property):
+                self.kinds.setdefault(s, set()).add(kind)
+                self.shortForms[shortForm(str(s))] = s
+        for s, label in g.subject_objects(RDFS.label):
+            if isinstance(s, URIRef):
+                self.labels[str(label)] = s
+
+    def lookup(self, name: str) -> URIRef:
+        return self.labels.get(name) or self.shortForms.get(name)
+
+    def isDataProperty(self, iri: URIRef) -> bool:
+        return OWL.DatatypeProperty in self.kinds.get(iri, ())
+
+
+def loadOntology(fileName: str, prefixes: dict, graphCache=None) -> Graph:
+    """
+    Parses an input ontology, through graphCache (a GraphCache) when given. Turtle files may use
+    the default and template prefixes without declaring them.
+    """
+    if not fileName.endswith('.ttl'):
+        return graphCache.load(fileName) if graphCache else Graph().parse(fileName)
+    # Declarations in the file itself come later and take precedence
+    declarations = ''.join(f"@prefix {prefix}: <{namespace}> .\n"
+                           for prefix, namespace in {**DEFAULT_PREFIXES, **prefixes}.items())
+
+    def parse(fileName):
+        with open(fileName, 'r', encoding='utf-8') as f:
+            data = f.read()
+        return Graph().parse(data=declarations + data, format='turtle', publicID=fileName)
+
+    return graphCache.load(fileName, parse, declarations) if graphCache else parse(fileName)
+
+
+def readTemplate(fileName: str) -> tuple[list[str], list[list[str]]]:
+    """Returns the template strings (second row) and the data rows of a ROBOT template TSV."""
+    with open(fileName, 'r', newline='') as f:
+        reader = csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE)
+        next(reader)  # Column titles
+        template = next(reader)
+        rows = [row for row in reader if row and row[0]]
+    return template, rows
+
+
+def parseTemplateString(templateString: str) -> tuple[str, str, str]:
+    """Splits e.g. 'AL rdfs:label@nl SPLIT=|' into ('AL', 'rdfs:label@nl', '|')."""
+    templateString, _, split = templateString.partition(' SPLIT=')
+    keyword, _, argument = templateString.strip().partition(' ')
+    return keyword, argument.strip(), split or None
+
+
+class TemplateCompiler:
+    def __init__(self, prefixes: dict, index: EntityIndex):
+        self.prefixes = prefixes
+        self.index = index
+
+    def iri(self, value: str) -> URIRef:
+        expanded = expandCurie(value, self.prefixes)
+        if expanded != value or value.startswith(('http://', 'https://')):
+            return URIRef(expanded)
+        return None
+
+    def resolve(self, value: str, where: str) -> URIRef:
+        """Resolves an IRI, CURIE, label or local name to an IRI."""
+        iri = self.iri(value) or self.index.lookup(value)
+        if iri is None:
+            raise ValueError(f"{where}: cannot resolve '{value}'")
+        return iri
+
+    def compile(self, fileName: str, ontologyIRI: str) -> Graph:
+        """Compiles one ROBOT template TSV to an OWL ontology graph."""
+        template, rows = readTemplate(fileName)
+        columns = [parseTemplateString(templateString) for templateString in template]
+        keywords = [keyword for keyword, _, _ in columns]
+        idColumn = keywords.index('ID')
+
+        # Like ROBOT, make the labels in this template resolvable before processing any row
+        local = EntityIndex()
+        labelColumn = keywords.index('LABEL') if 'LABEL' in keywords else None
+        for row in rows:
+            if labelColumn is not None and labelColumn < len(row) and row[labelColumn]:
+                local.labels[row[labelColumn]] = URIRef(expandCurie(row[idColumn], self.prefixes))
+        index = EntityIndex()
+        index.labels = {**self.index.labels, **local.labels}
+        index.shortForms = self.index.shortForms
+        index.kinds = self.index.kinds
+        compiler = TemplateCompiler(self.prefixes, index)
+
+        g = Graph()
+        g.add((URIRef(ontologyIRI), RDF.type, OWL.Ontology))
+        for rowNumber, row in enumerate(rows, start=3):
+            compiler.compileRow(g, fileName, rowNumber, columns, row, idColumn)
+        return g
+
+    def compileRow(self, g: Graph, fileName: str, rowNumber: int, columns: list, row: list[str], idColumn: int):
+        where = f"{fileName} row {rowNumber}"
+        subject = URIRef(expandCurie(row[idColumn], self.prefixes))
+        cells = []
+        for i, (keyword, argument, split) in enumerate(columns):
+            cell = row[i] if i < len(row) else ''
+            if not cell.strip():
+                continue
+            # Values are taken as they are, including surrounding whitespace, like ROBOT does
+            values = cell.split(split) if split else [cell]
+            cells.append((keyword, argument, [value for value in values if value.strip()]))
+
+        # The entity type determines how the other columns are interpreted
+        entityType = OWL.NamedIndividual
+        for keyword, argument, values in cells:
+            if keyword == 'TYPE':
+                if len(values) == 1 and values[0] in ENTITY_TYPES:
+                    entityType = ENTITY_TYPES[values[0]]
+                    g.add((subject, RDF.type, entityType))
+                else:
+                    g.add((subject, RDF.type, OWL.NamedIndividual))
+                    for value in values:
+                        cls = self.resolve(value, where)
+                        g.add((subject, RDF.type, cls))
+                        g.add((cls, RDF.type, OWL.Class))
+
+        for keyword, argument, values in cells:
+            for value in values:
+                if keyword == 'LABEL':
+                    g.add((subject, RDFS.label, Literal(value)))
+                elif keyword in ('A', 'AL', 'AT', 'AI'):
+                    if keyword == 'AL':
+                        prop, _, language = argument.rpartition('@')
+                        obj = Literal(value, lang=language)
+                    elif keyword == 'AT':
+                        prop, _, datatype = argument.rpartition('^^')
+                        obj = Literal(value, datatype=self.resolve(datatype, where))
+                    elif keyword == 'AI':
+                        prop = argument
+                        obj = self.resolve(value, where)
+                    else:
+                        prop = argument
+                        obj = Literal(value)
+                    self.addAnnotation(g, subject, self.resolve(prop, where), obj)
+                elif keyword == 'AP':
+                    # Cell holds '<property> <value>' pairs, e.g. 'skos:inScheme fpr-tax:FPR-CS'
+                    prop, _, obj = value.partition(' ')
+                    self.addAnnotation(g, subject, self.resolve(prop, where), self.resolve(obj.strip(), where))
+                elif keyword == 'I':
+                    prop = self.resolve(argument, where)
+                    if self.index.isDataProperty(prop):
+                        g.add((prop, RDF.type, OWL.DatatypeProperty))
+                        g.add((subject, prop, Literal(value)))
+                    else:
+                        target = self.resolve(value, where)
+                        g.add((prop, RDF.type, OWL.ObjectProperty))
+                        g.add((subject, prop, target))
+                        g.add((target, RDF.type, OWL.NamedIndividual))
+                elif keyword == 'SC':
+                    superClass = self.resolve(argument.replace('%', value), where)
+                    g.add((subject, RDFS.subClassOf, superClass))
+                    g.add((superClass, RDF.type, OWL.Class))
+                elif keyword in ('DOMAIN', 'RANGE'):
+                    target = self.resolve(value, where)
+                    g.add((subject, RDFS.domain if keyword == 'DOMAIN' else RDFS.range, target))
+                    if keyword == 'RANGE' and entityType == OWL.DatatypeProperty:
+                        continue
+                    if target not in BUILTIN_DATATYPES:
+                        g.add((target, RDF.type, OWL.Class))
+                elif keyword not in ('ID', 'TYPE', ''):
+                    raise NotImplementedError(f"{where}: template string '{keyword}' not implemented")
+
+    def addAnnotation(self, g: Graph, subject: URIRef, prop: URIRef, obj):
+        g.add((subject, prop, obj))
+        if prop not in BUILTIN_ANNOTATION_PROPERTIES:
+            g.add((prop, RDF.type, OWL.AnnotationProperty))
+
+
+# The Makefile's ontology build: the template components of fpr-o with the ontologies their labels
+# are resolved against, and the taxonomy. An input that is a template refers to its compiled component.
+ONTOLOGY_COMPONENTS = [
+    ('src/model/classes.tsv', 'https://w3id.org/zinl/fpr-o-classes',
+     ['src/external/cochrane-pico-ontology.ttl', 'src/model/generic.ttl', 'src/external/prov-o.ttl',
+      'src/external/fabio.ttl', 'src/external/schemaorg-all-http.ttl', 'src/external/EDAM_1.25.owl']),
+    ('src/model/object-properties.tsv', 'https://w3id.org/zinl/fpr-o-object-properties',
+     ['src/external/cochrane-pico-ontology.ttl', 'src/model/generic.ttl', 'src/external/time.ttl',
+      'src/external/cube.ttl', 'src/external/stato.owl', 'src/model/classes.tsv']),
+    ('src/model/data-properties.tsv', 'https://w3id.org/zinl/fpr-o-data-properties',
+     ['src/external/cochrane-pico-ontology.ttl', 'src/model/generic.ttl', 'src/external/cube.ttl',
+      'src/model/classes.tsv']),
+    ('src/model/instances.tsv', 'https://w3id.org/zinl/fpr-o-instances',
+     ['src/model/classes.tsv']),
+]
+ONTOLOGY_ANNOTATIONS = 'src/model/annotations.ttl'
+ONTOLOGY_IRI = 'https://w3id.org/zinl/fpr-o'
+TAXONOMY_COMPONENT = ('src/data/taxonomy.tsv', 'https://w3id.org/zinl/fpr-tax',
+                      ['src/external/cochrane-core-ontology.ttl', 'src/external/skos-core.ttl', 'src/model/generic.ttl'])
+
+
+class OntologyBuilder:
+    """Builds fpr-o and fpr-tax in one process, parsing every input ontology at most once."""
+
+    def __init__(self, rootDir: str, prefixes: dict, loadGraph=None, graphCache=None):
+        self.rootDir = rootDir
+        self.prefixes = prefixes
+        self.loadGraph = loadGraph or (lambda fileName: loadOntology(fileName, prefixes, graphCache))
+        self.graphs = {}
+
+    def graph(self, fileName: str) -> Graph:
+        if fileName not in self.graphs:
+            self.graphs[fileName] = self.loadGraph(os.path.join(self.rootDir, fileName))
+        return self.graphs[fileName]
+
+    def compileComponent(self, component) -> Graph:
+        templateFileName, ontologyIRI, inputs = component
+        index = EntityIndex()
+        for inputFileName in inputs:
+            index.addGraph(self.graph(inputFileName))
+        g = TemplateCompiler(self.prefixes, index).compile(os.path.join(self.rootDir, templateFileName), ontologyIRI)
+        # Later components resolve labels against this one
+        self.graphs[templateFileName] = g
+        return g
+
+    def buildOntology(self) -> Graph:
+        annotations = self.graph(ONTOLOGY_ANNOTATIONS)
+        g = Graph()
+        for triple in annotations:
+            g.add(triple)
+        # The OWL serializer declares the annotation properties used in the ontology header
+        for ontology in annotations.subjects(RDF.type, OWL.Ontology):
+            for p in annotations.predicates(ontology):
+                if p not in BUILTIN_ANNOTATION_PROPERTIES and p != RDF.type and not str(p).startswith(str(OWL)):
+                    g.add((p, RDF.type, OWL.AnnotationProperty))
+        for component in ONTOLOGY_COMPONENTS:
+            for s, p, o in self.compileComponent(component):
+                # As `robot merge`, keep only the ontology header of the first input
+                if p == RDF.type and o == OWL.Ontology:
+                    continue
+                g.add((s, p, o))
+        return g
+
+    def buildTaxonomy(self) -> Graph:
+        return self.compileComponent(TAXONOMY_COMPONENT)
+
+
+def bindPrefixes(g: Graph, prefixes: dict):
+    for prefix, namespace in prefixes.items():
+        g.bind(prefix, namespace, override=True, replace=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the FPR ontology and taxonomy from their ROBOT templates")
+    parser.add_argument("--prefixes", type=str, default=os.path.join(ROOT_DIR, 'src', 'prefixes.jsonld'),
+                        help="JSON-LD context with the prefixes used in the templates")
+    parser.add_argument("--ontology", type=str, default=None, help="Ontology (fpr-o) Turtle file to write")
+    parser.add_argument("--taxonomy", type=str, default=None, help="Taxonomy (fpr-tax) Turtle file to write")
+    parser.add_argument("--modules", type=str, default=None,
+                        help="Directory of cached modules to load instead of the full external ontologies")
+    parser.add_argument("--graph-cache", type=str, default=None, help="Directory of cached parsed input ontologies")
+    args = parser.parse_args()
+    if not args.ontology and not args.taxonomy:
+        parser.error("nothing to build, use --ontology and/or --taxonomy")
+
+    prefixes = loadPrefixes(args.prefixes)
+    graphCache = GraphCache(args.graph_cache) if args.graph_cache else None
+    loadGraph = None
+    if args.modules:
+        from extract_modules import createModuleCache
+        cache = createModuleCache(args.modules, prefixes, graphCache)
+        externalDir = os.path.join(ROOT_DIR, 'src', 'external')
+        loadGraph = lambda fileName: (cache.load(fileName) if os.path.dirname(fileName) == externalDir
+                                      else loadOntology(fileName, prefixes, graphCache))
+    builder = OntologyBuilder(ROOT_DIR, prefixes, loadGraph, graphCache)
+    for outputFileName, build in ((args.ontology, builder.buildOntology), (args.taxonomy, builder.buildTaxonomy)):
+        if not outputFileName:
+            continue
+        start = time.perf_counter()
+        g = build()
+        bindPrefixes(g, prefixes)
+        g.serialize(outputFileName, 'turtle')
+        print(f"Wrote {outputFileName} ({len(g)} triples) in {time.perf_counter() - start:.1f}s", file=sys.stderr)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+# Triple-level differences between two versions of a package statement, as a SPARQL Update or an
+# RDF Patch, so a triplestore only needs the triples that changed instead of the whole graph.
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from rdflib import Graph, BNode, URIRef
+
+from package_statements import PACKAGE_STATEMENTS_IRI, SKOLEM_IRI, createPackageStatementsFromYaml
+from rdf_stream import ntTerm
+from registry import getGraphName
+
+
+def isYamlFile(fileName: str) -> bool:
+    return fileName.endswith(('.yaml', '.yml'))
+
+
+def statementName(fileName: str) -> str:
+    """The name of the statement a YAML or converted file is of, e.g. 'aft_ps', which determines its IRIs."""
+    if isYamlFile(fileName):
+        return os.path.splitext(os.path.basename(fileName))[0]
+    return str(getGraphName(fileName))[len(PACKAGE_STATEMENTS_IRI):]
+
+
+def normalizeIri(term, name: str):
+    """
+    Statements converted with a Turtle @base (before all formats had the same IRIs) have the record IRIs
+    https://w3id.org/zinl/package-statements/<id> instead of .../<name>#<id>. Returns the IRI of the
+    record in the statement namespace, so that both forms compare equal; other terms are returned as is.
+    """
+    if not isinstance(term, URIRef) or not term.startswith(PACKAGE_STATEMENTS_IRI) or term.startswith(SKOLEM_IRI):
+        return term
+    local = term[len(PACKAGE_STATEMENTS_IRI):]
+    if '#' in local or '/' in local:
+        return term
+    return URIRef(f"{PACKAGE_STATEMENTS_IRI}{name}#{'' if local == name else local}")
+
+
+def readTriples(fileName: str, name: str = None) -> set[str]:
+    """
+    The triples of an RDF file as a set of N-Triples lines without the final ' .', so equal triples are
+    equal strings. The IRIs of the records are normalized with normalizeIri.
+    """
+    g = Graph().parse(fileName)
+    if any(isinstance(term, BNode) for triple in g for term in triple):
+        raise ValueError(f"{fileName} has blank nodes, which cannot be matched between versions; "
+                         f"convert it with --skolemize")
+    name = name or statementName(fileName)
+    return {' '.join(ntTerm(normalizeIri(term, name)) for term in triple) for triple in g}
+
+
+def convertTriples(yamlFileName: str, skolemize: bool = True, strict: bool = False, name: str = None) -> set[str]:
+    """
+    The triples of a package statement YAML file, converted with createPackageStatementsFromYaml. The
+    IRIs depend on the name of the file, which is name if given (for a copy in a temporary file).
+    """
+    with tempfile.TemporaryDirectory() as tmpDir:
+        name = name or os.path.splitext(os.path.basename(yamlFileName))[0]
+        inputFileName = os.path.join(tmpDir, name + '.yaml')
+        shutil.copyfile(yamlFileName, inputFileName)
+        outputFileName = os.path.join(tmpDir, name + '.nt')
+        createPackageStatementsFromYaml(inputFileName, outputFileName, 'nt', strict=strict, skolemize=skolemize)
+        return readTriples(outputFileName, name)
+
+
+def revisionTriples(yamlFileName: str, revision: str, strict: bool = False) -> set[str]:
+    """The triples of a package statement YAML file as it was at a git revision, converted like convertTriples."""
+    directory = os.path.dirname(os.path.abspath(yamlFileName))
+    contents = subprocess.run(['git', 'show', f"{revision}:./{os.path.basename(yamlFileName)}"], cwd=directory,
+                              check=True, capture_output=True).stdout
+    with tempfile.NamedTemporaryFile(suffix='.yaml') as f:
+        f.write(contents)
+        f.flush()
+        return convertTriples(f.name, strict=strict, name=os.path.splitext(os.path.basename(yamlFileName))[0])
+
+
+def statementTriples(fileName: str, revision: str = None, strict: bool = False) -> set[str]:
+    """The triples of a version of a statement: a converted file, or a YAML file, optionally at a git revision."""
+    if revision is not None:
+        return revisionTriples(fileName, revision, strict)
+    return convertTriples(fileName, strict=strict) if isYamlFile(fileName) else readTriples(fileName)
+
+
+def diffTriples(old: set[str], new: set[str]) -> tuple[list[str], list[str]]:
+    """Returns the sorted (removed, added) triples."""
+    return sorted(old - new), sorted(new - old)
+
+
+def formatSparqlUpdate(removed: list[str], added: list[str], graphName: URIRef = None) -> str:
+    """DELETE DATA and INSERT DATA operations, in graphName or else in the default graph."""
+    operations = []
+    for operation, triples in (('DELETE DATA', removed), ('INSERT DATA', added)):
+        if not triples:
+            continue
+        indent = '  ' if graphName is None else '    '
+        lines = ''.join(f"{indent}{triple} .\n" for triple in triples)
+        if graphName is not None:
+            lines = f"  GRAPH {ntTerm(graphName)} {{\n{lines}  }}\n"
+        operations.append(f"{operation} {{\n{lines}}}")
+    return ' ;\n'.join(operations) + '\n' if operations else ''
+
+
+def formatRdfPatch(removed: list[str], added: list[str], graphName: URIRef = None) -> str:
+    """An RDF Patch (https://afs.github.io/rdf-patch/) with the changes in one transaction."""
+    suffix = f" {ntTerm(graphName)} .\n" if graphName is not None else " .\n"
+    return ('TX .\n' + ''.join(f"D {triple}{suffix}" for triple in removed)
+            + ''.join(f"A {triple}{suffix}" for triple in added) + 'TC .\n')
+
+
+PATCH_FORMATS = {'sparql': formatSparqlUpdate, 'rdf-patch': formatRdfPatch}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Patch from the published version of a package statement to a new one")
+    parser.add_argument("old", type=str,
+                        help="Published version: package statement YAML file, or converted with --skolemize (.ttl, .nt)")
+    parser.add_argument("new", type=str, help="New version: package statement YAML file, or converted (.ttl, .nt)")
+    parser.add_argument("--old-revision", type=str, default=None, metavar="REV",
+                        help="Read the old YAML file as it was at this git revision, e.g. the published tag")
+    parser.add_argument("--format", choices=list(PATCH_FORMATS), default='sparql',
+                        help="Patch format: SPARQL Update (DELETE DATA/INSERT DATA) or RDF Patch")
+    parser.add_argument("--graph", type=str, default=None,
+                        help="Graph to patch (default: the statement's graph in the registry, "
+                             "https://w3id.org/zinl/package-statements/<name>); '' for the default graph")
+    parser.add_argument("--output", type=str, default=None, help="Write the patch to this file instead of stdout")
+    parser.add_argument("--strict", action="store_true", help="Fail on invalid references or unknown taxonomy terms")
+    parser.add_argument("--expect-empty", action="store_true",
+                        help="Exit with status 1 if the versions differ, e.g. to check an unchanged statement")
+    args = parser.parse_args()
+    if args.old_revision is not None and not isYamlFile(args.old):
+        parser.error("--old-revision needs a YAML file as old version")
+
+    old = statementTriples(args.old, args.old_revision, args.strict)
+    new = statementTriples(args.new, strict=args.strict)
+    removed, added = diffTriples(old, new)
+    if args.graph is None:
+        graphName = URIRef(PACKAGE_STATEMENTS_IRI + statementName(args.new))
+    else:
+        graphName = URIRef(args.graph) if args.graph else None
+    patch = PATCH_FORMATS[args.format](removed, added, graphName)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(patch)
+    else:
+        sys.stdout.write(patch)
+    print(f"{len(removed)} triples removed, {len(added)} added", file=sys.stderr)
+    if args.expect_empty and (removed or added):
+        sys.exit(1)
@@ -0,0 +1,181 @@
+import csv
+from rdflib import Literal, Namespace, URIRef
+
+
+# Presence of a field: required fields raise a KeyError when missing, optional ones are skipped when
+# missing (None) and nonempty ones also when empty or false
+PRESENCES = ('required', 'optional', 'nonempty')
+
+
+class MappingError(ValueError):
+    pass
+
+
+def readRows(fileName: str) -> list[dict]:
+    with open(fileName, 'r', newline='') as f:
+        return [row for row in csv.DictReader(f, delimiter='\t') if any(row.values())]
+
+
+def resolveCurie(curie: str, namespaces: dict) -> URIRef:
+    prefix, _, name = curie.partition(':')
+    if prefix not in namespaces:
+        raise MappingError(f"Unknown prefix in '{curie}'")
+    namespace = namespaces[prefix]
+    if isinstance(namespace, type):
+        # Defined namespaces can give terms other IRIs than namespace + name, and raise an
+        # AttributeError for terms they do not define
+        return getattr(namespace, name)
+    return namespace[name]
+
+
+def readEnums(fileName: str, namespaces: dict) -> dict[str, dict]:
+    """Returns {enum: {value: term}} from a TSV file with Enum, Value and Term columns."""
+    enums = {}
+    for row in readRows(fileName):
+        enums.setdefault(row['Enum'], {})[row['Value']] = resolveCurie(row['Term'], namespaces)
+    return enums
+
+
+class SectionEmitter:
+    """
+    The compiled rules of one section: the subject pattern and, per field, how to get its value from a
+    record, how to convert it to an RDF term and which predicate to add it with. Predicates, constant
+    objects and enum tables are resolved once, when the mapping is compiled.
+    """
+
+    def __init__(self, section: str, subjectPattern: str, required: bool):
+        self.section = section
+        self.subjectPattern = subjectPattern
+        self.required = required
+        self.constants = []
+        self.rules = []
+
+    def records(self, data: dict) -> list:
+        records = data[self.section] if self.required else data.get(self.section)
+        if not records:
+            return []
+        # Single-record sections such as package-statement and appropriate-use are mappings
+        return [records] if isinstance(records, dict) else records
+
+    def emit(self, g, record: dict, ids):
+        """Adds the triples of one record to g and returns its subject; ids(localName) returns record IRIs."""
+        subj = ids(self.subjectPattern.format(record['id']))
+        for predicate, obj in self.constants:
+            g.add((subj, predicate, obj))
+        for field, presence, convert, predicate, reverse in self.rules:
+            if presence == 'required':
+                value = record[field]
+            else:
+                value = record.get(field)
+                if value is None or (presence == 'nonempty' and not value):
+                    continue
+            for item in value if isinstance(value, list) else (value,):
+                obj = convert(item, ids)
+                if obj is None:
+                    continue
+                g.add((obj, predicate, subj) if reverse else (subj, predicate, obj))
+        return subj
+
+
+class StatementMapping:
+    """
+    Declarative mapping of package statement YAML sections to RDF, compiled from a TSV table with the
+    columns Section, Field, Predicate, Kind, Argument, Presence and Unknown value. Each section starts
+    with a row of kind 'subject' for its id field (Argument: IRI pattern in the statement namespace,
+    default '{}'; Presence: whether the section is required). Other kinds of rows:
+    - constant: adds Predicate with the term in Argument, e.g. rdf:type of the section's records
+    - literal: a literal, with Argument the datatype (e.g. xsd:integer) or a language (e.g. @nl)
+    - id: the IRI of the record with this id in the statement (Argument: pattern, default '{}')
+    - iri: the value as an IRI
+    - term: the value as a term in the namespace with prefix Argument
+    - taxonomy: the taxonomy term with the value as label
+    - enum: the term for the value in the enum named Argument (see readEnums). Unknown values are
+      ignored, or raise a NotImplementedError with the 'Unknown value' message ({} is the value)
+    List values add one triple per item and predicates starting with ^ are added in reverse, from the
+    object to the record.
+    """
+
+    def __init__(self, rows: list[dict], namespaces: dict, enums: dict, taxonomyTerm):
+        self.sections = {}
+        for row in rows:
+            self._compileRow(row, namespaces, enums, taxonomyTerm)
+
+    def _compileRow(self, row: dict, namespaces: dict, enums: dict, taxonomyTerm):
+        section, field, kind = row['Section'], row['Field'], row['Kind']
+        argument, presence = row['Argument'] or '', row['Presence'] or 'required'
+        if presence not in PRESENCES:
+            raise MappingError(f"{section} {field}: unknown presence '{presence}'")
+        if kind == 'subject':
+            self.sections[section] = SectionEmitter(section, argument or '{}', presence == 'required')
+            return
+        emitter = self.sections.get(section)
+        if emitter is None:
+            raise MappingError(f"{section}: the first row of a section must be its subject")
+        reverse = row['Predicate'].startswith('^')
+        predicate = resolveCurie(row['Predicate'].lstrip('^'), namespaces)
+        if kind == 'constant':
+            emitter.constants.append((predicate, resolveCurie(argument, namespaces)))
+            return
+        emitter.rules.append((field, presence, self._converter(kind, argument, row, namespaces, enums, taxonomyTerm),
+                              predicate, reverse))
+
+    @staticmethod
+    def _converter(kind: str, argument: str, row: dict, namespaces: dict, enums: dict, taxonomyTerm):
+        if kind == 'literal':
+            if argument.startswith('@'):
+                language = argument[1:]
+                return lambda value, ids: Literal(value, lang=language)
+            datatype = resolveCurie(argument, namespaces) if argument else None
+            return lambda value, ids: Literal(value, datatype=datatype)
+        if kind == 'id':
+            pattern = argument or '{}'
+            return lambda value, ids: ids(pattern.format(value))
+        if kind == 'iri':
+            return lambda value, ids: URIRef(value)
+        if kind == 'term':
+            namespace = namespaces[argument]
+            return lambda value, ids: namespace[value]
+        if kind == 'taxonomy':
+            return lambda value, ids: taxonomyTerm(value)
+        if kind == 'enum':
+            terms = enums[argument]
+            message = row.get('Unknown value')
+            if not message:
+                return lambda value, ids: terms.get(value)
+
+            def convertEnum(value, ids):
+                term = terms.get(value)
+                if term is None:
+                    raise NotImplementedError(message.format(value))
+                return term
+            return convertEnum
+        raise MappingError(f"{row['Section']} {row['Field']}: unknown kind '{kind}'")
+
+    def emit(self, g, data: dict, NSDATA: Namespace, extras: dict = None, mark=None):
+        """
+        Adds the triples of all sections of a package statement to g, in table order. extras maps a
+        section to a function(g, record, subj, data, NSDATA) that adds the triples the table cannot
+        express; mark(section, g) is called before each section.
+        """
+        # IRIs of the records in this statement, created once per id
+        cache = {}
+
+        def ids(localName: str) -> URIRef:
+            iri = cache.get(localName)
+            if iri is None:
+                iri = cache[localName] = NSDATA[localName]
+            return iri
+
+        for section, emitter in self.sections.items():
+            if mark is not None:
+                mark(section, g)
+            extra = extras.get(section) if extras else None
+            for record in emitter.records(data):
+                subj = emitter.emit(g, record, ids)
+                if extra is not None:
+                    extra(g, record, subj, data, NSDATA)
+        return g
+
+
+def loadStatementMapping(fileName: str, enumsFileName: str, namespaces: dict, taxonomyTerm) -> StatementMapping:
+    return StatementMapping(readRows(fileName), namespaces, readEnums(enumsFileName, namespaces), taxonomyTerm)
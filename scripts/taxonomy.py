@@ -0,0 +1,96 @@
+import csv
+import urllib.parse
+from collections import Counter
+from rdflib import Graph, Namespace, URIRef
+from rdflib.namespace import SKOS
+
+from prefixes import expandCurie
+
+
+def normalizeLabel(label: str) -> str:
+    """Index key for a label: case-insensitive and with runs of whitespace collapsed."""
+    return ' '.join(str(label).split()).casefold()
+
+
+class TaxonomyResolver:
+    """
+    Resolves free-text taxonomy labels to concept IRIs.
+
+    All labels are precomputed into one hash index, so a lookup is a single dict access.
+    Preferred labels take precedence over synonyms (altLabels), which take precedence over
+    notations/mapping codes such as 'MESH:D009369'. Labels that are not in the taxonomy
+    fall back to the fallback namespace (the label URL-quoted, as before) and are recorded,
+    so all unknown terms of a package statement can be reported at once.
+    """
+
+    def __init__(self, concepts, fallbackNamespace: Namespace):
+        self.fallbackNamespace = fallbackNamespace
+        self.index = {}
+        self.cache = {}
+        self.unknown = Counter()
+        # Add preferred labels of all concepts first, then synonyms, then notations
+        concepts = list(concepts)
+        for field in ('prefLabels', 'altLabels', 'notations'):
+            for concept in concepts:
+                for label in concept[field]:
+                    self.index.setdefault(normalizeLabel(label), concept['iri'])
+
+    @classmethod
+    def fromTemplate(cls, fileName: str, prefixes: dict, fallbackNamespace: Namespace) -> 'TaxonomyResolver':
+        """Loads the taxonomy from its ROBOT template (src/data/taxonomy.tsv)."""
+        with open(fileName, 'r', newline='') as f:
+            reader = csv.reader(f, delimiter='\t')
+            next(reader)  # Column titles
+            template = next(reader)
+            columns = {robotTemplate.split(' SPLIT=')[0]: i for i, robotTemplate in enumerate(template)}
+
+            def values(row, column):
+                i = columns.get(column)
+                if i is None or i >= len(row) or not row[i]:
+                    return []
+                return [value for value in row[i].split('|') if value]
+
+            concepts = []
+            for row in reader:
+                if not row or not row[columns['ID']]:
+                    continue
+                concepts.append({
+                    'iri': URIRef(expandCurie(row[columns['ID']], prefixes)),
+                    'prefLabels': values(row, 'A skos:prefLabel') + values(row, 'LABEL'),
+                    'altLabels': values(row, 'A altLabel'),
+                    'notations': values(row, 'I notation'),
+                })
+        return cls(concepts, fallbackNamespace)
+
+    @classmethod
+    def fromGraph(cls, fileName: str, fallbackNamespace: Namespace, graphCache=None) -> 'TaxonomyResolver':
+        """Loads the taxonomy from the generated SKOS taxonomy (fpr-tax.ttl), through graphCache when given."""
+        g = graphCache.load(fileName) if graphCache else Graph().parse(fileName)
+        concepts = {}
+        for predicate, field in ((SKOS.prefLabel, 'prefLabels'), (SKOS.altLabel, 'altLabels'), (SKOS.notation, 'notations')):
+            for s, o in g.subject_objects(predicate):
+                concept = concepts.setdefault(s, {'iri': s, 'prefLabels': [], 'altLabels': [], 'notations': []})
+                concept[field].append(str(o))
+        return cls(concepts.values(), fallbackNamespace)
+
+    def resolve(self, label: str) -> URIRef:
+        """Returns the IRI of the concept with this label, synonym or notation, or None."""
+        return self.index.get(normalizeLabel(label))
+
+    def getTerm(self, label: str) -> URIRef:
+        """Returns the IRI for a label, falling back to a minted IRI for (recorded) unknown labels."""
+        term = self.cache.get(label)
+        if term is None:
+            term = self.resolve(label)
+            if term is None:
+                term = self.fallbackNamespace[urllib.parse.quote(label)]
+                self.unknown[label] += 1
+                return term
+            self.cache[label] = term
+        return term
+
+    def popUnknown(self) -> list[str]:
+        """Returns the unknown labels seen since the last call, and forgets them."""
+        unknown = sorted(self.unknown)
+        self.unknown.clear()
+        return unknown
@@ -5,22 +5,53 @@ import argparse
 import csv
 import os
 
+import openpyxl
 from openpyxl import Workbook
 
-parser = argparse.ArgumentParser(description="Merge TSV files into Excel")
-parser.add_argument("output", type=str, help="Excel file to create")
-parser.add_argument("inputs", type=str, nargs="+", help="TSV files to include")
-args = parser.parse_args()
+from build_cache import BuildCache
 
-wb = Workbook()
-wb.remove(wb.active)
 
-for path in args.inputs:
-    title, extension = os.path.splitext(os.path.basename(path))
-    ws = wb.create_sheet(title)
-    with open(path, "r") as tsvin:
-        tsv = csv.reader(tsvin, delimiter="\t", quoting=csv.QUOTE_NONE, escapechar='"')
-        for row in tsv:
-            ws.append(row[:])
+def writeWorkbook(output: str, inputs: list[str]):
+    """
+    Writes each TSV file to a sheet named after it. The workbook is write-only: rows go to the file as
+    they are read, so memory use does not grow with the number of rows.
+    """
+    wb = Workbook(write_only=True)
+    for path in inputs:
+        title, extension = os.path.splitext(os.path.basename(path))
+        ws = wb.create_sheet(title)
+        with open(path, "r") as tsvin:
+            tsv = csv.reader(tsvin, delimiter="\t", quoting=csv.QUOTE_NONE, escapechar='"')
+            for row in tsv:
+                ws.append(row)
+    wb.save(output)
 
-wb.save(args.output)
+
+def createBuildCache(manifestFileName: str) -> BuildCache:
+    return BuildCache(manifestFileName, [os.path.abspath(__file__)], {'openpyxl': openpyxl.__version__})
+
+
+def isUpToDate(cache: BuildCache, output: str, inputs: list[str]) -> bool:
+    # The sheets and their order are part of the options, so adding or reordering inputs also rewrites
+    options = " ".join(inputs)
+    return all(cache.isUpToDate(path, output, options) for path in inputs)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Merge TSV files into Excel")
+    parser.add_argument("output", type=str, help="Excel file to create")
+    parser.add_argument("inputs", type=str, nargs="+", help="TSV files to include")
+    parser.add_argument("--cache", type=str, default=None,
+                        help="Manifest file of input hashes; the Excel file is not rewritten if no TSV file changed")
+    args = parser.parse_args()
+
+    cache = createBuildCache(args.cache) if args.cache else None
+    if cache is not None and isUpToDate(cache, args.output, args.inputs):
+        print(f"{args.output} is up to date")
+        raise SystemExit(0)
+
+    writeWorkbook(args.output, args.inputs)
+    if cache is not None:
+        for path in args.inputs:
+            cache.update(path, args.output, " ".join(args.inputs))
+        cache.save()
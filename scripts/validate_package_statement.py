@@ -0,0 +1,118 @@
+import argparse
+import sys
+import yaml
+
+
+# Cross-references between sections: (section, path to the referencing field, sections the id must be in).
+# A path segment followed by [] is a list of nested records.
+REFERENCES = [
+    ('package-statement', 'iic-assessments', ['intervention-indication-combination-assessments']),
+    ('interventions', 'child-interventions', ['interventions']),
+    ('intervention-groups', 'intervention-ids', ['interventions']),
+    ('outcome-groups', 'outcome-ids', ['outcomes']),
+    ('picots', 'population-ids', ['populations']),
+    ('picots', 'intervention-group-id', ['intervention-groups']),
+    ('picots', 'comparator-group-id', ['intervention-groups']),
+    ('picots', 'outcome-group-ids', ['outcome-groups']),
+    ('intervention-indication-combination-assessments', 'intervention-id', ['interventions']),
+    ('intervention-indication-combination-assessments', 'indication-ids', ['populations']),
+    ('intervention-indication-combination-assessments', 'emsmp-id', ['emsmps']),
+    ('intervention-indication-combination-assessments', 'bia-id', ['bias']),
+    ('intervention-indication-combination-assessments', 'au-id', ['appropriate-use']),
+    ('emsmps', 'picots-id', ['picots']),
+    ('emsmps', 'slr-id', ['systematic-literature-reviews']),
+    ('emsmps', 'outcome-measurement-ids', ['outcome-measurements']),
+    ('systematic-literature-reviews', 'literature-searches', ['literature-searches']),
+    ('systematic-literature-reviews', 'literature-reference-list', ['literature-reference-lists']),
+    ('literature-reference-lists', 'references', ['publications']),
+    ('studies', 'publication-ids', ['publications']),
+    ('cohorts', 'study-id', ['studies']),
+    ('cohorts', 'intervention-group-id', ['intervention-groups']),
+    ('outcome-measurements', 'outcome-id', ['outcomes']),
+    ('outcome-measurements', 'cohort-ids', ['cohorts']),
+    ('trend-assumptions', 'scenario-id', ['scenarios']),
+    ('cost-estimations', 'scenario-id', ['scenarios']),
+    ('cost-estimations', 'trend-assumption-id', ['trend-assumptions']),
+    ('cost-estimations', 'observation-groups[]/intervention-ids', ['interventions']),
+    ('bias', 'trend-assumption-id', ['trend-assumptions']),
+    ('bias', 'cost-estimation-ids', ['cost-estimations']),
+]
+
+
+def _records(data: dict, section: str) -> list:
+    records = data.get(section) or []
+    # Single-record sections such as package-statement and appropriate-use are mappings
+    return [records] if isinstance(records, dict) else records
+
+
+def _values(record: dict, path: list[str]) -> list:
+    """Returns the ids found at path in a record, flattening lists and nested record lists."""
+    key = path[0]
+    if key.endswith('[]'):
+        values = []
+        for nested in record.get(key[:-2]) or []:
+            values.extend(_values(nested, path[1:]))
+        return values
+    value = record.get(key)
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def buildIdIndex(data: dict) -> tuple[dict, list[str]]:
+    """
+    Indexes every record id in one pass over the document. Returns the id → section index and
+    the problems found while building it (ids used more than once, which would collide in RDF).
+    """
+    index = {}
+    problems = []
+    for section, records in data.items():
+        for record in _records(data, section):
+            if not isinstance(record, dict) or 'id' not in record:
+                continue
+            recordId = record['id']
+            if recordId in index:
+                problems.append(f"{section}: duplicate id '{recordId}' (also used in {index[recordId]})")
+                continue
+            index[recordId] = section
+    return index, problems
+
+
+def validatePackageStatement(data: dict) -> list[str]:
+    """
+    Checks that every cross-reference in a parsed package statement resolves to a record in
+    the expected section. Returns all problems found; an empty list means the document is valid.
+    """
+    index, problems = buildIdIndex(data)
+    for section, field, targetSections in REFERENCES:
+        path = field.split('/')
+        for record in _records(data, section):
+            if not isinstance(record, dict):
+                continue
+            for referenceId in _values(record, path):
+                targetSection = index.get(referenceId)
+                if targetSection in targetSections:
+                    continue
+                recordId = record.get('id', '?')
+                if targetSection is None:
+                    problems.append(f"{section} '{recordId}': {field} '{referenceId}' does not exist")
+                else:
+                    problems.append(f"{section} '{recordId}': {field} '{referenceId}' is in {targetSection}, "
+                                    f"expected {' or '.join(targetSections)}")
+    return problems
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check the cross-references in package statement YAML files")
+    parser.add_argument("inputs", type=str, nargs="+", help="YAML files to check")
+    args = parser.parse_args()
+
+    failed = False
+    for inputFileName in args.inputs:
+        with open(inputFileName, 'r') as f:
+            data = yaml.safe_load(f)
+        problems = validatePackageStatement(data)
+        for problem in problems:
+            print(f"{inputFileName}: {problem}")
+        failed = failed or bool(problems)
+    sys.exit(1 if failed else 0)
@@ -3,30 +3,67 @@
 # Taken from https://github.com/obi-ontology/obi/blob/master/src/scripts/xlsx2tsv.py
 import argparse
 import csv
+import io
 import os
 
 from openpyxl import load_workbook
 
-parser = argparse.ArgumentParser(description="Read TSV from Excel")
-parser.add_argument("input", type=str, help="Excel file to read")
-parser.add_argument("sheet", type=str, help="Sheet name to read")
-parser.add_argument("output", type=str, help="TSV file to output")
-args = parser.parse_args()
-
-wb = load_workbook(args.input)
-ws = wb[args.sheet]
-
-rows = []
-for row in ws:
-    values = []
-    for cell in row:
-        if cell.value is None:
-            values.append("")
-        else:
-            values.append(cell.value)
-    if row:
-      rows.append(values)
-
-with open(args.output, "w") as f:
-  writer = csv.writer(f, delimiter="\t", lineterminator="\n", quoting=csv.QUOTE_NONE, escapechar='"')
-  writer.writerows(rows)
+
+def sheetToTsv(ws) -> str:
+    """The rows of a worksheet as TSV, with empty cells as empty strings."""
+    f = io.StringIO()
+    writer = csv.writer(f, delimiter="\t", lineterminator="\n", quoting=csv.QUOTE_NONE, escapechar='"')
+    for row in ws.iter_rows(values_only=True):
+        if row:
+            writer.writerow(["" if value is None else value for value in row])
+    return f.getvalue()
+
+
+def writeIfChanged(fileName: str, contents: str) -> bool:
+    """Writes the file only if its contents differ, so its timestamp does not change otherwise."""
+    if os.path.exists(fileName):
+        with open(fileName, "r", newline="") as f:
+            if f.read() == contents:
+                return False
+    with open(fileName, "w", newline="") as f:
+        f.write(contents)
+    return True
+
+
+def extractSheets(input: str, sheets: dict = None, outputDir: str = ".") -> dict:
+    """
+    Writes sheets (sheet name → TSV file, or if None all sheets to outputDir/<sheet>.tsv) of an Excel
+    file in one read-only pass over the workbook. Returns TSV file → whether it was written.
+    """
+    wb = load_workbook(input, read_only=True)
+    try:
+        if sheets is None:
+            sheets = {name: os.path.join(outputDir, name + ".tsv") for name in wb.sheetnames}
+        missing = [name for name in sheets if name not in wb.sheetnames]
+        if missing:
+            raise KeyError(f"No sheet {', '.join(missing)} in {input}")
+        return {output: writeIfChanged(output, sheetToTsv(wb[name])) for name, output in sheets.items()}
+    finally:
+        wb.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Read TSV from Excel")
+    parser.add_argument("input", type=str, help="Excel file to read")
+    parser.add_argument("sheets", type=str, nargs="*",
+                        help="<sheet> <output>, or any number of <sheet>=<output> mappings")
+    parser.add_argument("--all", type=str, default=None, metavar="DIR",
+                        help="Write every sheet to DIR/<sheet>.tsv")
+    args = parser.parse_args()
+
+    if args.all is not None:
+        sheets = None
+    elif len(args.sheets) == 2 and '=' not in args.sheets[0]:
+        sheets = {args.sheets[0]: args.sheets[1]}
+    elif args.sheets and all('=' in mapping for mapping in args.sheets):
+        sheets = dict(mapping.split('=', 1) for mapping in args.sheets)
+    else:
+        parser.error("expected <sheet> <output>, <sheet>=<output> mappings or --all")
+
+    for output, written in extractSheets(args.input, sheets, args.all).items():
+        print(f"{'Updated' if written else 'Unchanged'}: {output}")